@@ -0,0 +1,166 @@
+"""
+Benchmark of the generated JavaScript code.
+
+The corpus (bench/corpus/*.lda) contains algorithmic programs of the kind
+students write: sorts, searches, matrix products, recursion with inout
+parameters, string building, composites in arrays. Each program starts with
+a session, in the same format as the snippets (see tests/test_snippets.py),
+which gives its keyboard input and its expected output: inputs are fixed, so
+that every run does the same work.
+
+Each program is compiled with each code generator (straight from the syntax
+tree, and through the intermediate representation). The benchmark records
+the size of the generated JS, and its running time under the JS shell (best
+of several runs, each with a fresh program instance, see grading.py), and
+compares them against stored baselines. Programs that grew or slowed down by
+more than the thresholds are flagged as regressions, and the exit status is
+1; so are programs whose output is wrong.
+
+Running times depend on the machine and on the JS shell: run with --save to
+record new baselines.
+
+Usage:
+	python -m bench.runtime [--save] [--repeat 5] [PATTERN...]
+"""
+
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+from fnmatch import fnmatch
+
+import grading
+from lda import DefaultOptions, build_tree, translate_tree
+
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines", "runtime.json")
+
+SESSION_REGEXP = re.compile(r"^\(\*\|(?P<session>.*?)\|\*\)", re.DOTALL | re.MULTILINE)
+
+# code generator -> compiler options
+BACKENDS = {
+	'ast': {},
+	'ir': {'ir_backend': True},
+}
+
+
+def backend_options(name):
+	options = DefaultOptions()
+	options.stats_comment = False
+	for k, v in BACKENDS[name].items():
+		setattr(options, k, v)
+	return options
+
+
+def corpus(patterns=('*',)):
+	"""
+	Yield (name, path) pairs for the corpus programs matching the patterns.
+	"""
+	for fn in sorted(os.listdir(CORPUS)):
+		name, ext = os.path.splitext(fn)
+		if ext == '.lda' and any(fnmatch(name, p) for p in patterns):
+			yield name, os.path.join(CORPUS, fn)
+
+
+def measure(path, repeat=5):
+	"""
+	Compile and run a corpus program with each backend. Return a dict of
+	figures for each backend.
+	"""
+	with open(path, 'rt', encoding='utf-8') as f:
+		buf = f.read()
+	case = grading.parse_session(SESSION_REGEXP.search(buf).group('session'))
+	module = build_tree(DefaultOptions(), buf, path)
+	results = {}
+	for backend in BACKENDS:
+		options = backend_options(backend)
+		code = translate_tree(options, module, 'js')
+		runs = grading.grade(module, [case] * repeat, options=copy.copy(options))
+		wrong = [r for r in runs if not r.passed]
+		results[backend] = {
+			'js_bytes': len(code.encode('utf-8')),
+			'ms': min(r.elapsed for r in runs) * 1000,
+			'error': (wrong[0].error or "wrong output: " + wrong[0].output) if wrong else None,
+		}
+	return results
+
+
+def compare(current, baseline, size_threshold, time_threshold):
+	"""
+	Return a list of regression messages: programs with wrong output, and
+	programs whose JS grew by more than `size_threshold`, or whose running
+	time grew by more than `time_threshold` (fractions).
+	"""
+	regressions = []
+	for name, record in sorted(current.items()):
+		for backend, figures in sorted(record.items()):
+			if figures['error']:
+				regressions.append("{} ({}): {}".format(name, backend, figures['error']))
+			old = baseline.get(name, {}).get(backend)
+			if old is None:
+				continue
+			if figures['js_bytes'] > old['js_bytes'] * (1 + size_threshold):
+				regressions.append("{} ({}): {} bytes of JS, was {}".format(
+						name, backend, figures['js_bytes'], old['js_bytes']))
+			if figures['ms'] > old['ms'] * (1 + time_threshold):
+				regressions.append("{} ({}): {:.0f} ms, was {:.0f}".format(
+						name, backend, figures['ms'], old['ms']))
+	return regressions
+
+
+def delta(new, old):
+	if not old:
+		return ""
+	return "{:+.0%}".format(new / old - 1)
+
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Benchmark the generated JavaScript code.")
+	ap.add_argument('patterns', metavar='PATTERN', nargs='*', default=['*'],
+			help="only run corpus programs whose name matches one of these patterns")
+	ap.add_argument('--repeat', type=int, default=5,
+			help="number of runs per program (the fastest one is kept)")
+	ap.add_argument('--size-threshold', type=float, default=0.05,
+			help="relative JS size growth flagged as a regression")
+	ap.add_argument('--time-threshold', type=float, default=0.2,
+			help="relative slowdown flagged as a regression")
+	ap.add_argument('--baselines', default=BASELINES,
+			help="baselines file")
+	ap.add_argument('--save', action='store_true',
+			help="store the results as the new baselines")
+	args = ap.parse_args(argv)
+
+	try:
+		with open(args.baselines, 'rt') as f:
+			baseline = json.load(f)
+	except FileNotFoundError:
+		baseline = {}
+
+	current = {}
+	print("{:<28} {:<4} {:>9} {:>7} {:>9} {:>7}".format(
+			"program", "", "JS bytes", "", "ms", ""))
+	for name, path in corpus(args.patterns):
+		current[name] = record = measure(path, args.repeat)
+		for backend, f in record.items():
+			old = baseline.get(name, {}).get(backend, {})
+			print("{:<28} {:<4} {:9} {:>7} {:9.0f} {:>7}".format(
+					name, backend, f['js_bytes'], delta(f['js_bytes'], old.get('js_bytes')),
+					f['ms'], delta(f['ms'], old.get('ms'))), flush=True)
+
+	regressions = compare(current, baseline, args.size_threshold, args.time_threshold)
+	for message in regressions:
+		print("REGRESSION: " + message)
+	if args.save:
+		baseline.update(current)
+		os.makedirs(os.path.dirname(args.baselines), exist_ok=True)
+		with open(args.baselines, 'wt') as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		return 0
+	return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Compiler startup benchmark.
+
+For a one-shot compilation, starting the interpreter and importing the
+compiler takes most of the wall time. This benchmark runs `ldac.py` in fresh
+processes, in several modes that don't need the same parts of the compiler,
+and measures their wall time (best and median of several runs) and the number
+of modules they import (with `python -X importtime`).
+
+Results are compared against stored baselines: a mode that got slower by more
+than the threshold, or that imports more modules than before, is flagged as a
+regression, and the exit status is 1. Baselines depend on the machine: run
+with --save on a quiet machine to record new ones.
+
+Usage:
+	python -m bench.startup [--save] [--threshold 0.2] [--repeat 10] [MODE...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINES = os.path.join(ROOT, "bench", "baselines", "startup.json")
+
+PROGRAM = os.path.join(ROOT, "bench", "corpus", "tri insertion.lda")
+
+# mode -> arguments to the Python interpreter
+MODES = {
+	'import': ['-c', 'import lda'],
+	'no-output': ['ldac.py', '--no-output', PROGRAM],
+	'lda': ['ldac.py', '--format', 'lda', PROGRAM],
+	'js': ['ldac.py', PROGRAM],
+	'ir-backend': ['ldac.py', '--ir-backend', PROGRAM],
+}
+
+
+def run(args, *flags):
+	return subprocess.run([sys.executable] + list(flags) + args, cwd=ROOT,
+			stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+
+
+def imported_modules(args):
+	"""
+	Return the names of the modules imported by a run, in import order.
+	"""
+	stderr = run(args, '-X', 'importtime').stderr.decode('utf-8')
+	modules = []
+	for line in stderr.splitlines():
+		if line.startswith("import time:") and not line.endswith("imported package"):
+			modules.append(line.rsplit('|', 1)[1].strip())
+	return modules
+
+
+def measure(args, repeat=10):
+	"""
+	Benchmark a mode, and return a dict of figures.
+	"""
+	times = []
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		run(args)
+		times.append(time.perf_counter() - t0)
+	modules = imported_modules(args)
+	return {
+		'best_ms': min(times) * 1000,
+		'median_ms': statistics.median(times) * 1000,
+		'modules': len(modules),
+		'lda_modules': sorted(m for m in modules if m == 'lda' or m.startswith('lda.')),
+	}
+
+
+def compare(current, baseline, threshold):
+	"""
+	Return a list of regression messages: modes whose best time grew by more
+	than `threshold` (a fraction), or that import more compiler modules.
+	"""
+	regressions = []
+	for mode, figures in sorted(current.items()):
+		old = baseline.get(mode)
+		if old is None:
+			continue
+		if figures['best_ms'] > old['best_ms'] * (1 + threshold):
+			regressions.append("{}: {:.1f} ms, was {:.1f}".format(
+					mode, figures['best_ms'], old['best_ms']))
+		extra = sorted(set(figures['lda_modules']) - set(old['lda_modules']))
+		if extra:
+			regressions.append("{}: now imports {}".format(mode, ", ".join(extra)))
+	return regressions
+
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Benchmark the compiler's startup time.")
+	ap.add_argument('modes', metavar='MODE', nargs='*',
+			help="modes to run (all by default): " + ", ".join(MODES))
+	ap.add_argument('--repeat', type=int, default=10,
+			help="number of timed runs per mode")
+	ap.add_argument('--threshold', type=float, default=0.2,
+			help="relative slowdown flagged as a regression")
+	ap.add_argument('--baselines', default=BASELINES,
+			help="baselines file")
+	ap.add_argument('--save', action='store_true',
+			help="store the results as the new baselines")
+	args = ap.parse_args(argv)
+	for m in args.modes:
+		if m not in MODES:
+			ap.error("unknown mode: " + m)
+
+	current = {}
+	print("{:<12} {:>9} {:>9} {:>8} {:>12}".format(
+			"mode", "best ms", "median ms", "modules", "lda modules"))
+	for mode in args.modes or MODES:
+		current[mode] = f = measure(MODES[mode], args.repeat)
+		print("{:<12} {:9.1f} {:9.1f} {:8} {:12}".format(mode, f['best_ms'],
+				f['median_ms'], f['modules'], len(f['lda_modules'])), flush=True)
+
+	try:
+		with open(args.baselines, 'rt') as f:
+			baseline = json.load(f)
+	except FileNotFoundError:
+		baseline = {}
+	regressions = compare(current, baseline, args.threshold)
+	for message in regressions:
+		print("REGRESSION: " + message)
+	if args.save:
+		baseline.update(current)
+		os.makedirs(os.path.dirname(args.baselines), exist_ok=True)
+		with open(args.baselines, 'wt') as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		return 0
+	return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Synthetic LDA program generator.
+
+generate(Shape(...)) returns the source code of a valid LDA program, whose
+size and shape are controlled by the Shape's parameters. The same Shape
+(including its seed) always yields the same program.
+
+Generated programs are meant to be compiled, not run: they terminate, but
+they don't compute anything meaningful.
+"""
+
+import random
+
+
+class Shape:
+	"""
+	Parameters of a synthetic program.
+
+	- functions: number of functions (each one may call the previous ones)
+	- statements: number of statements in each function's body
+	- depth: maximum nesting depth of control structures (si, pour, tantque)
+	- expr_depth: maximum depth of arithmetic expressions
+	- composites: number of composite types
+	- dims: dimensions of each function's local array (0 for no array)
+	- seed: random seed
+	"""
+
+	def __init__(self, functions=10, statements=20, depth=3, expr_depth=3,
+			composites=2, dims=2, seed=0):
+		self.functions = functions
+		self.statements = statements
+		self.depth = depth
+		self.expr_depth = expr_depth
+		self.composites = composites
+		self.dims = dims
+		self.seed = seed
+
+	def scaled(self, factor):
+		"""
+		Return a copy of this shape with factor times as many functions.
+		"""
+		shape = Shape(**vars(self))
+		shape.functions = max(1, int(self.functions * factor))
+		return shape
+
+	def json(self):
+		return dict(vars(self))
+
+	def __repr__(self):
+		return "Shape({})".format(", ".join(
+				"{}={}".format(k, v) for k, v in vars(self).items()))
+
+
+# Bounds of each dimension of the local arrays
+ARRAY_LEN = 3
+
+
+class Generator:
+	def __init__(self, shape):
+		self.shape = shape
+		self.rng = random.Random(shape.seed)
+		self.lines = []
+		self.indent = 0
+		# index of the function being generated (i.e. number of previous ones)
+		self.fn = 0
+		# optional locals used by the function being generated (loop
+		# counters and the array): unused variables are errors in LDA
+		self.used = set()
+
+	def line(self, text):
+		self.lines.append("\t" * self.indent + text)
+
+	#------------------------------------------------------------------
+	# Expressions
+
+	def int_leaf(self, loop_depth):
+		s = self.shape
+		choices = ["literal", "x", "k", "r"]
+		if loop_depth:
+			choices.append("counter")
+		if s.dims:
+			choices.append("array")
+		if s.composites:
+			choices += ["member", "param"]
+		if self.fn:
+			choices.append("call")
+		kind = self.rng.choice(choices)
+		if kind == "literal":
+			return str(self.rng.randint(0, 99))
+		if kind == "counter":
+			return self.use("c{}".format(self.rng.randrange(loop_depth)))
+		if kind == "array":
+			return self.array_element()
+		if kind == "member":
+			return "m{}.a".format(self.rng.randrange(s.composites))
+		if kind == "param":
+			return "p.a"
+		if kind == "call":
+			return self.call(self.rng.randrange(self.fn), loop_depth)
+		return kind
+
+	def int_expr(self, depth, loop_depth):
+		if depth <= 0 or self.rng.random() < 0.2:
+			return self.int_leaf(loop_depth)
+		lhs = self.int_expr(depth - 1, loop_depth)
+		rhs = self.int_expr(self.rng.randrange(depth), loop_depth)
+		op = self.rng.choice(("+", "-", "*", "mod"))
+		if op == "mod":
+			# keep the divisor away from zero
+			rhs = "(({0}) * ({0}) + 1)".format(rhs)
+		expr = "{} {} {}".format(lhs, op, rhs)
+		return "(" + expr + ")" if self.rng.random() < 0.5 else expr
+
+	def bool_expr(self, loop_depth):
+		d = max(1, self.shape.expr_depth - 1)
+		expr = "{} {} {}".format(self.int_expr(d, loop_depth),
+				self.rng.choice(("<", "<=", ">", ">=", "=", "!=")),
+				self.int_expr(d, loop_depth))
+		r = self.rng.random()
+		if r < 0.2:
+			return "non ({})".format(expr)
+		if r < 0.4:
+			return "{} {} vrai".format(expr, self.rng.choice(("et", "ou")))
+		return expr
+
+	def use(self, name):
+		self.used.add(name)
+		return name
+
+	def array_element(self):
+		return self.use("t") + "[{}]".format(", ".join(str(self.rng.randint(1, ARRAY_LEN))
+				for _ in range(self.shape.dims)))
+
+	def call(self, i, loop_depth):
+		args = [self.int_expr(1, loop_depth)]
+		if self.shape.composites:
+			args.append("m{}".format(i % self.shape.composites))
+		return "f{}({})".format(i, ", ".join(args))
+
+	#------------------------------------------------------------------
+	# Statements
+
+	def lvalue(self):
+		s = self.shape
+		choices = ["k", "r"]
+		if s.dims:
+			choices.append("array")
+		if s.composites:
+			choices += ["member", "param"]
+		kind = self.rng.choice(choices)
+		if kind == "array":
+			return self.array_element()
+		if kind == "member":
+			return "m{}.a".format(self.rng.randrange(s.composites))
+		if kind == "param":
+			return "p.a"
+		return kind
+
+	def block(self, budget, loop_depth, nesting):
+		"""
+		Generate `budget` statements (counting nested ones).
+		"""
+		while budget > 0:
+			budget -= 1
+			if nesting < self.shape.depth and budget >= 2 and self.rng.random() < 0.3:
+				inner = self.rng.randint(1, min(budget, 2 + self.shape.statements // 4))
+				budget -= inner
+				self.compound(inner, loop_depth, nesting)
+			else:
+				self.simple(loop_depth)
+
+	def simple(self, loop_depth):
+		if self.rng.random() < 0.1:
+			self.line("écrire({})".format(self.int_expr(self.shape.expr_depth, loop_depth)))
+		else:
+			self.line("{} <- {}".format(self.lvalue(),
+					self.int_expr(self.shape.expr_depth, loop_depth)))
+
+	def compound(self, inner, loop_depth, nesting):
+		kind = self.rng.choice(("si", "pour", "tantque"))
+		if kind == "si":
+			branches = self.rng.randint(1, min(3, inner))
+			sizes = [inner // branches] * branches
+			sizes[0] += inner - sum(sizes)
+			for i, size in enumerate(sizes):
+				if i == 0:
+					self.line("si {} alors".format(self.bool_expr(loop_depth)))
+				elif i == branches - 1 and branches > 1 and self.rng.random() < 0.5:
+					self.line("sinon")
+				else:
+					self.line("snsi {} alors".format(self.bool_expr(loop_depth)))
+				self.indent += 1
+				self.block(size, loop_depth, nesting + 1)
+				self.indent -= 1
+			self.line("fsi")
+		elif kind == "pour":
+			self.line("pour {} de 1 jusque {} faire".format(self.use("c{}".format(loop_depth)),
+					self.rng.randint(1, ARRAY_LEN)))
+			self.indent += 1
+			self.block(inner, loop_depth + 1, nesting + 1)
+			self.indent -= 1
+			self.line("fpour")
+		else:
+			self.line("{} <- 0".format(self.use("w{}".format(nesting))))
+			self.line("tantque w{} < {} faire".format(nesting, self.rng.randint(1, 3)))
+			self.indent += 1
+			self.line("w{0} <- w{0} + 1".format(nesting))
+			self.block(inner, loop_depth, nesting + 1)
+			self.indent -= 1
+			self.line("ftant")
+
+	#------------------------------------------------------------------
+	# Declarations
+
+	def locals(self, extra=()):
+		s = self.shape
+		self.line("lexique")
+		self.indent += 1
+		for decl in extra:
+			self.line(decl)
+		self.line("k: entier")
+		self.line("r: entier")
+		for i in range(s.depth):
+			for v in ("c{}".format(i), "w{}".format(i)):
+				if v in self.used:
+					self.line(v + ": entier")
+		for i in range(s.composites):
+			self.line("m{0}: Moule{0}".format(i))
+		if "t" in self.used:
+			self.line("t: tableau entier[{}]".format(", ".join(
+					["1..{}".format(ARRAY_LEN)] * s.dims)))
+		self.indent -= 1
+
+	def initializations(self):
+		if self.fn == self.shape.functions:
+			# algorithm: x and p aren't parameters
+			self.line("x <- 1")
+			if self.shape.composites:
+				self.line("p.a <- 0")
+		for v in ("k", "r"):
+			self.line(v + " <- 0")
+		for i in range(self.shape.composites):
+			self.line("m{}.a <- 0".format(i))
+
+	def body(self, extra_locals=()):
+		"""
+		Generate a lexicon and a body. The body is generated first, so that
+		the lexicon only declares the variables that it uses.
+		"""
+		lines, self.lines = self.lines, []
+		self.used = set()
+		self.indent += 1
+		self.initializations()
+		self.block(self.shape.statements, 0, 0)
+		self.indent -= 1
+		body, self.lines = self.lines, lines
+		self.locals(extra_locals)
+		self.line("début")
+		self.lines += body
+
+	def function(self, i):
+		s = self.shape
+		self.fn = i
+		params = ["x: entier"]
+		if s.composites:
+			params.append("p: inout Moule{}".format(i % s.composites))
+		self.line("fonction f{}({}): entier".format(i, ", ".join(params)))
+		self.body()
+		self.line("\tretourne r")
+		self.line("fin")
+		self.line("")
+
+	def module(self):
+		s = self.shape
+		if s.composites:
+			self.line("lexique")
+			for i in range(s.composites):
+				self.line("\tMoule{} = <a: entier, b: réel, c: booléen, d: chaîne>".format(i))
+			self.line("")
+		for i in range(s.functions):
+			self.function(i)
+		self.fn = s.functions
+		self.line("algorithme")
+		self.body(["x: entier"] + (["p: Moule0"] if s.composites else []))
+		self.line("fin")
+		return "\n".join(self.lines) + "\n"
+
+
+def generate(shape):
+	"""
+	Return the source code of a synthetic program of the given Shape.
+	"""
+	return Generator(shape).module()
@@ -0,0 +1,192 @@
+"""
+Compiler throughput benchmark.
+
+Synthetic programs (see bench/synth.py) are compiled at several scale points.
+For each phase (parse, check, translate), the benchmark measures throughput
+in tokens and syntax tree nodes per second (best of several runs), and the
+peak memory allocated during the phase (with tracemalloc, in a separate run,
+since tracing slows everything down).
+
+Results are compared against stored baselines: a phase whose throughput
+drops, or whose peak memory grows, by more than the threshold is flagged as
+a regression, and the exit status is 1. The 'x1', 'x4', 'x16' points only
+differ by their number of functions: their nodes/s should stay about the
+same, and a phase that slows down as programs grow is flagged as
+superlinear.
+
+Baselines depend on the machine: run with --save on a quiet machine to record
+new ones.
+
+Usage:
+	python -m bench.throughput [--save] [--threshold 0.2] [--repeat 3] [POINT...]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from lda import DefaultOptions, translate_tree
+from lda.profiling import parse, check
+from lda.telemetry import walk
+from bench.synth import Shape, generate
+
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines", "throughput.json")
+
+BASE = Shape(functions=10, statements=20, depth=3, expr_depth=3, composites=2, dims=2)
+
+POINTS = {
+	'x1': BASE,
+	'x4': BASE.scaled(4),
+	'x16': BASE.scaled(16),
+	'deep-nesting': Shape(functions=10, statements=80, depth=12, expr_depth=2),
+	'deep-expressions': Shape(functions=10, statements=10, depth=1, expr_depth=8),
+	'many-composites': Shape(functions=10, statements=20, composites=40, dims=4),
+}
+
+# Points that only differ by their size, from smallest to largest
+SCALING = ('x1', 'x4', 'x16')
+
+PHASES = ('parse', 'check', 'translate')
+
+TOKEN = re.compile(r"\w+|<-|<=|>=|!=|\.\.|\S")
+
+
+def count_tokens(buf):
+	return len(TOKEN.findall(buf))
+
+
+def phases(options, buf):
+	"""
+	Yield (phase name, setup, run) triples, as in lda.profiling.iteration.
+	"""
+	yield 'parse', (lambda: None), (lambda _: parse(options, buf, None))
+	yield 'check', (lambda: parse(options, buf, None)), (lambda m: check(options, buf, m))
+	module = check(options, buf, parse(options, buf, None))
+	yield 'translate', (lambda: module), (lambda m: translate_tree(options, m, 'js'))
+
+
+def measure(shape, repeat=3):
+	"""
+	Benchmark a shape, and return a dict of figures for each phase.
+	"""
+	options = DefaultOptions()
+	options.stats_comment = False
+	buf = generate(shape)
+	tokens = count_tokens(buf)
+	nodes = sum(1 for _ in walk(parse(options, buf, None)))
+	results = {}
+	for name, setup, run in phases(options, buf):
+		best = float('inf')
+		for _ in range(repeat):
+			arg = setup()
+			t0 = time.perf_counter()
+			run(arg)
+			best = min(best, time.perf_counter() - t0)
+		arg = setup()
+		tracemalloc.start()
+		run(arg)
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		results[name] = {
+			'seconds': best,
+			'tokens_per_s': tokens / best,
+			'nodes_per_s': nodes / best,
+			'peak_kib': peak / 1024,
+		}
+	return {'shape': shape.json(), 'tokens': tokens, 'nodes': nodes, 'phases': results}
+
+
+def compare(current, baseline, threshold):
+	"""
+	Return a list of regression messages: phases whose throughput dropped or
+	whose peak memory grew by more than `threshold` (a fraction).
+	"""
+	regressions = []
+	for point, record in sorted(current.items()):
+		base = baseline.get(point)
+		if base is None or base['shape'] != record['shape']:
+			continue
+		for phase, figures in sorted(record['phases'].items()):
+			old = base['phases'].get(phase)
+			if old is None:
+				continue
+			if figures['nodes_per_s'] < old['nodes_per_s'] * (1 - threshold):
+				regressions.append("{} {}: {:.0f} nodes/s, was {:.0f}".format(
+						point, phase, figures['nodes_per_s'], old['nodes_per_s']))
+			if figures['peak_kib'] > old['peak_kib'] * (1 + threshold):
+				regressions.append("{} {}: {:.0f} KiB peak, was {:.0f}".format(
+						point, phase, figures['peak_kib'], old['peak_kib']))
+	return regressions
+
+
+def superlinear(current, threshold):
+	"""
+	Return a list of messages about phases whose throughput drops as the
+	SCALING points grow.
+	"""
+	points = [p for p in SCALING if p in current]
+	if len(points) < 2:
+		return []
+	small, large = current[points[0]], current[points[-1]]
+	messages = []
+	for phase in PHASES:
+		ratio = large['phases'][phase]['nodes_per_s'] / small['phases'][phase]['nodes_per_s']
+		if ratio < 1 - threshold:
+			messages.append("{}: {} is {:.1f}x slower per node than {}".format(
+					phase, points[-1], 1 / ratio, points[0]))
+	return messages
+
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Benchmark the compiler's throughput.")
+	ap.add_argument('points', metavar='POINT', nargs='*',
+			help="scale points to run (all by default): " + ", ".join(POINTS))
+	ap.add_argument('--repeat', type=int, default=3,
+			help="number of timed runs per phase (the best one is kept)")
+	ap.add_argument('--threshold', type=float, default=0.2,
+			help="relative slowdown or memory growth flagged as a regression")
+	ap.add_argument('--baselines', default=BASELINES,
+			help="baselines file")
+	ap.add_argument('--save', action='store_true',
+			help="store the results as the new baselines")
+	args = ap.parse_args(argv)
+	for p in args.points:
+		if p not in POINTS:
+			ap.error("unknown scale point: " + p)
+
+	current = {}
+	print("{:<18} {:<10} {:>9} {:>12} {:>12} {:>10}".format(
+			"point", "phase", "ms", "tokens/s", "nodes/s", "peak KiB"))
+	for point in args.points or POINTS:
+		current[point] = record = measure(POINTS[point], args.repeat)
+		for phase, f in record['phases'].items():
+			print("{:<18} {:<10} {:9.1f} {:12.0f} {:12.0f} {:10.0f}".format(
+					point, phase, f['seconds'] * 1000, f['tokens_per_s'],
+					f['nodes_per_s'], f['peak_kib']), flush=True)
+
+	try:
+		with open(args.baselines, 'rt') as f:
+			baseline = json.load(f)
+	except FileNotFoundError:
+		baseline = {}
+	regressions = compare(current, baseline, args.threshold)
+	for message in superlinear(current, args.threshold):
+		print("SUPERLINEAR: " + message)
+	for message in regressions:
+		print("REGRESSION: " + message)
+	if args.save:
+		baseline.update(current)
+		os.makedirs(os.path.dirname(args.baselines), exist_ok=True)
+		with open(args.baselines, 'wt') as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		return 0
+	return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Grade a compiled LDA program against a series of test cases.
+
+Test cases are sessions written in the same format as in the snippets (see
+tests/test_snippets.py):
+
+	(*|output 1 | keyboard input 1 | output2 | keyboard input 2 | output 3 |*)
+
+All test cases of a program are run by a single JS runtime: the program is
+translated once, and then run once per test case with a fresh `P` namespace,
+so that no state leaks from one test case to the next.
+"""
+
+import copy
+import json
+import re
+import jsshell
+from lda import DefaultOptions, translate_tree
+
+
+# (*| session |*) -- the delimiters are optional
+SESSION_DELIMITERS = re.compile(r"^\s*\(\*\|(.*)\|\*\)\s*$", re.DOTALL)
+
+
+class Case:
+	"""
+	Test case: keyboard input and expected output.
+	"""
+
+	def __init__(self, inputstr, expected):
+		self.inputstr = inputstr
+		self.expected = expected
+
+	def __repr__(self):
+		return "Case({!r}, {!r})".format(self.inputstr, self.expected)
+
+
+class Result:
+	"""
+	Outcome of running a test case.
+
+	- output: what the program printed (stripped)
+	- error: message of the exception that stopped the program, or None
+	- elapsed: running time in seconds
+	"""
+
+	def __init__(self, case, output, error, elapsed):
+		self.case = case
+		self.output = output
+		self.error = error
+		self.elapsed = elapsed
+
+	@property
+	def passed(self):
+		return self.error is None and self.output == self.case.expected
+
+	def __repr__(self):
+		return "<{} {} ({:.1f} ms)>".format("passed" if self.passed else "failed",
+				self.case, self.elapsed * 1000)
+
+
+def parse_session(session):
+	"""
+	Turn a session (with or without its `(*|` and `|*)` delimiters) into a
+	Case. Outputs and inputs alternate, separated by `|`.
+	"""
+	m = SESSION_DELIMITERS.match(session)
+	if m:
+		session = m.group(1)
+	fragments = session.strip().split('|')
+	expected = ' '.join(f.strip() for f in fragments[0::2])
+	inputstr = '\n'.join(f.strip() for f in fragments[1::2])
+	return Case(inputstr, expected)
+
+
+# Runs every test case against a fresh instance of the program. The compiled
+# program is wrapped in a function so that each call creates a new `P`.
+DRIVER = """
+(function() {{
+	var program = function() {{
+{code}
+		return P;
+	}};
+	var cases = {inputs};
+	var results = [];
+	for (var i = 0; i < cases.length; i++) {{
+		var output = [];
+		var input = cases[i] === ""? []: cases[i].split("\\n");
+		LDA.print = function() {{
+			output.push(Array.prototype.map.call(arguments, String).join(" ") + "\\n");
+		}};
+		LDA.prompt = function(message) {{
+			output.push(message);
+			return input.length? input.shift(): null;
+		}};
+		{budget}
+		var error = null;
+		var t0 = Date.now();
+		try {{
+			program().main();
+		}} catch (e) {{
+			error = String(e);
+		}}
+		results.push({{output: output.join(""), error: error, elapsed: Date.now() - t0}});
+	}}
+	putstr(JSON.stringify(results));
+}})();
+"""
+
+
+def grade(module, sessions, max_steps=None, options=None):
+	"""
+	Run a checked module against test cases, and return a list of Results.
+
+	- sessions: Case instances, or session strings (see parse_session).
+	- max_steps: instruction budget of each test case (see LDA.setBudget).
+	  If None, programs may run until the JS worker pool times out (see
+	  jsshell.Pool), which raises TimeoutError.
+	- options: compiler options (DefaultOptions if None).
+	"""
+	cases = [s if isinstance(s, Case) else parse_session(s) for s in sessions]
+	options = copy.copy(options) if options is not None else DefaultOptions()
+	options.stats_comment = False
+	options.extra_js_code = ""
+	options.budget = max_steps is not None
+	code = translate_tree(options, module, 'js')
+	driver = DRIVER.format(
+			code=code,
+			inputs=json.dumps([c.inputstr.strip() for c in cases]),
+			budget="LDA.setBudget({});".format(max_steps) if options.budget else "")
+	output, error = jsshell.pool.run(driver)
+	if error is not None:
+		raise RuntimeError("grading driver failed: " + error)
+	return [Result(case, r['output'].replace("\r", "").strip(), r['error'],
+			r['elapsed'] / 1000)
+			for case, r in zip(cases, json.loads(output))]
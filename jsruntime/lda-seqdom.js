@@ -17,3 +17,20 @@ LDA.print = function(message) {
 	}
 };
 
+
+/*
+ * Programs compiled with instruction budget counters don't freeze the tab
+ * forever: every few seconds, ask the user whether to keep running.
+ */
+(function() {
+	var lastCheck = Date.now();
+	LDA.onYield = function() {
+		if (Date.now() - lastCheck < 5000) {
+			return;
+		}
+		if (!window.confirm("Le programme s'exécute depuis longtemps. Continuer ?")) {
+			throw new LDA.InterruptedException();
+		}
+		lastCheck = Date.now();
+	};
+})();
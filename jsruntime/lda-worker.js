@@ -0,0 +1,79 @@
+/*
+ * Long-lived SpiderMonkey worker, used by jsshell.Pool to run many programs
+ * without spawning a new shell (and loading the runtime) for each of them.
+ *
+ * Protocol: one JSON object per line in each direction.
+ * - request on stdin:   {"code": "...", "input": "..."}
+ * - response on stdout: {"output": "...", "error": null or "message"}
+ *
+ * Each program runs in a fresh global, into which the runtime is loaded
+ * anew, so that no state leaks from one run to the next. The program's
+ * output and keyboard input are captured instead of going to the worker's
+ * own stdout and stdin, which carry the protocol.
+ *
+ * Setting up a global takes most of the time of a short run, so the global
+ * of the next run is prepared while the worker waits for its request.
+ */
+
+(function() {
+	var RUNTIME = [
+		read('jsruntime/lda.js'),
+		read('jsruntime/lda-spidermonkey.js')
+	];
+
+	// Output and keyboard input of the current run.
+	var output = [];
+	var input = [];
+
+	// Keep responses ASCII-only, whatever encoding the shell writes with.
+	function encode(object) {
+		return JSON.stringify(object).replace(/[\u007f-\uffff]/g, function(c) {
+			return "\\u" + ("000" + c.charCodeAt(0).toString(16)).slice(-4);
+		});
+	}
+
+	// Make a fresh global with the runtime loaded. The I/O functions must be
+	// in place beforehand: the runtime keeps references to them.
+	function prepare() {
+		var sandbox = newGlobal();
+		sandbox.putstr = function(s) {
+			output.push(String(s));
+		};
+		sandbox.print = function() {
+			output.push(Array.prototype.map.call(arguments, String).join(" ") + "\n");
+		};
+		sandbox.readline = function() {
+			return input.length? input.shift(): null;
+		};
+		for (var i = 0; i < RUNTIME.length; i++) {
+			sandbox.eval(RUNTIME[i]);
+		}
+		return sandbox;
+	}
+
+	function execute(request, sandbox) {
+		output = [];
+		input = request.input === ""? []: request.input.split("\n");
+		try {
+			(sandbox || prepare()).eval(request.code);
+			return {output: output.join(""), error: null};
+		} catch (e) {
+			return {output: output.join(""), error: String(e)};
+		}
+	}
+
+	var next = null;
+	for (;;) {
+		var line = readline();
+		if (line === null) {
+			break;
+		}
+		print(encode(execute(JSON.parse(line), next)));
+		try {
+			next = prepare();
+		} catch (e) {
+			// execute() will try again and report the error
+			next = null;
+		}
+	}
+})();
@@ -39,6 +39,65 @@ LDA.InterruptedException = function() {
 	this.name = "LDAInterruptedException";
 };
 
+/**
+ * Thrown when a program compiled with instruction budget counters has used
+ * up its budget (see LDA.setBudget).
+ */
+LDA.BudgetExceeded = function(message) {
+	this.name = "LDABudgetExceeded";
+	this.message = message;
+};
+
+LDA.RuntimeError.prototype.toString =
+LDA.InterruptedException.prototype.toString =
+LDA.BudgetExceeded.prototype.toString = function() {
+	return this.message? this.name + ": " + this.message: this.name;
+};
+
+
+///////////////////////////////////////////////////////////////////////
+//
+// INSTRUCTION BUDGET
+//
+// When a program is compiled with budget counters, one step is consumed at
+// each loop iteration and each function call, through the following line:
+//
+//     if (--LDA.countdown <= 0) LDA.checkpoint();
+//
+// Checkpoints occur every `LDA.yieldInterval` steps; they enforce the
+// budget and call the optional `LDA.onYield` hook, which lets the host
+// environment regain control cooperatively (e.g. to enforce a time limit by
+// throwing an exception).
+//
+///////////////////////////////////////////////////////////////////////
+
+LDA.budget = Infinity;
+LDA.yieldInterval = 10000;
+LDA.onYield = null;
+LDA.slice = 0;
+LDA.countdown = 0;
+
+/**
+ * Set the maximum number of steps the program may consume from now on.
+ */
+LDA.setBudget = function(steps) {
+	LDA.budget = steps;
+	LDA.slice = 0;
+	LDA.countdown = 0;
+};
+
+LDA.checkpoint = function() {
+	LDA.budget -= LDA.slice - LDA.countdown;
+	if (LDA.budget < 0) {
+		throw new LDA.BudgetExceeded("instruction budget exceeded");
+	}
+	if (LDA.onYield) {
+		LDA.onYield();
+	}
+	LDA.slice = Math.min(LDA.yieldInterval, LDA.budget);
+	LDA.countdown = LDA.slice;
+};
+
 
 ///////////////////////////////////////////////////////////////////////
 //
@@ -190,6 +249,26 @@ LDA.Array.prototype.set = function(indices, value, n) {
 };
 
 
+///////////////////////////////////////////////////////////////////////
+//
+// STRINGS
+//
+///////////////////////////////////////////////////////////////////////
+
+/**
+ * String subscript operator.
+ *
+ * Runtime check: ensure the index lies within the string, like array
+ * indices. (Plain JavaScript would return undefined.)
+ */
+LDA.charAt = function(string, index) {
+	if (LDA.pedantic && (index < 0 || index >= string.length)) {
+		throw new LDA.RuntimeError("string index out of bounds");
+	}
+	return string[index];
+};
+
+
 ///////////////////////////////////////////////////////////////////////
 //
 // TYPED INPUT FUNCTIONS
@@ -200,11 +279,17 @@ LDA.Array.prototype.set = function(indices, value, n) {
 //
 ///////////////////////////////////////////////////////////////////////
 
+LDA.gen = {};
+
 (function() {
+	function invalid(v) {
+		return typeof v === 'undefined' || (typeof v === 'number' && isNaN(v));
+	}
+
 	function genericRead(promptMessage, convert) {
 		return function() {
 			var v = convert(LDA.prompt(promptMessage));
-			while (typeof v === 'undefined' || (typeof v === 'number' && isNaN(v))) {
+			while (invalid(v)) {
 				LDA.print("Mauvais type ! Recommencez, SVP.");
 				v = convert(LDA.prompt(promptMessage));
 			}
@@ -212,14 +297,118 @@ LDA.Array.prototype.set = function(indices, value, n) {
 		};
 	};
 
-	LDA.readStr  = function(){return LDA.prompt('cha\u00EEne> ');};
-	LDA.readInt  = genericRead('entier> ', parseInt);
-	LDA.readReal = genericRead('r\u00E9el> ', parseFloat);
-	LDA.readBool = genericRead('bool\u00E9en> ', function(line) {
-		return LDA.booleanLiterals[line.toLowerCase()];
-	});
-	LDA.readChar = genericRead('caract\u00E8re> ', function(line) {
-		return line.length === 1? line: undefined;
-	});
+	// Generator counterpart of genericRead: instead of calling LDA.prompt,
+	// yield the prompt message and expect to be resumed with the input line.
+	function genericReadGen(promptMessage, convert) {
+		return function*() {
+			var v = convert(yield promptMessage);
+			while (invalid(v)) {
+				LDA.print("Mauvais type ! Recommencez, SVP.");
+				v = convert(yield promptMessage);
+			}
+			return v;
+		};
+	};
+
+	var readers = {
+		Str:  ['cha\u00EEne> ', function(line) {
+			return line;
+		}],
+		Int:  ['entier> ', parseInt],
+		Real: ['r\u00E9el> ', parseFloat],
+		Bool: ['bool\u00E9en> ', function(line) {
+			return LDA.booleanLiterals[line.toLowerCase()];
+		}],
+		Char: ['caract\u00E8re> ', function(line) {
+			return line.length === 1? line: undefined;
+		}]
+	};
+
+	for (var type in readers) {
+		LDA['read' + type] = genericRead(readers[type][0], readers[type][1]);
+		LDA.gen['read' + type] = genericReadGen(readers[type][0], readers[type][1]);
+	}
 })();
 
+
+///////////////////////////////////////////////////////////////////////
+//
+// GENERATOR-BASED EXECUTION
+//
+// Programs compiled in generator mode (`ldac --generators`) never block on
+// input: P.main() returns a generator, which yields a prompt message each
+// time the program needs a line of input, and must then be resumed with that
+// line. Many such programs can thus be interleaved in a single thread.
+//
+///////////////////////////////////////////////////////////////////////
+
+/**
+ * Run a generator-compiled program to completion, reading input with the
+ * (blocking) LDA.prompt function.
+ */
+LDA.runSync = function(generator) {
+	var r = generator.next();
+	while (!r.done) {
+		r = generator.next(LDA.prompt(r.value));
+	}
+	return r.value;
+};
+
+/**
+ * Interactive session of a generator-compiled program.
+ *
+ * - generator: the generator returned by the program's P.main(). To run
+ *   several sessions of the same program at once, evaluate the program once
+ *   per session, so that each session gets its own `P` namespace.
+ * - output: function receiving everything the program prints, including
+ *   prompt messages.
+ *
+ * Call resume() to start the program, then resume(line) whenever a line of
+ * input is available. While a session runs, LDA.print is redirected to its
+ * output, and its instruction budget (see LDA.setBudget) is swapped in.
+ */
+LDA.Session = function(generator, output) {
+	this.generator = generator;
+	this.output = output;
+	this.prompt = null;
+	this.done = false;
+	this.budget = [Infinity, 0, 0];
+};
+
+/**
+ * Run the program until it needs input or finishes. Return true if the
+ * program is waiting for input (its prompt message is in `this.prompt`).
+ */
+LDA.Session.prototype.resume = function(input) {
+	var self = this;
+	var print = LDA.print;
+	var budget = [LDA.budget, LDA.slice, LDA.countdown];
+	var r;
+	LDA.print = function(message) {
+		self.output(message + "\n");
+	};
+	LDA.budget = this.budget[0];
+	LDA.slice = this.budget[1];
+	LDA.countdown = this.budget[2];
+	try {
+		r = this.generator.next(input);
+	} catch (e) {
+		this.done = true;
+		throw e;
+	} finally {
+		this.budget = [LDA.budget, LDA.slice, LDA.countdown];
+		LDA.budget = budget[0];
+		LDA.slice = budget[1];
+		LDA.countdown = budget[2];
+		LDA.print = print;
+	}
+	if (r.done) {
+		this.done = true;
+		this.prompt = null;
+	} else {
+		this.prompt = r.value;
+		this.output(r.value);
+	}
+	return !this.done;
+};
+
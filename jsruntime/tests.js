@@ -146,3 +146,57 @@ test("unordered bounds must fail", function() {
 
 })();
 
+
+
+/*********************************************************************
+ * TEST INSTRUCTION BUDGET
+ *********************************************************************/
+
+(function() {
+	function step() {
+		if (--LDA.countdown <= 0) LDA.checkpoint();
+	}
+
+	module("Instruction budget", {
+		teardown: function() {
+			LDA.setBudget(Infinity);
+			LDA.onYield = null;
+			LDA.yieldInterval = 10000;
+		}
+	});
+
+	test("budget allows exactly the given number of steps", function() {
+		LDA.setBudget(25);
+		LDA.yieldInterval = 10;
+		for (var i = 0; i < 25; i++) {
+			step();
+		}
+		throws(step, LDA.BudgetExceeded);
+	});
+
+	test("onYield is called at each checkpoint", function() {
+		var yields = 0;
+		LDA.yieldInterval = 10;
+		LDA.onYield = function() { yields++; };
+		LDA.setBudget(Infinity);
+		for (var i = 0; i < 100; i++) {
+			step();
+		}
+		strictEqual(yields, 10);
+	});
+
+	module("Generator sessions");
+
+	test("session stops at each input request", function() {
+		var out = "";
+		var s = new LDA.Session((function*() {
+			LDA.print((yield* LDA.gen.readInt()) * 2);
+		})(), function(text) { out += text; });
+		ok(s.resume());
+		strictEqual(s.prompt, "entier> ");
+		ok(s.resume("abc"));
+		ok(!s.resume("21"));
+		ok(s.done);
+		strictEqual(out, "entier> Mauvais type ! Recommencez, SVP.\nentier> 42\n");
+	});
+})();
@@ -7,21 +7,38 @@ JSSHELL environment variable.
 Requires a recent version of the SpiderMonkey shell (JavaScript-C27.0a1 was
 used during development).
 https://ftp.mozilla.org/pub/mozilla.org/firefox/nightly/latest-trunk/
+
+run() doesn't spawn a new shell for each program: it hands programs over to a
+pool of long-lived shells (see Pool and jsruntime/lda-worker.js).
+
+stream() and astream() yield a program's output as it is being printed, and
+stop the program if it prints too much.
+
+run_limited() runs a program under an execution Policy (CPU time, memory,
+wall-clock time and output size).
 """
 
 
+import codecs
+import json
+import queue
+import re
+import signal
 import subprocess
+import sys
+import threading
+import time
 import os
+try:
+	import resource
+except ImportError:
+	resource = None
 
 try:
 	JSSHELL = os.environ['JSSHELL']
 except KeyError:
 	JSSHELL = 'js'
 
-print("SpiderMonkey shell: {} "
-		"(you can override this path with the JSSHELL environment variable)"
-		.format(JSSHELL))
-
 
 def command(jscode):
 	return [JSSHELL, "-w", "-s", "-e",
@@ -29,15 +46,504 @@ def command(jscode):
 			"load('jsruntime/lda-spidermonkey.js');\n"
 			"{}\n").format(jscode)]
 
+class Worker:
+	"""
+	Long-lived shell running jsruntime/lda-worker.js. Each program is run in a
+	fresh global, so no state leaks from one run to the next.
+	"""
+
+	def __init__(self):
+		self.process = subprocess.Popen(
+				[JSSHELL, "-w", "-s", "jsruntime/lda-worker.js"],
+				stdin=subprocess.PIPE,
+				stdout=subprocess.PIPE)
+		self.runs = 0
+
+	def run(self, jscode, inputstr, timeout=None):
+		"""
+		Run a program and return a (output, error) tuple. `error` is None,
+		or the message of the exception that stopped the program.
+
+		If the program runs for more than `timeout` seconds, the worker is
+		killed and TimeoutError is raised. Raise BrokenPipeError if the worker
+		died.
+		"""
+		self.runs += 1
+		request = json.dumps({'code': jscode, 'input': inputstr})
+		try:
+			self.process.stdin.write(request.encode('ascii') + b"\n")
+			self.process.stdin.flush()
+		except OSError:
+			raise BrokenPipeError("JS worker died")
+		timer = None
+		timed_out = []
+		if timeout is not None:
+			def expire():
+				timed_out.append(True)
+				self.process.kill()
+			timer = threading.Timer(timeout, expire)
+			timer.start()
+		try:
+			line = self.process.stdout.readline()
+		finally:
+			if timer is not None:
+				timer.cancel()
+		if timed_out:
+			# even if the response came in just in time, the worker is dead
+			raise TimeoutError("JS program ran for more than {} s".format(timeout))
+		if not line:
+			raise BrokenPipeError("JS worker died")
+		response = json.loads(line.decode('ascii'))
+		return response['output'], response['error']
+
+	def close(self):
+		self.process.kill()
+		self.process.wait()
+		self.process.stdin.close()
+		self.process.stdout.close()
+
+
+class Pool:
+	"""
+	Pool of long-lived JS workers, safe to use from several threads.
+
+	- size: maximum number of workers (i.e. of programs running at once).
+	- max_runs: a worker is replaced after running that many programs.
+	- timeout: a program running for longer than that many seconds is
+	  stopped by killing its worker. None means no limit.
+
+	Workers are only started when needed. A worker that crashes or times out
+	is replaced.
+	"""
+
+	def __init__(self, size=4, max_runs=100, timeout=60):
+		self.size = size
+		self.max_runs = max_runs
+		self.timeout = timeout
+		self.idle = queue.LifoQueue()
+		self.slots = threading.BoundedSemaphore(size)
+
+	def run(self, jscode, inputstr=''):
+		"""
+		Run a program and return a (output, error) tuple, see Worker.run.
+		"""
+		with self.slots:
+			try:
+				worker = self.idle.get_nowait()
+			except queue.Empty:
+				worker = Worker()
+			try:
+				result = worker.run(jscode, inputstr, self.timeout)
+			except:
+				worker.close()
+				raise
+			if worker.runs >= self.max_runs:
+				worker.close()
+			else:
+				self.idle.put(worker)
+			return result
+
+	def close(self):
+		"""
+		Stop all idle workers.
+		"""
+		while True:
+			try:
+				self.idle.get_nowait().close()
+			except queue.Empty:
+				break
+
+
+pool = Pool()
+
+
 def run(jscode, inputstr='', shutup=False):
+	try:
+		output, error = pool.run(jscode, inputstr.strip())
+	except BrokenPipeError:
+		raise subprocess.CalledProcessError(-1, 'jsshell.run()')
+	except TimeoutError:
+		raise subprocess.TimeoutExpired('jsshell.run()', pool.timeout)
+	if error is not None:
+		if not shutup:
+			print("uncaught exception:", error, file=sys.stderr)
+		raise subprocess.CalledProcessError(3, 'jsshell.run()', output)
+	return output.replace("\r", "").strip()
+
+def run_interactive(jscode):
+	subprocess.Popen(command(jscode)).communicate()
+
+
+class OutputLimiter:
+	"""
+	Split a program's raw output into lines, and tell when it exceeds the
+	given number of bytes or lines (None means no limit).
+	"""
+
+	def __init__(self, max_bytes=None, max_lines=None):
+		self.max_bytes = max_bytes
+		self.max_lines = max_lines
+		self.bytes = 0
+		self.lines = 0
+		self.truncated = False
+		self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+	def feed(self, data):
+		"""
+		Return the lines in a chunk of output. The last line may lack its
+		newline if the program stopped writing in the middle of it (e.g. to
+		prompt for input). Once a limit is reached, set `truncated` and drop
+		the rest of the output.
+		"""
+		if self.max_bytes is not None and self.bytes + len(data) > self.max_bytes:
+			data = data[:self.max_bytes - self.bytes]
+			self.truncated = True
+		self.bytes += len(data)
+		lines = self.decoder.decode(data, final=self.truncated).replace("\r", "")
+		lines = lines.splitlines(keepends=True)
+		if self.max_lines is not None and self.lines + len(lines) > self.max_lines:
+			lines = lines[:self.max_lines - self.lines]
+			self.truncated = True
+		self.lines += len(lines)
+		return lines
+
+
+class Stream:
+	"""
+	Iterate over the output of a program, line by line, as it is being
+	printed. See stream().
+	"""
+
+	CHUNK_SIZE = 65536
+
+	def __init__(self, jscode, inputstr=None, max_bytes=None, max_lines=None):
+		self.process = subprocess.Popen(command(jscode),
+				stdin=subprocess.PIPE,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.DEVNULL)
+		self.limiter = OutputLimiter(max_bytes, max_lines)
+		if inputstr is not None:
+			# Feed the input from another thread, so that a program that
+			# doesn't read it all can't block us.
+			threading.Thread(target=self._feed, args=(inputstr,), daemon=True).start()
+
+	def _feed(self, inputstr):
+		try:
+			self.process.stdin.write(inputstr.encode('utf-8'))
+			self.process.stdin.close()
+		except OSError:
+			pass
+
+	def send(self, line):
+		"""
+		Send a line of keyboard input to the program.
+		"""
+		self.process.stdin.write(line.encode('utf-8') + b"\n")
+		self.process.stdin.flush()
+
+	def close_input(self):
+		self.process.stdin.close()
+
+	@property
+	def truncated(self):
+		return self.limiter.truncated
+
+	@property
+	def returncode(self):
+		return self.process.returncode
+
+	def __iter__(self):
+		try:
+			while not self.limiter.truncated:
+				data = self.process.stdout.read1(self.CHUNK_SIZE)
+				if not data:
+					break
+				yield from self.limiter.feed(data)
+		finally:
+			self.close()
+
+	def close(self):
+		"""
+		Stop the program if it is still running.
+		"""
+		if self.process.poll() is None:
+			self.process.kill()
+		self.process.wait()
+		for pipe in (self.process.stdin, self.process.stdout):
+			try:
+				pipe.close()
+			except OSError:
+				pass
+
+
+class AsyncStream:
+	"""
+	Asynchronous counterpart of Stream, to be used with `async for` (call
+	start() first). See astream().
+	"""
+
+	def __init__(self, jscode, inputstr=None, max_bytes=None, max_lines=None):
+		self.jscode = jscode
+		self.inputstr = inputstr
+		self.limiter = OutputLimiter(max_bytes, max_lines)
+		self.process = None
+
+	async def start(self):
+		import asyncio
+		self.process = await asyncio.create_subprocess_exec(*command(self.jscode),
+				stdin=asyncio.subprocess.PIPE,
+				stdout=asyncio.subprocess.PIPE,
+				stderr=asyncio.subprocess.DEVNULL)
+		if self.inputstr is not None:
+			self.process.stdin.write(self.inputstr.encode('utf-8'))
+			self.process.stdin.close()
+		return self
+
+	async def send(self, line):
+		self.process.stdin.write(line.encode('utf-8') + b"\n")
+		await self.process.stdin.drain()
+
+	def close_input(self):
+		self.process.stdin.close()
+
+	@property
+	def truncated(self):
+		return self.limiter.truncated
+
+	@property
+	def returncode(self):
+		return self.process.returncode
+
+	async def __aiter__(self):
+		try:
+			while not self.limiter.truncated:
+				data = await self.process.stdout.read(Stream.CHUNK_SIZE)
+				if not data:
+					break
+				for line in self.limiter.feed(data):
+					yield line
+		finally:
+			await self.close()
+
+	async def close(self):
+		if self.process.returncode is None:
+			self.process.kill()
+		await self.process.wait()
+
+
+def stream(jscode, inputstr=None, max_bytes=None, max_lines=None):
+	"""
+	Run a program in a shell of its own, and return a Stream yielding its
+	output lines as they arrive. Since the shell's output goes through a pipe,
+	a program that prints faster than the lines are consumed waits for them
+	to be consumed.
+
+	- inputstr: keyboard input, fed to the program all at once. If None,
+	  input may be sent line by line with Stream.send(), as the program
+	  prompts for it.
+	- max_bytes, max_lines: the program is killed as soon as its output
+	  exceeds either limit (the `truncated` attribute is then set).
+	"""
+	return Stream(jscode, inputstr, max_bytes, max_lines)
+
+async def astream(jscode, inputstr=None, max_bytes=None, max_lines=None):
+	"""
+	Asynchronous version of stream():
+
+		async for line in await jsshell.astream(code):
+			...
+	"""
+	return await AsyncStream(jscode, inputstr, max_bytes, max_lines).start()
+
+
+class Policy:
+	"""
+	Resource limits for run_limited(). None means no limit.
+
+	- cpu_seconds: CPU time (RLIMIT_CPU)
+	- address_space: virtual memory, in bytes (RLIMIT_AS)
+	- wall_timeout: real time, in seconds
+	- max_output: output size, in bytes
+	"""
+
+	def __init__(self, cpu_seconds=None, address_space=None, wall_timeout=None,
+			max_output=None):
+		self.cpu_seconds = cpu_seconds
+		self.address_space = address_space
+		self.wall_timeout = wall_timeout
+		self.max_output = max_output
+
+	def apply(self):
+		"""
+		Set the rlimits in the child process (called before exec).
+		"""
+		resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+		if self.cpu_seconds is not None:
+			# The soft limit sends SIGXCPU; the hard one, SIGKILL.
+			resource.setrlimit(resource.RLIMIT_CPU,
+					(self.cpu_seconds, self.cpu_seconds + 1))
+		if self.address_space is not None:
+			resource.setrlimit(resource.RLIMIT_AS,
+					(self.address_space, self.address_space))
+
+
+class Usage:
+	"""
+	Resources used by a run.
+
+	- cpu_time: user + system CPU time, in seconds
+	- max_rss: peak resident memory, in bytes
+	- wall_time: real time, in seconds
+	- output_bytes: size of the output
+	- returncode: exit status, or -N if killed by signal N
+	"""
+
+	def __init__(self, rusage, wall_time, output_bytes, returncode):
+		self.cpu_time = rusage.ru_utime + rusage.ru_stime
+		self.max_rss = rusage.ru_maxrss * 1024
+		self.wall_time = wall_time
+		self.output_bytes = output_bytes
+		self.returncode = returncode
+
+	def __repr__(self):
+		return ("<Usage cpu={:.3f}s rss={}KiB wall={:.3f}s output={}B returncode={}>"
+				.format(self.cpu_time, self.max_rss // 1024, self.wall_time,
+				self.output_bytes, self.returncode))
+
+
+class ExecutionError(Exception):
+	"""
+	Raised by run_limited() when a program doesn't run to completion. The
+	`output` and `usage` attributes tell what the program printed and used
+	until then.
+	"""
+
+	def __init__(self, message, output, usage):
+		super().__init__(message)
+		self.output = output
+		self.usage = usage
+
+class Timeout(ExecutionError):
+	"""
+	The program exceeded its CPU time or wall-clock time limit.
+	"""
+
+class OutOfMemory(ExecutionError):
+	"""
+	The program exceeded its memory limit.
+	"""
+
+class OutputLimitExceeded(ExecutionError):
+	"""
+	The program printed more than allowed.
+	"""
+
+class ProgramError(ExecutionError):
+	"""
+	The program was stopped by an uncaught exception (e.g. LDA.RuntimeError).
+	"""
+
+
+OUT_OF_MEMORY = re.compile(r"out of memory|allocation size overflow|bad_alloc", re.IGNORECASE)
+
+# The resource usage of a process killed by RLIMIT_CPU can fall a few
+# milliseconds short of the limit (seconds).
+CPU_ACCOUNTING_SLACK = 0.1
+
+def run_limited(jscode, inputstr='', policy=None):
+	"""
+	Run a program in a shell of its own under the given Policy, and return a
+	(output, Usage) tuple. Raise an ExecutionError subclass if the program
+	breaks the policy or fails.
+	"""
+	if policy is None:
+		policy = Policy()
+	t0 = time.monotonic()
 	process = subprocess.Popen(command(jscode),
 			stdin=subprocess.PIPE,
 			stdout=subprocess.PIPE,
-			stderr=shutup and subprocess.DEVNULL or None)
-	stdout, stderr = process.communicate(inputstr.strip().encode('utf-8'))
-	if 0 != process.returncode:
-		raise subprocess.CalledProcessError(process.returncode, 'jsshell.run()')
-	return stdout.decode("utf-8").replace("\r", "").strip()
+			stderr=subprocess.PIPE,
+			preexec_fn=policy.apply if resource else None)
+	limiter = OutputLimiter(max_bytes=policy.max_output)
+	output, errors = [], []
+	timer = None
+	timed_out = []
+	reaped = False
+	reaping = threading.Lock()
 
-def run_interactive(jscode):
-	subprocess.Popen(command(jscode)).communicate()
+	def kill():
+		# Once the child is reaped, its pid may belong to another process.
+		with reaping:
+			if not reaped:
+				os.kill(process.pid, signal.SIGKILL)
+
+	def feed():
+		try:
+			process.stdin.write(inputstr.strip().encode('utf-8'))
+			process.stdin.close()
+		except OSError:
+			pass
+
+	def read_output():
+		while not limiter.truncated:
+			data = process.stdout.read1(Stream.CHUNK_SIZE)
+			if not data:
+				break
+			output.extend(limiter.feed(data))
+		if limiter.truncated:
+			kill()
+
+	def read_errors():
+		errors.append(process.stderr.read().decode('utf-8', 'replace'))
+
+	threads = [threading.Thread(target=f, daemon=True)
+			for f in (feed, read_output, read_errors)]
+	for thread in threads:
+		thread.start()
+	if policy.wall_timeout is not None:
+		def expire():
+			timed_out.append(True)
+			kill()
+		timer = threading.Timer(policy.wall_timeout, expire)
+		timer.start()
+	# Wait for the child to exit without reaping it: until then, its pid can't
+	# be reused and kill() is safe.
+	os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+	if timer is not None:
+		timer.cancel()
+	# Reap the child ourselves to get its resource usage.
+	with reaping:
+		_, status, rusage = os.wait4(process.pid, 0)
+		reaped = True
+	process.returncode = returncode = os.waitstatus_to_exitcode(status)
+	wall_time = time.monotonic() - t0
+	for thread in threads:
+		thread.join()
+	for pipe in (process.stdout, process.stderr):
+		pipe.close()
+
+	output = ''.join(output).strip()
+	stderr = ''.join(errors)
+	usage = Usage(rusage, wall_time, limiter.bytes, returncode)
+	if limiter.truncated:
+		raise OutputLimitExceeded("output exceeded {} bytes"
+				.format(policy.max_output), output, usage)
+	if timed_out and returncode == -signal.SIGKILL:
+		raise Timeout("wall-clock time limit exceeded", output, usage)
+	# SIGKILL also comes from the OOM killer or an operator: only blame the
+	# CPU limit if the program actually used that much CPU time.
+	if policy.cpu_seconds is not None and returncode in (-signal.SIGXCPU, -signal.SIGKILL) \
+			and usage.cpu_time >= policy.cpu_seconds - CPU_ACCOUNTING_SLACK:
+		raise Timeout("CPU time limit exceeded", output, usage)
+	if returncode != 0 and OUT_OF_MEMORY.search(stderr):
+		raise OutOfMemory("out of memory", output, usage)
+	if returncode != 0:
+		lines = stderr.strip().splitlines()
+		uncaught = [l for l in lines if l.startswith("uncaught exception")]
+		if returncode < 0:
+			status = "killed by {}".format(signal.Signals(-returncode).name)
+		else:
+			status = "exit status {}".format(returncode)
+		message = (uncaught or lines or [status])[0]
+		raise ProgramError(message, output, usage)
+	return output, usage
@@ -1,16 +1,31 @@
-from lda.parser import Parser
-from lda.errors.handler import Logger
-from lda.errors import syntax
-from lda.context import ContextStack
+"""
+LDA compiler.
 
-from datetime import datetime
-from time import clock
-import platform
+Importing this package is cheap: the parser, the semantic checker and the
+backends are only imported when build_tree() and translate_tree() need them
+(e.g. `ldac.py --no-output` never imports a backend, and `--format lda`
+never imports the intermediate representation).
+"""
+
+from lda.telemetry import Telemetry
+
+import io
 
 class DefaultOptions:
 	ignore_case = False
 	extra_js_code = ""
 	stats_comment = True
+	ir_backend = False
+	budget = False
+	generators = False
+	memory_report = False
+	# Compilation limits for untrusted programs (see lda.limits)
+	max_source_bytes = None
+	max_tokens = None
+	max_depth = None
+	max_errors = None
+	max_array_cells = None
+	deadline = None
 
 class CompilationFailed(Exception):
 	"""
@@ -19,58 +34,149 @@ class CompilationFailed(Exception):
 	The `errors` attribute is a list of LDAError instances sorted by position.
 	The `buf` attribute is the source code buffer (may be used to format the
 	marker line when pretty-printing the errors).
+	The `telemetry` attribute is the compilation's Telemetry.
 	"""
-	def __init__(self, error_list, buf):
+	def __init__(self, error_list, buf, telemetry=None):
 		super().__init__("Compilation failed")
 		self.errors = sorted(error_list, key=lambda e: e.pos.char)
 		self.buf = buf
+		self.telemetry = telemetry
+
+def build_tree(options, buf, path=None, telemetry=None):
+	"""
+	Parse and check a program, and return its Module.
 
-def build_tree(options, buf, path=None):
+	Phase timings and other metrics are recorded into `telemetry` (a new
+	Telemetry if None), which becomes the module's `telemetry` attribute.
+	If `options.memory_report` is set, a MemoryReport is recorded into
+	`telemetry.memory` (see lda.memory).
+
+	Exceeding a compilation limit set in the options (see lda.limits) makes
+	the compilation fail with an error describing the limit.
+	"""
+	from lda.parser import Parser
+	from lda.errors.handler import Logger
+	from lda.errors import syntax, limits
+	from lda.context import ContextStack
+	from lda.position import Position
 	assert buf is not None or path
 	if buf is None and path is not None:
 		with open(path, 'rt', encoding='utf-8') as f:
 			buf = f.read()
-	c0 = clock()
+	if telemetry is None:
+		telemetry = Telemetry()
+	max_bytes = options.max_source_bytes
+	if max_bytes is not None and (len(buf) > max_bytes or
+			len(buf.encode('utf-8')) > max_bytes):
+		e = limits.SourceTooLarge(Position(path or "<string>"), max_bytes)
+		telemetry.count_errors([e])
+		raise CompilationFailed([e], buf, telemetry)
+	deadline = None
+	if options.deadline is not None:
+		from lda.limits import Deadline
+		deadline = Deadline(options.deadline)
+	if options.memory_report and telemetry.memory is None:
+		from lda.memory import MemoryReport
+		telemetry.memory = MemoryReport()
+	telemetry.compilations += 1
+	try:
+		with telemetry.phase('syntax'):
+			p = Parser(options, buf, path, telemetry, deadline)
+			module = p.analyze_module()
+			assert p.eof(), "program couldn't be parsed entirely"
+	except (syntax.SyntaxError, limits.LimitExceeded) as e:
+		telemetry.count_errors([e])
+		raise CompilationFailed([e], buf, telemetry)
+	telemetry.count_nodes(module)
+	logger = Logger(options.max_errors)
 	try:
-		p = Parser(options, buf, path)
-		module = p.analyze_module()
-		assert p.eof(), "program couldn't be parsed entirely"
-	except syntax.SyntaxError as e:
-		raise CompilationFailed([e], buf)
-	c1 = clock()
-	logger = Logger()
-	module.check(ContextStack(options), logger)
+		with telemetry.phase('semantic'):
+			module.check(ContextStack(options, telemetry=telemetry,
+					deadline=deadline), logger)
+	except limits.LimitExceeded as e:
+		errors = logger.errors + [e]
+		telemetry.count_errors(errors)
+		raise CompilationFailed(errors, buf, telemetry)
 	if logger:
-		raise CompilationFailed(logger.errors, buf)
-	module.tt_syntax = c1 - c0
-	module.tt_semantic = clock() - c1
+		telemetry.count_errors(logger.errors)
+		raise CompilationFailed(logger.errors, buf, telemetry)
+	if telemetry.memory is not None:
+		telemetry.memory.count_nodes(module)
+	module.telemetry = telemetry
 	return module
 
-def translate_tree(options, module, fmt=None):
+def translate_tree(options, module, fmt=None, sink=None):
+	"""
+	Translate a checked module into the given output format ('js', 'lda',
+	'py' for Python code to be run with lda.pyruntime, or 'ir' for a dump of
+	the intermediate representation).
+
+	If `options.ir_backend` is set, JavaScript code is generated from the
+	intermediate representation instead of straight from the syntax tree.
+
+	If `options.generators` is set, functions and the algorithm are emitted as
+	JavaScript generators that yield whenever they need input (see LDA.Session
+	in jsruntime/lda.js). This mode always goes through the intermediate
+	representation.
+
+	If `sink` is None, return the translated program as a string. Otherwise,
+	stream the translated program into `sink` (any object with a `write`
+	method, such as a file) as it is being generated, and return None.
+
+	The translation time is recorded into the module's telemetry.
+	"""
 	if not fmt:
 		fmt = options.format
-	c0 = clock()
 	if fmt == 'lda':
-		src = module.quicklda()
-		comment = "(*\n{}\n*)"
+		from lda.prettyprinter import LDAPrettyPrinter as pp_class
+		comment = "(*\n{}\n*)\n"
 	elif fmt == 'js':
-		src = module.quickjs()
-		comment = "/*\n{}\n */"
-		if options.extra_js_code:
-			src += "\n\n// extra_js_code -----\n" + options.extra_js_code
+		from lda.prettyprinter import JSPrettyPrinter as pp_class
+		comment = "/*\n{}\n */\n"
+	elif fmt == 'py':
+		from lda.prettyprinter import PyPrettyPrinter as pp_class
+		comment = '"""\n{}\n"""\n'
+	elif fmt == 'ir':
+		from lda.ir import IRPrettyPrinter as pp_class
+		comment = "(*\n{}\n*)\n"
 	else:
 		raise Exception("Format de sortie inconnu : " + fmt)
-	module.tt_translation = clock() - c0
+	out = io.StringIO() if sink is None else sink
+	telemetry = getattr(module, 'telemetry', None) or Telemetry()
 	if options.stats_comment:
+		from datetime import datetime
+		import platform
 		info = (" * Generated by ldac - {date} on {machine}\n"
 				" * syntax.........{syntax} ms\n"
-				" * semantic.......{semantic} ms\n"
-				" * translation....{translation} ms").format(
+				" * semantic.......{semantic} ms").format(
 				date=datetime.now().strftime("%c"),
 				machine=platform.node(),
-				syntax=int(module.tt_syntax*1000),
-				semantic=int(module.tt_semantic*1000),
-				translation=int(module.tt_translation*1000))
+				syntax=int(telemetry.phases['syntax']*1000),
+				semantic=int(telemetry.phases['semantic']*1000))
 	else:
 		info = " * Generated by ldac"
-	return (comment + "\n{}\n").format(info, src)
+	# The header goes out before the program is translated, so that the sink
+	# doesn't have to wait for the whole program to get its first bytes.
+	out.write(comment.format(info))
+	c0 = telemetry.phases['translation']
+	with telemetry.phase('translation'):
+		pp = pp_class(out)
+		pp.telemetry = telemetry
+		pp.memory = telemetry.memory
+		if fmt == 'js':
+			pp.budget = options.budget
+			pp.generators = options.generators
+		if fmt in ('ir', 'py') or (fmt == 'js' and (options.ir_backend or options.generators)):
+			from lda.lowering import lower
+			pp.put(lower(module))
+		else:
+			pp.put(module)
+		if fmt == 'js' and options.extra_js_code:
+			pp.write("\n\n// extra_js_code -----\n" + options.extra_js_code)
+		pp.write("\n")
+		pp.flush()
+	if options.stats_comment:
+		out.write(comment.format(" * translation....{} ms".format(
+				int((telemetry.phases['translation'] - c0)*1000))))
+	if sink is None:
+		return out.getvalue()
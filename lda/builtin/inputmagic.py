@@ -19,7 +19,7 @@ def check_call(context, logger, pos, params):
 	if len(params) != 1:
 		logger.log(semantic.ParameterCountMismatch(pos, 1, len(params)))
 	var = params[0]
-	var.check(context, logger, mode='w')
+	yield var.check(context, logger, mode='w')
 	if not isinstance(var.resolved_type, types.Scalar):
 		logger.log(semantic.TypeError(var.pos, "la fonction magique lire() "
 				"ne peut être utilisée qu'avec des types scalaires",
@@ -8,7 +8,7 @@ def check_call(context, logger, pos, params):
 	Allow all parameters except VOID and BlackHole types.
 	"""
 	for p in params:
-		p.check(context, logger)
+		yield p.check(context, logger)
 		if not types.nonvoid(p.resolved_type):
 			logger.log(semantic.TypeError(p.pos,
 					"cet argument ne peut pas être passé comme paramètre",
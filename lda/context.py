@@ -1,4 +1,5 @@
 from lda import builtin
+from lda.telemetry import Telemetry
 
 class ContextStack:
 	class Context:
@@ -6,8 +7,11 @@ class ContextStack:
 			self.symbols = symbols
 			self.parent = parent
 
-	def __init__(self, options, symbols=None, parent=None):
+	def __init__(self, options, symbols=None, parent=None, telemetry=None, deadline=None):
 		self.options = options
+		self.telemetry = telemetry if telemetry is not None else Telemetry()
+		# lda.limits.Deadline checked between statements, if any
+		self.deadline = deadline
 		if symbols is None:
 			symbols = builtin.SYMBOLS.copy()
 		self.stack = [ContextStack.Context(symbols, parent)]
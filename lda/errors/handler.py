@@ -1,12 +1,22 @@
+from .limits import TooManyErrors
+
 class Logger:
-	def __init__(self):
+	"""
+	Collect relevant errors. If `max_errors` is set, raise TooManyErrors
+	instead of collecting more errors than that.
+	"""
+
+	def __init__(self, max_errors=None):
 		self.errors = []
+		self.max_errors = max_errors
 
 	def __bool__(self):
 		return bool(self.errors)
 
 	def log(self, error):
 		if error.relevant:
+			if self.max_errors is not None and len(self.errors) >= self.max_errors:
+				raise TooManyErrors(error.pos, self.max_errors)
 			self.errors.append(error)
 
 class Raiser:
@@ -0,0 +1,68 @@
+"""
+Errors raised when a program exceeds a compilation limit (see
+DefaultOptions and lda.limits).
+"""
+
+from .error import LDAError
+
+class LimitExceeded(LDAError):
+	"""
+	Base class for compilation limit errors.
+
+	The `limit` attribute is the name of the option setting the limit that
+	was exceeded. Unlike other errors, a LimitExceeded raised during a phase
+	interrupts the compilation.
+	"""
+
+	limit = None
+
+	def __init__(self, pos, message):
+		super().__init__(pos, message)
+		self.relevant = True
+
+	def json(self):
+		d = super().json()
+		d['limit'] = self.limit
+		return d
+
+class SourceTooLarge(LimitExceeded):
+	limit = 'max_source_bytes'
+
+	def __init__(self, pos, max_bytes):
+		super().__init__(pos, "le programme dépasse la taille maximale "
+				"autorisée ({} octets)".format(max_bytes))
+
+class TooManyTokens(LimitExceeded):
+	limit = 'max_tokens'
+
+	def __init__(self, pos, max_tokens):
+		super().__init__(pos, "le programme est trop long "
+				"(plus de {} symboles)".format(max_tokens))
+
+class TooDeep(LimitExceeded):
+	limit = 'max_depth'
+
+	def __init__(self, pos, max_depth):
+		super().__init__(pos, "imbrication trop profonde "
+				"(plus de {} niveaux)".format(max_depth))
+
+class TooManyErrors(LimitExceeded):
+	limit = 'max_errors'
+
+	def __init__(self, pos, max_errors):
+		super().__init__(pos, "trop d'erreurs ({}) : "
+				"analyse interrompue".format(max_errors))
+
+class ArrayTooLarge(LimitExceeded):
+	limit = 'max_array_cells'
+
+	def __init__(self, pos, max_cells):
+		super().__init__(pos, "ce tableau statique a trop de cases "
+				"(au plus {} autorisées)".format(max_cells))
+
+class DeadlineExceeded(LimitExceeded):
+	limit = 'deadline'
+
+	def __init__(self, pos, seconds):
+		super().__init__(pos, "la compilation a dépassé le temps "
+				"imparti ({} s)".format(seconds))
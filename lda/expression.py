@@ -47,7 +47,7 @@ def nonwritable(check_method):
 			logger.log(semantic.NonWritable(self))
 			self.resolved_type = types.ERRONEOUS
 		else:
-			check_method(self, context, logger)
+			return check_method(self, context, logger)
 	return wrapper
 
 class Expression:
@@ -67,12 +67,24 @@ class Expression:
 	In addition, an expression must be checked for semantic correctness with
 	the `check()` method. If the semantic analysis is successful, the
 	expression gains the `resolved_type` attribute. Otherwise, `resolved_type`
-	is set to a `BlackHole` type (typically `ERRONEOUS`).
+	is set to a `BlackHole` type (typically `ERRONEOUS`). Expressions whose
+	type is known before the semantic analysis (e.g. literals) define it in
+	the `static_type` class attribute.
+
+	Expression doesn't declare any slots itself, so that subclasses may also
+	inherit from PureIdentifier. Concrete subclasses declare `pos`, `root` and
+	`resolved_type` in their `__slots__`.
 	"""
 
+	__slots__ = ()
+
+	static_type = None
+
 	def __init__(self, pos):
 		self.pos = pos
 		self.root = False
+		if self.static_type is not None:
+			self.resolved_type = self.static_type
 		assert hasattr(self, 'terminal')
 
 	def __eq__(self, other):
@@ -89,6 +101,8 @@ class Expression:
 		- 'r': read access.
 		- 'w': write access.
 		- 's': special write-ish access. (inout effective param, memory allocation)
+
+		Checks that check subexpressions are generators (see lda.visitor).
 		"""
 		raise NotImplementedError
 
@@ -98,6 +112,8 @@ class ExpressionIdentifier(PureIdentifier, Expression):
 	Name bound to a symbol during the semantic analysis phase.
 	"""
 
+	__slots__ = ('root', 'resolved_type', 'bound')
+
 	terminal = True
 
 	def check(self, context, logger, mode='r'):
@@ -151,12 +167,14 @@ class Literal(Expression):
 	Not writable.
 	"""
 
+	__slots__ = ('pos', 'root', 'resolved_type', 'value')
+
 	terminal = True
 
 	def __init__(self, pos, value):
 		super().__init__(pos)
 		self.value = value
-		assert hasattr(self, 'resolved_type'), "a literal's resolved_type must be fixed at compile time!"
+		assert self.static_type is not None, "a literal's resolved_type must be fixed at compile time!"
 
 	def __eq__(self, other):
 		return type(self) == type(other) and self.value == other.value
@@ -169,7 +187,8 @@ class Literal(Expression):
 		pass
 
 class LiteralInteger(Literal):
-	resolved_type = types.INTEGER
+	__slots__ = ()
+	static_type = types.INTEGER
 
 	def lda(self, pp):
 		pp.put(str(self.value))
@@ -178,7 +197,8 @@ class LiteralInteger(Literal):
 		pp.put(str(self.value))
 
 class LiteralReal(Literal):
-	resolved_type = types.REAL
+	__slots__ = ()
+	static_type = types.REAL
 
 	def lda(self, pp):
 		pp.put(str(self.value))
@@ -187,7 +207,8 @@ class LiteralReal(Literal):
 		pp.put(str(self.value))
 
 class LiteralString(Literal):
-	resolved_type = types.STRING
+	__slots__ = ()
+	static_type = types.STRING
 
 	def lda(self, pp):
 		pp.put(kw.QUOTE2, lda_escape_string(self.value), kw.QUOTE2)
@@ -196,7 +217,8 @@ class LiteralString(Literal):
 		pp.put('"', js_escape_string(self.value, '"'), '"')
 
 class LiteralCharacter(Literal):
-	resolved_type = types.CHARACTER
+	__slots__ = ()
+	static_type = types.CHARACTER
 
 	def __init__(self, pos, value):
 		super().__init__(pos, value)
@@ -209,7 +231,8 @@ class LiteralCharacter(Literal):
 		pp.put("'", js_escape_string(self.value, "'"), "'")
 
 class LiteralBoolean(Literal):
-	resolved_type = types.BOOLEAN
+	__slots__ = ()
+	static_type = types.BOOLEAN
 
 	def lda(self, pp):
 		pp.put(kw.TRUE if self.value else kw.FALSE)
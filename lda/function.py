@@ -1,6 +1,7 @@
 from . import kw
 from . import types
 from . import semantictools
+from . import visitor
 from .types import ERRONEOUS, Scalar
 from .errors import semantic
 
@@ -9,6 +10,8 @@ class _BaseFunction:
 	Base class for a function with a lexicon and a statement block body.
 	"""
 
+	__slots__ = ('pos', 'lexicon', 'body', 'uninitialized')
+
 	def __init__(self, pos, lexicon, body):
 		self.pos = pos
 		self.lexicon = lexicon
@@ -61,11 +64,14 @@ class Algorithm(_BaseFunction):
 	There can only be one algorithm per module.
 	"""
 
+	__slots__ = ()
+
 	def lda_signature(self, pp):
 		pp.put(kw.ALGORITHM)
 
 	def js(self, pp):
 		pp.putline("P.main = function() {")
+		pp.indented(pp.putbudget)
 		if self.lexicon:
 			pp.indented(pp.putline, self.lexicon)
 		if self.body:
@@ -88,7 +94,7 @@ class Algorithm(_BaseFunction):
 		if self.lexicon:
 			self.lexicon.check(context, logger)
 		# Check statements
-		self.body.check(context, logger)
+		visitor.run(self.body.check(context, logger))
 		# Warn about unused variables
 		self.warn_unused_vars(context, logger)
 		# Exit function scope
@@ -101,6 +107,8 @@ class Function(_BaseFunction):
 	return a value. The number of functions in a module is unlimited.
 	"""
 
+	__slots__ = ('end_pos', 'ident', 'fp_list', 'return_type', 'resolved_return_type')
+
 	def __init__(self, pos, end_pos, ident, fp_list, return_type, lexicon, body):
 		super().__init__(ident.pos, lexicon, body)
 		self.end_pos     = end_pos
@@ -140,7 +148,7 @@ class Function(_BaseFunction):
 		if self.lexicon is not None:
 			self.lexicon.check(context, logger)
 		# Check statements
-		self.body.check(context, logger)
+		visitor.run(self.body.check(context, logger))
 		# Ensure a return statement can be reached if the signature says the
 		# function returns non-VOID
 		if types.nonvoid(self.resolved_return_type) and not self.body.returns:
@@ -167,7 +175,7 @@ class Function(_BaseFunction):
 			return
 		# check effective parameter types
 		for effective, formal in zip(params, self.fp_list):
-			effective.check(context, logger, mode=(formal.inout and 's' or 'r'))
+			yield effective.check(context, logger, mode=(formal.inout and 's' or 'r'))
 			semantictools.enforce_compatible("ce paramètre effectif",
 					formal.resolved_type, effective, logger)
 
@@ -228,6 +236,7 @@ class Function(_BaseFunction):
 			formal.js_ident(pp, access=False)
 			prefix = ", "
 		pp.putline(") {")
+		pp.indented(pp.putbudget)
 		for param in self.fp_list:
 			if param.js_fakepbc:
 				# The variable will be translated to a JS *object* (not a JS
@@ -3,6 +3,8 @@ class PureIdentifier:
 	User-defined name that identifies an LDA code object.
 	"""
 
+	__slots__ = ('pos', 'name')
+
 	def __init__(self, pos, name):
 		self.pos = pos
 		self.name = name
@@ -22,3 +24,9 @@ class PureIdentifier:
 	def js(self, pp):
 		pp.put("$" + self.name.encode('unicode-escape').decode().replace('\\', '$'))
 
+	def py(self, pp):
+		# Underscores are doubled so that they can't be mistaken for the
+		# single underscores that replace backslashes in escape sequences.
+		pp.put("_" + self.name.replace('_', '__').encode('unicode-escape')
+				.decode().replace('\\', '_'))
+
@@ -0,0 +1,598 @@
+"""
+Closure-compiled interpreter for checked modules.
+
+Instead of generating code, the interpreter walks the syntax tree once and
+turns each node into a Python closure; running the program then boils down to
+calling the closure of the algorithm. Every variable is resolved to a slot
+index beforehand, so no name lookups happen at run time:
+
+- a frame is a list: slot 0 holds the globals, followed by the parameters and
+  the local variables of the function;
+- the globals are a list too: slot 0 holds the Execution (I/O and budgets),
+  followed by the module-level variables;
+- composite instances are lists of field values.
+
+The interpreter shares its runtime library (arrays, fake pointers, number
+semantics, typed input) with the Python backend, see pyruntime.py.
+
+Like semantic checks, the compiler's methods are generators run by
+visitor.run(), so that arbitrarily deep syntax trees can be compiled.
+"""
+
+import io
+import time
+
+from . import builtin
+from . import expression
+from . import operators
+from . import statements
+from . import types
+from . import visitor
+from .limits import constant_integer
+from .lowering import effective
+from .pyruntime import (Runtime, Array, Ptr, clone, div, idiv, mod, power,
+		charat, substr, jsint, call_deep, BudgetExceeded, MAX_EXACT_INTEGER)
+
+
+def compile_module(module):
+	"""
+	Compile a semantically-correct Module into a Program. The module must
+	contain an algorithm.
+	"""
+	return Compiler(module).program
+
+
+class Execution:
+	"""
+	State of a running program: runtime library bound to the I/O streams, and
+	resource budgets.
+
+	One step is consumed per loop iteration and per function call. Since the
+	clock is only read every CHECK_INTERVAL steps, a time budget may be
+	overrun by the time it takes to run that many steps.
+	"""
+
+	CHECK_INTERVAL = 1024
+
+	def __init__(self, runtime, max_steps=None, max_time=None):
+		self.runtime = runtime
+		self.max_steps = max_steps
+		self.max_time = max_time
+		self.start = time.monotonic()
+		self.deadline = None if max_time is None else self.start + max_time
+		self.steps = 0
+		self.elapsed = 0
+		self.interval = 0
+		self.countdown = 0
+		self.checkpoint()
+
+	def checkpoint(self):
+		"""
+		Account for the steps consumed since the last checkpoint and enforce
+		the budgets. Called whenever `countdown` drops to zero.
+		"""
+		self.steps += self.interval - self.countdown
+		if self.max_steps is not None and self.steps >= self.max_steps:
+			raise BudgetExceeded("step budget exceeded ({} steps)".format(self.max_steps))
+		if self.deadline is not None and time.monotonic() > self.deadline:
+			raise BudgetExceeded("time budget exceeded ({} s)".format(self.max_time))
+		self.interval = Execution.CHECK_INTERVAL
+		if self.max_steps is not None:
+			self.interval = min(self.interval, self.max_steps - self.steps)
+		self.countdown = self.interval
+
+	def finish(self):
+		self.steps += self.interval - self.countdown
+		self.countdown = self.interval
+		self.elapsed = time.monotonic() - self.start
+
+
+class Program:
+	"""
+	Compiled program, ready to be run any number of times.
+	"""
+
+	def __init__(self, global_template, global_factories, main):
+		self.global_template = global_template
+		self.global_factories = global_factories
+		self.main = main
+
+	def execute(self, stdin=None, stdout=None, max_steps=None, max_time=None):
+		"""
+		Run the program with the given input and output streams (sys.stdin and
+		sys.stdout by default), within the given budgets (number of steps,
+		seconds). Raise BudgetExceeded if a budget is exhausted. Return the
+		Execution, which tells the number of steps consumed and the elapsed
+		time.
+		"""
+		ex = Execution(Runtime(stdin, stdout), max_steps, max_time)
+		g = [ex] + self.global_template
+		for slot, factory in self.global_factories:
+			g[slot] = factory()
+		try:
+			call_deep(self.main.invoke, g, [])
+		finally:
+			ex.finish()
+		return ex
+
+	def run(self, inputstr='', max_steps=None, max_time=None):
+		"""
+		Run the program with the given keyboard input and return its output,
+		like pyruntime.run().
+		"""
+		stdout = io.StringIO()
+		self.execute(io.StringIO(inputstr.strip()), stdout, max_steps, max_time)
+		return stdout.getvalue().replace("\r", "").strip()
+
+
+class FunctionCode:
+	"""
+	Compiled function. The body is compiled after all FunctionCode objects
+	have been created, so that calls (including recursive ones) can be
+	compiled right away.
+	"""
+
+	def __init__(self, params, template, factories):
+		self.params = params
+		self.template = template
+		self.factories = factories
+		self.clones = [1 + i for i, p in enumerate(params) if p.js_fakepbc]
+		self.body = None
+
+	def invoke(self, g, args):
+		ex = g[0]
+		ex.countdown -= 1
+		if ex.countdown <= 0:
+			ex.checkpoint()
+		frame = [g]
+		frame += args
+		frame += self.template
+		for slot, factory in self.factories:
+			frame[slot] = factory()
+		for slot in self.clones:
+			frame[slot] = clone(frame[slot])
+		r = self.body(frame)
+		return None if r is None else r[0]
+
+
+def block(stmts):
+	"""
+	Compile a sequence of statement closures. Statement closures return None,
+	or a 1-tuple holding the return value if a return statement was executed.
+	"""
+	if not stmts:
+		return lambda f: None
+	if len(stmts) == 1:
+		return stmts[0]
+	def run(f):
+		for s in stmts:
+			r = s(f)
+			if r is not None:
+				return r
+	return run
+
+
+class Compiler:
+	def __init__(self, module):
+		# Maps id(VarDecl) to the index of a composite field, or to a tuple
+		# (is_global, slot) for variables.
+		self.fields = {}
+		self.slots = {}
+		self.functions = {}
+		lexicon = module.lexicon
+		for composite in lexicon.composites:
+			self.declare_composite(composite)
+		template, factories = self.allocate(lexicon.variables, 1, globals=True)
+		for function in module.functions:
+			self.function_code(function, function.fp_list)
+		algorithm = module.algorithms[0]
+		main = self.function_code(algorithm, [])
+		for function in module.functions:
+			self.compile_body(function)
+		self.compile_body(algorithm)
+		self.program = Program(template, factories, main)
+
+	#------------------------------------------------------------------
+	# Declarations
+	#------------------------------------------------------------------
+
+	def declare_composite(self, composite):
+		for i, field in enumerate(composite.fields):
+			self.fields[id(field)] = i
+
+	def factory(self, type_descriptor):
+		"""
+		Return a function creating the initial value of a variable of the
+		given type, or None if the initial value is None.
+		"""
+		if isinstance(type_descriptor, types.Composite):
+			fields = [(i, self.factory(field.resolved_type))
+					for i, field in enumerate(type_descriptor.fields)]
+			template = [None] * len(fields)
+			fields = [(i, f) for i, f in fields if f is not None]
+			if not fields:
+				return lambda: template[:]
+			def new_composite():
+				c = template[:]
+				for i, f in fields:
+					c[i] = f()
+				return c
+			return new_composite
+		elif isinstance(type_descriptor, types.Array) and type_descriptor.static:
+			bounds = tuple((constant_integer(dim.low), constant_integer(dim.high))
+					for dim in type_descriptor.dimensions)
+			element = self.factory(type_descriptor.resolved_element_type)
+			return lambda: Array(bounds, element)
+		return None
+
+	def allocate(self, variables, first_slot, globals=False):
+		"""
+		Assign slots to variables, starting at `first_slot`. Return the
+		template of the slots' initial values and a list of (slot, factory)
+		tuples for the slots that need a fresh object.
+		"""
+		template = []
+		factories = []
+		for i, var in enumerate(variables):
+			slot = first_slot + i
+			self.slots[id(var)] = (globals, slot)
+			template.append(None)
+			factory = self.factory(var.resolved_type)
+			if factory is not None:
+				factories.append((slot, factory))
+		return template, factories
+
+	def function_code(self, function, params):
+		lexicon = function.lexicon
+		for i, param in enumerate(params):
+			self.slots[id(param)] = (False, 1 + i)
+		if lexicon:
+			for composite in lexicon.composites:
+				self.declare_composite(composite)
+			variables = lexicon.variables
+		else:
+			variables = []
+		template, factories = self.allocate(variables, 1 + len(params))
+		code = FunctionCode(params, template, factories)
+		self.functions[function] = code
+		return code
+
+	def compile_body(self, function):
+		self.functions[function].body = visitor.run(self.statements(function.body))
+
+	#------------------------------------------------------------------
+	# Statements
+	#------------------------------------------------------------------
+
+	def statements(self, body):
+		stmts = []
+		for s in body:
+			stmts.append((yield self.statement(s)))
+		return block(stmts)
+
+	def statement(self, node):
+		if isinstance(node, statements.Assignment):
+			setter = yield self.setter(node.lhs)
+			rhs = yield self.expr(node.rhs)
+			def assign(f):
+				setter(f, rhs(f))
+			return assign
+		elif isinstance(node, statements.FunctionCallWrapper):
+			return (yield self.call_statement(node.call_op))
+		elif isinstance(node, statements.Return):
+			if node.expression is None:
+				return lambda f: (None,)
+			value = yield self.expr(node.expression)
+			return lambda f: (value(f),)
+		elif isinstance(node, statements.If):
+			return (yield self.if_statement(node))
+		elif isinstance(node, statements.For):
+			return (yield self.for_statement(node))
+		elif isinstance(node, statements.While):
+			return (yield self.while_statement(node))
+		raise NotImplementedError(type(node))
+
+	def call_statement(self, call):
+		function = call.function
+		params = call.rhs
+		if function is builtin.print:
+			args = yield self.exprs(params)
+			def print_(f):
+				f[0][0].runtime.print(*[a(f) for a in args])
+			return print_
+		elif function is builtin.inputmagic:
+			setter = yield self.setter(params[0])
+			name = builtin.inputmagic.APICALL[params[0].resolved_type]
+			def read(f):
+				setter(f, getattr(f[0][0].runtime, name)())
+			return read
+		elif function is builtin.arrayalloc:
+			setter = yield self.setter(params[0])
+			bounds = []
+			for dim in params[1:]:
+				bounds.append(tuple((yield self.exprs([dim.lhs, dim.rhs]))))
+			element = self.factory(params[0].resolved_type.resolved_element_type)
+			def alloc(f):
+				setter(f, Array([(lo(f), hi(f)) for lo, hi in bounds], element))
+			return alloc
+		call = yield self.call(function, params)
+		def call_(f):
+			call(f)
+		return call_
+
+	def if_statement(self, node):
+		clauses = []
+		for c in node.conditionals:
+			clauses.append(((yield self.expr(c.condition)), (yield self.statements(c))))
+		otherwise = None
+		if node.else_block is not None:
+			otherwise = yield self.statements(node.else_block)
+		if len(clauses) == 1:
+			(condition, then), = clauses
+			if otherwise is None:
+				def if_(f):
+					if condition(f):
+						return then(f)
+			else:
+				def if_(f):
+					if condition(f):
+						return then(f)
+					return otherwise(f)
+			return if_
+		def if_chain(f):
+			for condition, then in clauses:
+				if condition(f):
+					return then(f)
+			if otherwise is not None:
+				return otherwise(f)
+		return if_chain
+
+	def while_statement(self, node):
+		condition = yield self.expr(node.condition)
+		body = yield self.statements(node)
+		def while_(f):
+			ex = f[0][0]
+			while condition(f):
+				r = body(f)
+				if r is not None:
+					return r
+				ex.countdown -= 1
+				if ex.countdown <= 0:
+					ex.checkpoint()
+		return while_
+
+	def for_statement(self, node):
+		"""
+		Same semantics as For.js(): the body runs at least once, and the stop
+		condition is checked before incrementing the counter.
+		"""
+		get = yield self.expr(node.counter)
+		set = yield self.setter(node.counter)
+		initial = yield self.expr(node.initial)
+		final = yield self.expr(node.final)
+		body = yield self.statements(node)
+		def for_(f):
+			ex = f[0][0]
+			set(f, initial(f))
+			while True:
+				r = body(f)
+				if r is not None:
+					return r
+				ex.countdown -= 1
+				if ex.countdown <= 0:
+					ex.checkpoint()
+				if get(f) >= final(f):
+					return
+				set(f, get(f) + 1)
+		return for_
+
+	#------------------------------------------------------------------
+	# Locations
+	#------------------------------------------------------------------
+
+	def setter(self, node):
+		"""
+		Compile a writable expression into a function assigning a value to it
+		(right away for variables, through a generator otherwise).
+		"""
+		node = effective(node)
+		if isinstance(node, expression.ExpressionIdentifier):
+			is_global, slot = self.slots[id(node.bound)]
+			if is_global:
+				def set_global(f, v):
+					f[0][slot] = v
+				return set_global
+			elif node.bound.js_fakeptr:
+				def set_ptr(f, v):
+					f[slot].v = v
+				return set_ptr
+			def set_local(f, v):
+				f[slot] = v
+			return set_local
+		return self.compound_setter(node)
+
+	def compound_setter(self, node):
+		if isinstance(node, operators.MemberSelect):
+			obj = yield self.expr(node.lhs)
+			field = self.fields[id(node.rhs.bound)]
+			def set_field(f, v):
+				obj(f)[field] = v
+			return set_field
+		elif isinstance(node, operators._ArraySubscript):
+			array = yield self.expr(node.lhs)
+			indices = yield self.exprs(node.rhs)
+			if len(indices) == 1:
+				index, = indices
+				def set_element(f, v):
+					array(f).set((index(f),), v)
+			else:
+				def set_element(f, v):
+					array(f).set([i(f) for i in indices], v)
+			return set_element
+		elif isinstance(node, operators._StringSubscript):
+			# Strings are immutable.
+			string, index = yield self.exprs([node.lhs, node.index])
+			def set_char(f, v):
+				string(f), index(f)
+			return set_char
+		raise NotImplementedError(type(node))
+
+	#------------------------------------------------------------------
+	# Expressions
+	#------------------------------------------------------------------
+
+	def expr(self, node):
+		"""
+		Compile an expression into a function of the frame returning its value.
+
+		Leaves are compiled right away; other expressions are compiled by the
+		generator returned by compound_expr().
+		"""
+		node = effective(node)
+		if isinstance(node, expression.ExpressionIdentifier):
+			is_global, slot = self.slots[id(node.bound)]
+			if is_global:
+				return lambda f: f[0][slot]
+			elif node.bound.js_fakeptr:
+				return lambda f: f[slot].v
+			return lambda f: f[slot]
+		elif isinstance(node, expression.Literal):
+			value = node.value
+			if node.resolved_type is types.INTEGER:
+				value = jsint(value)
+			return lambda f: value
+		return self.compound_expr(node)
+
+	def compound_expr(self, node):
+		if isinstance(node, operators.UnaryPlus):
+			return (yield self.expr(node.rhs))
+		elif isinstance(node, operators.UnaryMinus):
+			rhs = yield self.expr(node.rhs)
+			return lambda f: -rhs(f)
+		elif isinstance(node, operators.LogicalNot):
+			rhs = yield self.expr(node.rhs)
+			return lambda f: not rhs(f)
+		elif isinstance(node, operators.FunctionCall):
+			return (yield self.call(node.function, node.rhs))
+		elif isinstance(node, operators.MemberSelect):
+			obj = yield self.expr(node.lhs)
+			field = self.fields[id(node.rhs.bound)]
+			return lambda f: obj(f)[field]
+		elif isinstance(node, operators._ArraySubscript):
+			array = yield self.expr(node.lhs)
+			indices = yield self.exprs(node.rhs)
+			if len(indices) == 1:
+				index, = indices
+				return lambda f: array(f).get((index(f),))
+			return lambda f: array(f).get([i(f) for i in indices])
+		elif isinstance(node, operators._StringSubscript):
+			string = yield self.expr(node.lhs)
+			if node.resolved_type is types.CHARACTER:
+				index = yield self.expr(node.index)
+				return lambda f: charat(string(f), index(f))
+			low, high = yield self.exprs([node.index.lhs, node.index.rhs])
+			return lambda f: substr(string(f), low(f), high(f))
+		lhs, rhs = yield self.exprs([node.lhs, node.rhs])
+		if node.resolved_type is types.INTEGER:
+			return self.integer_binary(type(node), lhs, rhs)
+		if isinstance(node, (operators.Equal, operators.NotEqual)) \
+				and not isinstance(node.lhs.resolved_type, types.Scalar):
+			# Composites (lists) and arrays are compared by reference, like
+			# in JavaScript.
+			if isinstance(node, operators.Equal):
+				return lambda f: lhs(f) is rhs(f)
+			return lambda f: lhs(f) is not rhs(f)
+		return self.binary(type(node), lhs, rhs)
+
+	def exprs(self, nodes):
+		"""
+		Compile a list of expressions.
+		"""
+		functions = []
+		for node in nodes:
+			functions.append((yield self.expr(node)))
+		return functions
+
+	def integer_binary(self, op, lhs, rhs):
+		"""
+		Like binary(), but round the results of additions, subtractions and
+		multiplications beyond 2**53 to floats, like JavaScript does.
+		"""
+		if op is operators._Addition:
+			def add(f):
+				r = lhs(f) + rhs(f)
+				return r if -MAX_EXACT_INTEGER <= r <= MAX_EXACT_INTEGER else float(r)
+			return add
+		elif op is operators.Subtraction:
+			def sub(f):
+				r = lhs(f) - rhs(f)
+				return r if -MAX_EXACT_INTEGER <= r <= MAX_EXACT_INTEGER else float(r)
+			return sub
+		elif op is operators.Multiplication:
+			def mul(f):
+				r = lhs(f) * rhs(f)
+				return r if -MAX_EXACT_INTEGER <= r <= MAX_EXACT_INTEGER else float(r)
+			return mul
+		return self.binary(op, lhs, rhs)
+
+	def binary(self, op, lhs, rhs):
+		if op is operators._Addition or op is operators._Concatenation:
+			return lambda f: lhs(f) + rhs(f)
+		elif op is operators.Subtraction:
+			return lambda f: lhs(f) - rhs(f)
+		elif op is operators.Multiplication:
+			return lambda f: lhs(f) * rhs(f)
+		elif op is operators.RealDivision:
+			return lambda f: div(lhs(f), rhs(f))
+		elif op is operators.IntegerDivision:
+			return lambda f: idiv(lhs(f), rhs(f))
+		elif op is operators.Modulo:
+			return lambda f: mod(lhs(f), rhs(f))
+		elif op is operators.Power:
+			return lambda f: power(lhs(f), rhs(f))
+		elif op is operators.LessThan:
+			return lambda f: lhs(f) < rhs(f)
+		elif op is operators.GreaterThan:
+			return lambda f: lhs(f) > rhs(f)
+		elif op is operators.LessOrEqual:
+			return lambda f: lhs(f) <= rhs(f)
+		elif op is operators.GreaterOrEqual:
+			return lambda f: lhs(f) >= rhs(f)
+		elif op is operators.Equal:
+			return lambda f: lhs(f) == rhs(f)
+		elif op is operators.NotEqual:
+			return lambda f: lhs(f) != rhs(f)
+		elif op is operators.LogicalAnd:
+			return lambda f: lhs(f) and rhs(f)
+		elif op is operators.LogicalOr:
+			return lambda f: lhs(f) or rhs(f)
+		raise NotImplementedError(op)
+
+	def call(self, function, params):
+		"""
+		Compile a call to a user-defined function.
+		"""
+		code = self.functions[function]
+		args = []
+		for formal, effective_param in zip(function.fp_list, params):
+			if formal.js_fakeptr:
+				args.append((yield self.reference(effective_param)))
+			else:
+				args.append((yield self.expr(effective_param)))
+		if not args:
+			return lambda f: code.invoke(f[0], [])
+		return lambda f: code.invoke(f[0], [a(f) for a in args])
+
+	def reference(self, node):
+		"""
+		Compile a writable expression into a function making a fake pointer
+		to it, to be passed as an `inout` parameter.
+		"""
+		bound = getattr(effective(node), 'bound', None)
+		if bound is not None and getattr(bound, 'js_fakeptr', False):
+			# The variable is already a fake pointer: pass it on as-is.
+			slot = self.slots[id(bound)][1]
+			return lambda f: f[slot]
+		get = yield self.expr(node)
+		set = yield self.setter(node)
+		return lambda f: Ptr(lambda: get(f), lambda v: set(f, v))
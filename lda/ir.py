@@ -0,0 +1,1090 @@
+"""
+Three-address intermediate representation (IR).
+
+The IR is a lowered, linear form of a checked module (see lowering.py). Each
+function is a list of basic blocks; each basic block is a list of typed
+three-address instructions followed by a single terminator (jump, branch or
+return). Instruction operands are always atoms: temporaries (`Temp`),
+variables (`Var`) or constants (`Const`), so that the backends never have to
+worry about operator precedence or evaluation order.
+
+Declarations (variables, composites) are not lowered to instructions. Instead,
+each declared variable carries an initializer describing its initial value.
+
+Like AST nodes, IR objects export themselves through a PrettyPrinter: the `ir`
+methods produce a human-readable dump, the `js` methods produce JavaScript,
+and the `py` methods produce Python code meant to be run with the Python port
+of the runtime library (pyruntime.py).
+"""
+
+from . import types
+from .expression import js_escape_string, lda_escape_string
+from .prettyprinter import PrettyPrinter
+
+
+class IRPrettyPrinter(PrettyPrinter):
+	export_method_name = "ir"
+
+
+#######################################################################
+#
+# OPERANDS
+#
+#######################################################################
+
+class Temp:
+	"""
+	Temporary value, local to a function.
+	"""
+
+	def __init__(self, number, type):
+		self.number = number
+		self.type = type
+
+	def ir(self, pp):
+		pp.put("%", str(self.number))
+
+	def js(self, pp):
+		pp.put("t", str(self.number))
+
+	py = js
+
+
+class Var:
+	"""
+	Reference to a variable declared in the source program (VarDecl).
+	"""
+
+	def __init__(self, decl):
+		self.decl = decl
+
+	@property
+	def type(self):
+		return self.decl.resolved_type
+
+	@property
+	def is_global(self):
+		return getattr(self.decl.parent, 'js_namespace', None) is not None
+
+	def ir(self, pp):
+		pp.put("@" if self.is_global else "", self.decl.name)
+
+	def js(self, pp):
+		self.decl.js_ident(pp, access=True)
+
+	def py(self, pp):
+		self.decl.py_ident(pp, access=True)
+
+
+class Const:
+	"""
+	Constant scalar value.
+	"""
+
+	def __init__(self, value, type):
+		self.value = value
+		self.type = type
+
+	def ir(self, pp):
+		if self.type is types.STRING:
+			pp.put('"', lda_escape_string(self.value), '"')
+		elif self.type is types.CHARACTER:
+			pp.put("'", lda_escape_string(self.value), "'")
+		elif self.type is types.BOOLEAN:
+			pp.put("vrai" if self.value else "faux")
+		else:
+			pp.put(str(self.value))
+
+	def js(self, pp):
+		if self.type is types.STRING:
+			pp.put('"', js_escape_string(self.value, '"'), '"')
+		elif self.type is types.CHARACTER:
+			pp.put("'", js_escape_string(self.value, "'"), "'")
+		elif self.type is types.BOOLEAN:
+			pp.put("true" if self.value else "false")
+		else:
+			pp.put(str(self.value))
+
+	def py(self, pp):
+		if self.type is types.INTEGER:
+			from .pyruntime import jsint
+			pp.put(repr(jsint(self.value)))
+		else:
+			pp.put(repr(self.value))
+
+
+#######################################################################
+#
+# LOCATIONS
+#
+# Writable places. They only appear in the IR as the operand of a MakeRef
+# instruction (to pass `inout` parameters); the lowering pass turns every
+# other access to a location into load/store instructions.
+#
+#######################################################################
+
+class VarLocation:
+	def __init__(self, var):
+		self.var = var
+		self.type = var.type
+
+	def ir(self, pp):
+		pp.put(self.var)
+
+	def js_get(self, pp):
+		pp.put(self.var)
+
+	def py_get(self, pp):
+		pp.put(self.var)
+
+	def js_set(self, pp, value):
+		pp.put(self.var, " = ", value, ";")
+
+	def py_setter(self, pp, name):
+		if self.var.is_global:
+			pp.put(name, " = lambda v: setattr(P, '")
+			self.var.decl.ident.py(pp)
+			pp.putline("', v)")
+		else:
+			pp.putline("def ", name, "(v):")
+			pp.indented(pp.putline, "nonlocal ", self.var)
+			pp.indented(pp.putline, self.var, " = v")
+
+
+class ElementLocation:
+	def __init__(self, array, indices, type):
+		self.array = array
+		self.indices = indices
+		self.type = type
+
+	def ir(self, pp):
+		pp.put(self.array, "[")
+		pp.join(self.indices, pp.put, ", ")
+		pp.put("]")
+
+	def js_get(self, pp):
+		pp.put(self.array, ".get([")
+		pp.join(self.indices, pp.put, ", ")
+		pp.put("])")
+
+	def js_set(self, pp, value):
+		pp.put(self.array, ".set([")
+		pp.join(self.indices, pp.put, ", ")
+		pp.put("], ", value, ");")
+
+	def py_get(self, pp):
+		pp.put(self.array, ".get((")
+		pp.join(self.indices, pp.put, ", ")
+		pp.put(",))")
+
+	def py_set(self, pp, value):
+		pp.put(self.array, ".set((")
+		pp.join(self.indices, pp.put, ", ")
+		pp.put(",), ", value, ")")
+
+	def py_setter(self, pp, name):
+		pp.put(name, " = lambda v: ")
+		self.py_set(pp, "v")
+		pp.newline()
+
+
+class FieldLocation:
+	def __init__(self, obj, field):
+		self.obj = obj
+		self.field = field
+		self.type = field.resolved_type
+
+	def ir(self, pp):
+		pp.put(self.obj, ".", self.field.name)
+
+	def js_get(self, pp):
+		pp.put(self.obj, ".", self.field.ident)
+
+	def js_set(self, pp, value):
+		pp.put(self.obj, ".", self.field.ident, " = ", value, ";")
+
+	def py_get(self, pp):
+		pp.put(self.obj, ".", self.field.ident)
+
+	def py_setter(self, pp, name):
+		pp.put(name, " = lambda v: setattr(", self.obj, ", '", self.field.ident)
+		pp.putline("', v)")
+
+
+class CharLocation:
+	"""
+	Character within a string. Strings are immutable, so writing to a
+	CharLocation has no effect (just like in JavaScript).
+	"""
+
+	def __init__(self, string, index):
+		self.string = string
+		self.index = index
+		self.type = types.CHARACTER
+
+	def ir(self, pp):
+		pp.put(self.string, "[", self.index, "]")
+
+	def js_get(self, pp):
+		pp.put("LDA.charAt(", self.string, ", ", self.index, ")")
+
+	def js_set(self, pp, value):
+		pass
+
+	def py_get(self, pp):
+		pp.put("LDA.charat(", self.string, ", ", self.index, ")")
+
+	def py_setter(self, pp, name):
+		pp.putline(name, " = lambda v: None")
+
+
+#######################################################################
+#
+# INITIALIZERS
+#
+#######################################################################
+
+class NullInit:
+	"""
+	Initial value of scalars and dynamic arrays: nothing at all.
+	"""
+
+	def ir(self, pp):
+		pp.put("null")
+
+	def js(self, pp):
+		pp.put("null")
+
+	def py(self, pp):
+		pp.put("None")
+
+NULL = NullInit()
+
+
+class ArrayInit:
+	"""
+	Initial value of a static array. `bounds` is a list of (low, high) integer
+	tuples; `element` is the initializer of each element.
+	"""
+
+	def __init__(self, array_type, bounds, element):
+		self.array_type = array_type
+		self.bounds = bounds
+		self.element = element
+
+	def ir(self, pp):
+		pp.put("array[")
+		pp.put(", ".join("{}..{}".format(*b) for b in self.bounds))
+		pp.put("] of ", self.element)
+
+	def js(self, pp):
+		pp.put("new LDA.Array([")
+		pp.put(", ".join("[{}, {}]".format(*b) for b in self.bounds))
+		pp.put("], function(){return ", self.element, ";})")
+
+	def py(self, pp):
+		pp.put("LDA.Array((")
+		pp.put(", ".join("({}, {})".format(*b) for b in self.bounds))
+		pp.put(",), ")
+		if self.element is NULL:
+			pp.put("None)")
+		else:
+			pp.put("lambda: ", self.element, ")")
+
+
+class CompositeInit:
+	"""
+	Initial value of a composite variable: a fresh instance.
+	"""
+
+	def __init__(self, composite):
+		self.composite = composite
+
+	def ir(self, pp):
+		pp.put("new ", self.composite.name)
+
+	def js(self, pp):
+		self.composite.js_declare(pp)
+
+	def py(self, pp):
+		pp.put(getattr(self.composite.parent, 'js_namespace', ''),
+				self.composite.ident, "()")
+
+
+#######################################################################
+#
+# INSTRUCTIONS
+#
+# `dest` is a Temp or a Var, or None if the result is discarded.
+#
+#######################################################################
+
+class Instruction:
+	dest = None
+
+	def ir_dest(self, pp):
+		if self.dest is not None:
+			pp.put(self.dest)
+			if isinstance(self.dest, Temp):
+				pp.put(":", str(self.dest.type))
+			pp.put(" = ")
+
+	def js_dest(self, pp):
+		if self.dest is not None:
+			pp.put(self.dest, " = ")
+
+	py_dest = js_dest
+
+
+class Copy(Instruction):
+	def __init__(self, dest, src):
+		self.dest = dest
+		self.src = src
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put(self.src)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put(self.src, ";")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put(self.src)
+
+
+class Unary(Instruction):
+	JS = {'neg': "-", 'not': "!"}
+
+	def __init__(self, dest, op, operand):
+		self.dest = dest
+		self.op = op
+		self.operand = operand
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put(self.op, " ", self.operand)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put(Unary.JS[self.op], self.operand, ";")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("-" if self.op == 'neg' else "not ", self.operand)
+
+
+class Binary(Instruction):
+	"""
+	Binary operation on two operands.
+
+	The logical operators 'and' and 'or' only appear when evaluating both
+	operands eagerly is harmless; otherwise, the lowering pass turns them into
+	branches.
+	"""
+
+	JS = {
+		'add': "+", 'sub': "-", 'mul': "*", 'div': "/", 'mod': "%",
+		'concat': "+",
+		'lt': "<", 'gt': ">", 'le': "<=", 'ge': ">=", 'eq': "===", 'ne': "!==",
+		'and': "&&", 'or': "||",
+	}
+
+	def __init__(self, dest, op, lhs, rhs):
+		self.dest = dest
+		self.op = op
+		self.lhs = lhs
+		self.rhs = rhs
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put(self.op, " ", self.lhs, ", ", self.rhs)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		if self.op == 'idiv':
+			pp.put("Math.floor(", self.lhs, " / ", self.rhs, ");")
+		elif self.op == 'pow':
+			pp.put("Math.pow(", self.lhs, ", ", self.rhs, ");")
+		else:
+			pp.put(self.lhs, " ", Binary.JS[self.op], " ", self.rhs, ";")
+
+	# Operators whose Python semantics differ from JavaScript's are delegated
+	# to the runtime library.
+	PY = {
+		'add': "+", 'sub': "-", 'mul': "*", 'concat': "+",
+		'lt': "<", 'gt': ">", 'le': "<=", 'ge': ">=", 'eq': "==", 'ne': "!=",
+		'and': "and", 'or': "or",
+	}
+	PY_RUNTIME = {'div': "div", 'idiv': "idiv", 'mod': "mod", 'pow': "power"}
+	# Integer operations whose result may exceed 2**53, beyond which
+	# JavaScript rounds integers (see pyruntime.jsint). The check is inlined.
+	PY_INEXACT = ('add', 'sub', 'mul')
+
+	def py(self, pp):
+		self.py_dest(pp)
+		if self.op in Binary.PY_RUNTIME:
+			pp.put("LDA.", Binary.PY_RUNTIME[self.op], "(", self.lhs, ", ", self.rhs, ")")
+			return
+		pp.put(self.lhs, " ", Binary.PY[self.op], " ", self.rhs)
+		if self.op in Binary.PY_INEXACT and self.dest.type is types.INTEGER:
+			from .pyruntime import MAX_EXACT_INTEGER
+			bound = str(MAX_EXACT_INTEGER)
+			pp.newline()
+			pp.put("if not -", bound, " <= ", self.dest, " <= ", bound, ": ")
+			self.py_dest(pp)
+			pp.put("float(", self.dest, ")")
+
+
+class CharAt(Instruction):
+	def __init__(self, dest, string, index):
+		self.dest = dest
+		self.string = string
+		self.index = index
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("charat ", self.string, ", ", self.index)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put("LDA.charAt(", self.string, ", ", self.index, ");")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("LDA.charat(", self.string, ", ", self.index, ")")
+
+
+class Substring(Instruction):
+	"""
+	Substring between two inclusive indices.
+	"""
+
+	def __init__(self, dest, string, low, high):
+		self.dest = dest
+		self.string = string
+		self.low = low
+		self.high = high
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("substr ", self.string, ", ", self.low, ", ", self.high)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put(self.string, ".substr(", self.low, ", 1 + ", self.high, " - ",
+				self.low, ");")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("LDA.substr(", self.string, ", ", self.low, ", ", self.high, ")")
+
+
+class LoadElement(Instruction):
+	def __init__(self, dest, array, indices):
+		self.dest = dest
+		self.array = array
+		self.indices = indices
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("load ", ElementLocation(self.array, self.indices, None))
+
+	def js(self, pp):
+		self.js_dest(pp)
+		ElementLocation(self.array, self.indices, None).js_get(pp)
+		pp.put(";")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		ElementLocation(self.array, self.indices, None).py_get(pp)
+
+
+class StoreElement(Instruction):
+	def __init__(self, array, indices, value):
+		self.array = array
+		self.indices = indices
+		self.value = value
+
+	def ir(self, pp):
+		pp.put("store ", ElementLocation(self.array, self.indices, None),
+				", ", self.value)
+
+	def js(self, pp):
+		ElementLocation(self.array, self.indices, None).js_set(pp, self.value)
+
+	def py(self, pp):
+		ElementLocation(self.array, self.indices, None).py_set(pp, self.value)
+
+
+class LoadField(Instruction):
+	def __init__(self, dest, obj, field):
+		self.dest = dest
+		self.obj = obj
+		self.field = field
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("load ", FieldLocation(self.obj, self.field))
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put(self.obj, ".", self.field.ident, ";")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put(self.obj, ".", self.field.ident)
+
+
+class StoreField(Instruction):
+	def __init__(self, obj, field, value):
+		self.obj = obj
+		self.field = field
+		self.value = value
+
+	def ir(self, pp):
+		pp.put("store ", FieldLocation(self.obj, self.field), ", ", self.value)
+
+	def js(self, pp):
+		FieldLocation(self.obj, self.field).js_set(pp, self.value)
+
+	def py(self, pp):
+		pp.put(self.obj, ".", self.field.ident, " = ", self.value)
+
+
+class MakeRef(Instruction):
+	"""
+	Make a reference to a location, to be passed as an `inout` parameter.
+	"""
+
+	def __init__(self, dest, location):
+		self.dest = dest
+		self.location = location
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("ref ", self.location)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		loc = self.location
+		if isinstance(loc, VarLocation) and loc.var.decl.js_fakeptr:
+			# The variable is already a fake pointer: pass it on as-is.
+			loc.var.decl.js_ident(pp, access=False)
+			pp.put(";")
+			return
+		pp.put("LDA.ptr(function(){return ")
+		loc.js_get(pp)
+		pp.put(";}, function(v){")
+		loc.js_set(pp, "v")
+		pp.put("});")
+
+	def py(self, pp):
+		loc = self.location
+		if isinstance(loc, VarLocation) and loc.var.decl.js_fakeptr:
+			self.py_dest(pp)
+			loc.var.decl.py_ident(pp, access=False)
+			return
+		# Python lambdas can't assign to variables: define the setter first.
+		setter = "s" + str(self.dest.number)
+		loc.py_setter(pp, setter)
+		self.py_dest(pp)
+		pp.put("LDA.ptr(lambda: ")
+		loc.py_get(pp)
+		pp.put(", ", setter, ")")
+
+
+class Call(Instruction):
+	"""
+	Call to a user-defined function. `args` are operands, or Temps holding
+	references for `inout` parameters (see MakeRef).
+	"""
+
+	def __init__(self, dest, function, args):
+		self.dest = dest
+		self.function = function
+		self.args = args
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("call ", self.function.name, "(")
+		pp.join(self.args, pp.put, ", ")
+		pp.put(")")
+
+	def js(self, pp):
+		self.js_dest(pp)
+		if pp.generators:
+			pp.put("yield* ")
+		pp.put("P.", self.function.ident, "(")
+		pp.join(self.args, pp.put, ", ")
+		pp.put(");")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("P.", self.function.ident, "(")
+		pp.join(self.args, pp.put, ", ")
+		pp.put(")")
+
+
+class Print(Instruction):
+	def __init__(self, args):
+		self.args = args
+
+	def ir(self, pp):
+		pp.put("print ")
+		pp.join(self.args, pp.put, ", ")
+
+	def js(self, pp):
+		pp.put("LDA.print(")
+		pp.join(self.args, pp.put, " + \" \" + ")
+		pp.put(");")
+
+	def py(self, pp):
+		pp.put("LDA.print(")
+		pp.join(self.args, pp.put, ", ")
+		pp.put(")")
+
+
+class Read(Instruction):
+	"""
+	Read a scalar value of the destination's type from the keyboard.
+	"""
+
+	JS = {
+		types.INTEGER:   "readInt",
+		types.BOOLEAN:   "readBool",
+		types.CHARACTER: "readChar",
+		types.STRING:    "readStr",
+		types.REAL:      "readReal",
+	}
+
+	def __init__(self, dest, type):
+		self.dest = dest
+		self.type = type
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("read ", str(self.type))
+
+	def js(self, pp):
+		self.js_dest(pp)
+		if pp.generators:
+			pp.put("yield* LDA.gen.", Read.JS[self.type], "();")
+		else:
+			pp.put("LDA.", Read.JS[self.type], "();")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("LDA.", Read.JS[self.type], "()")
+
+
+class NewArray(Instruction):
+	"""
+	Allocate a dynamic array. `bounds` is a list of (low, high) operand tuples;
+	`element` is the initializer of each element.
+	"""
+
+	def __init__(self, dest, bounds, element):
+		self.dest = dest
+		self.bounds = bounds
+		self.element = element
+
+	def ir(self, pp):
+		self.ir_dest(pp)
+		pp.put("newarray [")
+		prefix = ""
+		for low, high in self.bounds:
+			pp.put(prefix, low, "..", high)
+			prefix = ", "
+		pp.put("] of ", self.element)
+
+	def js(self, pp):
+		self.js_dest(pp)
+		pp.put("new LDA.Array([")
+		prefix = ""
+		for low, high in self.bounds:
+			pp.put(prefix, "[", low, ", ", high, "]")
+			prefix = ", "
+		pp.put("], function(){return ", self.element, ";});")
+
+	def py(self, pp):
+		self.py_dest(pp)
+		pp.put("LDA.Array((")
+		for low, high in self.bounds:
+			pp.put("(", low, ", ", high, "), ")
+		pp.put("), ")
+		if self.element is NULL:
+			pp.put("None)")
+		else:
+			pp.put("lambda: ", self.element, ")")
+
+
+#######################################################################
+#
+# TERMINATORS
+#
+# Terminators are exported by their function, because the JS code for a
+# jump depends on the layout of the blocks.
+#
+#######################################################################
+
+class Jump:
+	def __init__(self, target):
+		self.target = target
+
+	@property
+	def targets(self):
+		return [self.target]
+
+	def ir(self, pp):
+		pp.put("jump L", str(self.target.label))
+
+
+class Branch:
+	def __init__(self, condition, iftrue, iffalse):
+		self.condition = condition
+		self.iftrue = iftrue
+		self.iffalse = iffalse
+
+	@property
+	def targets(self):
+		return [self.iftrue, self.iffalse]
+
+	def ir(self, pp):
+		pp.put("branch ", self.condition, ", L", str(self.iftrue.label),
+				", L", str(self.iffalse.label))
+
+
+class Return:
+	targets = []
+
+	def __init__(self, value=None):
+		self.value = value
+
+	def ir(self, pp):
+		pp.put("return")
+		if self.value is not None:
+			pp.put(" ", self.value)
+
+
+#######################################################################
+#
+# CONTAINERS
+#
+#######################################################################
+
+class BasicBlock:
+	def __init__(self, label):
+		self.label = label
+		self.instructions = []
+		self.terminator = None
+
+	def ir(self, pp):
+		pp.putline("L", str(self.label), ":")
+		for instruction in self.instructions:
+			pp.indented(pp.putline, instruction)
+		pp.indented(pp.put, self.terminator)
+
+
+class IRVariable:
+	"""
+	Variable declaration along with its initializer.
+	"""
+
+	def __init__(self, decl, init):
+		self.decl = decl
+		self.init = init
+
+	def ir(self, pp):
+		pp.put(Var(self.decl), ": ", str(self.decl.resolved_type), " = ", self.init)
+
+
+class IRComposite:
+	def __init__(self, composite, fields):
+		self.composite = composite
+		self.fields = fields
+
+	def ir(self, pp):
+		pp.putline("composite ", self.composite.name)
+		pp.indented(pp.join, self.fields, pp.newline)
+
+	def js(self, pp, prefix):
+		pp.putline(prefix, self.composite.ident, " = function() {")
+		for field in self.fields:
+			pp.indented(pp.putline, "this.", field.decl.ident, " = ", field.init, ";")
+		pp.put("};")
+
+	def py(self, pp):
+		pp.putline("class ", self.composite.ident, ":")
+		pp.shift(1)
+		pp.putline("def __init__(self):")
+		for field in self.fields:
+			pp.indented(pp.putline, "self.", field.decl.ident, " = ", field.init)
+		if not self.fields:
+			pp.indented(pp.putline, "pass")
+		pp.shift(-1)
+
+
+class IRFunction:
+	"""
+	Lowered function or algorithm. `source` is the original Function or
+	Algorithm node; `params` is the list of formal parameters (VarDecls);
+	`blocks[0]` is the entry block.
+	"""
+
+	def __init__(self, source, params, variables, composites):
+		self.source = source
+		self.params = params
+		self.variables = variables
+		self.composites = composites
+		self.temps = []
+		self.blocks = []
+
+	@property
+	def is_algorithm(self):
+		return not hasattr(self.source, 'ident')
+
+	@property
+	def name(self):
+		return "<algorithme>" if self.is_algorithm else self.source.name
+
+	def back_edges(self):
+		"""
+		Return the set of (source, target) label pairs of the jumps going
+		backwards in the block layout (i.e. loops).
+		"""
+		return set((b.label, t.label) for b in self.blocks
+				for t in b.terminator.targets if t.label <= b.label)
+
+	def ir(self, pp):
+		pp.put("function ", self.name, "(")
+		prefix = ""
+		for param in self.params:
+			pp.put(prefix, "inout " if param.inout else "", param.name, ": ",
+					str(param.resolved_type))
+			prefix = ", "
+		pp.put(")")
+		if not self.is_algorithm and types.nonvoid(self.source.resolved_return_type):
+			pp.put(": ", str(self.source.resolved_return_type))
+		pp.newline()
+		for composite in self.composites:
+			pp.indented(pp.putline, composite)
+		for variable in self.variables:
+			pp.indented(pp.putline, "var ", variable)
+		pp.join(self.blocks, pp.newline)
+
+	def js(self, pp):
+		keyword = "function*(" if pp.generators else "function("
+		if self.is_algorithm:
+			pp.put("P.main = ", keyword)
+		else:
+			pp.put("P.", self.source.ident, " = ", keyword)
+		prefix = ""
+		for param in self.params:
+			pp.put(prefix)
+			param.js_ident(pp, access=False)
+			prefix = ", "
+		pp.putline(") {")
+		pp.indented(self.js_body, pp)
+		pp.put("}")
+
+	def js_body(self, pp):
+		pp.putbudget()
+		for param in self.params:
+			if param.js_fakepbc:
+				pp.putline(param.ident, " = LDA.clone(", param.ident,
+						"); /* fake pass by copy */")
+		for composite in self.composites:
+			composite.js(pp, "var ")
+			pp.newline()
+		for variable in self.variables:
+			pp.putline("var ", variable.decl.ident, " = ", variable.init, ";")
+		if self.temps:
+			pp.put("var ")
+			pp.join(self.temps, pp.put, ", ")
+			pp.putline(";")
+		if len(self.blocks) == 1 and isinstance(self.blocks[0].terminator, Return):
+			self.js_straight_block(pp, self.blocks[0])
+			return
+		pp.putline("var bb = 0;")
+		pp.putline("for (;;) switch (bb) {")
+		for i, block in enumerate(self.blocks):
+			pp.putline("case ", str(block.label), ":")
+			following = self.blocks[i+1] if i+1 < len(self.blocks) else None
+			pp.indented(self.js_block, pp, block, following)
+		pp.putline("}")
+
+	def js_straight_block(self, pp, block):
+		"""
+		Export the body of a function made of a single basic block, without
+		the block dispatch loop.
+		"""
+		for instruction in block.instructions:
+			pp.putline(instruction)
+		if block.terminator.value is not None:
+			pp.putline("return ", block.terminator.value, ";")
+
+	def js_block(self, pp, block, following):
+		"""
+		Export a basic block within the block dispatch loop. `following` is
+		the block laid out right after this one, if any: jumps to it fall
+		through.
+		"""
+		for instruction in block.instructions:
+			pp.putline(instruction)
+		term = block.terminator
+		if isinstance(term, Return):
+			if term.value is not None:
+				pp.putline("return ", term.value, ";")
+			else:
+				pp.putline("return;")
+		elif isinstance(term, Jump):
+			self.js_jump(pp, block, term.target, following)
+		else:
+			if term.iftrue is following:
+				pp.putline("if (!", term.condition, ") {")
+				pp.indented(self.js_jump, pp, block, term.iffalse, None)
+				pp.putline("}")
+			else:
+				pp.putline("if (", term.condition, ") {")
+				pp.indented(self.js_jump, pp, block, term.iftrue, None)
+				pp.putline("}")
+				self.js_jump(pp, block, term.iffalse, following)
+
+	def js_jump(self, pp, block, target, following):
+		if target.label <= block.label:
+			# Back-edge: one loop iteration.
+			pp.putbudget()
+		if target is not following:
+			pp.putline("bb = ", str(target.label), "; continue;")
+
+	def py(self, pp):
+		pp.put("def ")
+		if self.is_algorithm:
+			pp.put("main")
+		else:
+			pp.put(self.source.ident)
+		pp.put("(")
+		prefix = ""
+		for param in self.params:
+			pp.put(prefix)
+			param.py_ident(pp, access=False)
+			prefix = ", "
+		pp.putline("):")
+		pp.indented(self.py_body, pp)
+
+	def py_body(self, pp):
+		for param in self.params:
+			if param.js_fakepbc:
+				pp.putline(param.ident, " = LDA.clone(", param.ident, ")  # fake pass by copy")
+		for composite in self.composites:
+			pp.put(composite)
+		for variable in self.variables:
+			pp.putline(variable.decl.ident, " = ", variable.init)
+		if len(self.blocks) == 1 and isinstance(self.blocks[0].terminator, Return):
+			block = self.blocks[0]
+			for instruction in block.instructions:
+				pp.putline(instruction)
+			if block.terminator.value is not None:
+				pp.putline("return ", block.terminator.value)
+			elif not (block.instructions or self.variables or self.composites or
+					any(p.js_fakepbc for p in self.params)):
+				pp.putline("pass")
+			return
+		# Python has no goto: each block is guarded by a test on the number of
+		# the block to run next. Blocks are tested in layout order, so forward
+		# jumps don't need to go through the top of the loop again.
+		pp.putline("bb = 0")
+		pp.putline("while True:")
+		pp.shift(1)
+		for block in self.blocks:
+			pp.putline("if bb == ", str(block.label), ":")
+			pp.indented(self.py_block, pp, block)
+		pp.shift(-1)
+
+	def py_block(self, pp, block):
+		for instruction in block.instructions:
+			pp.putline(instruction)
+		term = block.terminator
+		if isinstance(term, Return):
+			if term.value is not None:
+				pp.putline("return ", term.value)
+			else:
+				pp.putline("return")
+		elif isinstance(term, Jump):
+			self.py_jump(pp, block, term.target)
+		elif term.iftrue.label > block.label and term.iffalse.label > block.label:
+			pp.putline("bb = ", str(term.iftrue.label), " if ", term.condition,
+					" else ", str(term.iffalse.label))
+		else:
+			pp.putline("if ", term.condition, ":")
+			pp.indented(self.py_jump, pp, block, term.iftrue)
+			pp.putline("else:")
+			pp.indented(self.py_jump, pp, block, term.iffalse)
+
+	def py_jump(self, pp, block, target):
+		pp.putline("bb = ", str(target.label))
+		if target.label <= block.label:
+			pp.putline("continue")
+
+
+class IRModule:
+	def __init__(self, variables, composites, functions, algorithm):
+		self.variables = variables
+		self.composites = composites
+		self.functions = functions
+		self.algorithm = algorithm
+
+	def ir(self, pp):
+		for composite in self.composites:
+			pp.putline(composite)
+		for variable in self.variables:
+			pp.putline("global ", variable)
+		for function in self.functions + [self.algorithm]:
+			if function is not None:
+				pp.newline()
+				with pp.timing(function.name):
+					pp.putline(function)
+
+	def js(self, pp):
+		pp.putline("// Compiled program namespace")
+		pp.putline("var P = {};")
+		pp.newline()
+		if self.composites or self.variables:
+			for composite in self.composites:
+				composite.js(pp, "P.")
+				pp.newline()
+			for variable in self.variables:
+				pp.putline("P.", variable.decl.ident, " = ", variable.init, ";")
+			pp.newline(2)
+		for function in self.functions:
+			with pp.timing(function.name):
+				function.js(pp)
+			pp.putline(";")
+			pp.newline()
+		if self.algorithm is not None:
+			with pp.timing(self.algorithm.name):
+				self.algorithm.js(pp)
+			pp.putline(";")
+
+	def py(self, pp):
+		pp.putline("# Compiled program namespace")
+		pp.putline("P = LDA.Namespace()")
+		pp.newline()
+		if self.composites or self.variables:
+			for composite in self.composites:
+				pp.put(composite)
+				pp.putline("P.", composite.composite.ident, " = ", composite.composite.ident)
+			for variable in self.variables:
+				pp.putline("P.", variable.decl.ident, " = ", variable.init)
+			pp.newline(2)
+		for function in self.functions:
+			with pp.timing(function.name):
+				pp.put(function)
+			pp.putline("P.", function.source.ident, " = ", function.source.ident)
+			pp.newline()
+		if self.algorithm is not None:
+			with pp.timing(self.algorithm.name):
+				pp.put(self.algorithm)
+			pp.putline("P.main = main")
@@ -10,12 +10,21 @@ compose. For example, while 'début' is the preferred way to spell the BEGIN
 keyword, we also allow the unaccented 'debut'.
 
 The first entry in each synonym list is the preferred spelling.
+
+The tables derived from the keywords (reserved words, synonym priorities, and
+the initials of the operators) are precomputed into lda.kwtables, so that they
+needn't be built every time the compiler starts. Run `python3 -m lda.kw`
+after changing a keyword or an operator to regenerate them.
 """
 
-import re
+import pprint
+
+from lda import kwtables
 
 all_keywords = []
-reserved = []
+
+# set of all the synonyms' words
+reserved = kwtables.RESERVED
 
 class Synonym:
 	def __init__(self, word, keyword):
@@ -24,7 +33,6 @@ class Synonym:
 		assert (word == word.lower())
 		self.gluable = not (word[0].isalpha() or word[0] == '_')
 		self.give_way = []
-		reserved.append(word)
 
 class Keyword:
 	def __init__(self, *synonyms):
@@ -109,17 +117,50 @@ MLC_START      = Keyword("(*")
 MLC_END        = Keyword("*)")
 SLC_START      = Keyword("//")
 
-def _set_priorities():
+def compute_tables():
+	"""
+	Compute the contents of lda.kwtables from the keywords and operators.
+
+	A gluable synonym gives way to the gluable synonyms of other keywords that
+	are one character longer and start with it (e.g. '<' gives way to '<=').
+	"""
+	from lda import operators
 	gluables = {}
 	for k in all_keywords:
 		gluables.update({s.word: s for s in k.synonyms if s.gluable})
+	give_way = {}
 	for word, syn in gluables.items():
-		try:
-			shorter = gluables[word[0:-1]]
-			if shorter.keyword != syn.keyword and syn not in shorter.give_way:
-				shorter.give_way.append(syn)
-		except KeyError:
-			pass
+		shorter = gluables.get(word[0:-1])
+		if shorter is not None and shorter.keyword != syn.keyword:
+			chain = give_way.setdefault(shorter.word, [])
+			if word not in chain:
+				chain.append(word)
+	def initials(op_list):
+		return {s.word[0] for op in op_list for s in op.keyword_def.synonyms}
+	return {
+		'RESERVED': {s.word for k in all_keywords for s in k.synonyms},
+		'GIVE_WAY': {word: tuple(chain) for word, chain in give_way.items()},
+		'UNARY_INITIALS': initials(operators.unary),
+		'BINARY_INITIALS': initials(operators.binary_flat),
+	}
+
+def write_tables(path=kwtables.__file__):
+	with open(path, 'wt', encoding='utf-8') as f:
+		f.write('"""\nKeyword and operator tables. Generated by `python3 -m lda.kw`: do not edit!\n"""\n')
+		for name, value in compute_tables().items():
+			if isinstance(value, set):
+				value = "frozenset({})".format(pprint.pformat(sorted(value), compact=True))
+			else:
+				value = pprint.pformat(value, compact=True)
+			f.write("\n{} = {}\n".format(name, value))
+
+def _set_priorities():
+	synonyms = {s.word: s for k in all_keywords for s in k.synonyms}
+	for word, chain in kwtables.GIVE_WAY.items():
+		synonyms[word].give_way = [synonyms[w] for w in chain]
 
 _set_priorities()
 
+if __name__ == '__main__':
+	write_tables()
+
@@ -0,0 +1,23 @@
+"""
+Keyword and operator tables. Generated by `python3 -m lda.kw`: do not edit!
+"""
+
+RESERVED = frozenset(['!=', '"', "'", '(', '(*', ')', '*', '*)', '**', '+', ',', '-', '.', '..', '/',
+ '//', ':', '<', '<-', '<=', '=', '>', '>=', '?', '[', ']', 'algorithme',
+ 'alors', 'booleen', 'booléen', 'caractere', 'caractère', 'chaine', 'chaîne',
+ 'de', 'debut', 'début', 'entier', 'et', 'faire', 'faux', 'fin', 'fonction',
+ 'fpour', 'fsi', 'ftant', 'ftantque', 'inout', 'jusque', 'lexique', 'mod',
+ 'non', 'ou', 'pour', 'reel', 'retourne', 'réel', 'si', 'sinon', 'snsi',
+ 'tableau', 'tantque', 'vrai', 'à', '←', '≠', '≤', '≥'])
+
+GIVE_WAY = {'(': ('(*',),
+ '*': ('**', '*)'),
+ '.': ('..',),
+ '/': ('//',),
+ '<': ('<-', '<='),
+ '>': ('>=',)}
+
+UNARY_INITIALS = frozenset(['+', '-', 'n'])
+
+BINARY_INITIALS = frozenset(['!', '(', '*', '+', '-', '.', '/', ':', '<', '=', '>', '[', 'e', 'm', 'o', '≠',
+ '≤', '≥'])
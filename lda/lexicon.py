@@ -16,6 +16,8 @@ class Lexicon:
 	symbols they contain (via the check() method).
 	"""
 
+	__slots__ = ('variables', 'composites', 'functions', 'all_items', 'parent')
+
 	def __init__(self, variables=None, composites=None, functions=None):
 		assert(variables  is None or type(variables)  is list)
 		assert(composites is None or type(composites) is list)
@@ -56,6 +58,8 @@ class Lexicon:
 			composite.detect_loops(composite, logger)
 		# Resolve variable types.
 		for variable in self.variables:
+			if context.deadline is not None:
+				context.deadline.check(variable.pos)
 			variable.check(context, logger)
 			assert not variable.formal
 		# Resolve function signatures before checking function bodies, so that the
@@ -65,7 +69,8 @@ class Lexicon:
 		# Check function bodies at the very end, so that they can use
 		# composites and variables in this lexicon.
 		for function in self.functions:
-			function.check(context, logger)
+			with context.telemetry.function(function.name, 'semantic'):
+				function.check(context, logger)
 
 	def __bool__(self):
 		"""
@@ -0,0 +1,124 @@
+"""
+Compilation limits.
+
+Programs submitted to the compile service (see ldaserver.py) can't be
+trusted. The following options bound the work that the compiler does on a
+single program. They are disabled (None) in DefaultOptions.
+
+- max_source_bytes: size of the source code, in UTF-8 bytes.
+- max_tokens: number of tokens read by the parser.
+- max_depth: nesting depth of statement blocks, parentheses, arguments and
+  unary operators. Chains of binary operators aren't counted: the passes
+  following the parser handle them without recursion.
+- max_errors: number of semantic errors collected before the semantic
+  analysis is interrupted.
+- max_array_cells: number of cells of a static array (the JavaScript runtime
+  fills static arrays as soon as they're declared).
+- deadline: wall-clock time (in seconds) allotted to parsing and checking.
+
+Each limit has its own error (see lda.errors.limits). Except for
+max_array_cells, exceeding a limit interrupts the compilation.
+"""
+
+import time
+
+from .errors import limits
+
+
+# tokens read by the parser between two deadline checks
+POLL_INTERVAL = 1024
+
+# magnitude beyond which constant integers are considered infinite
+CONSTANT_BOUND = 1 << 64
+
+
+class Deadline:
+	"""
+	Wall-clock deadline of a compilation.
+	"""
+
+	def __init__(self, seconds):
+		self.seconds = seconds
+		self.expires = time.monotonic() + seconds
+
+	def check(self, pos):
+		"""
+		Raise DeadlineExceeded if the deadline has passed.
+		"""
+		if time.monotonic() > self.expires:
+			raise limits.DeadlineExceeded(pos, self.seconds)
+
+
+def _clamp(value):
+	if value is None or abs(value) <= CONSTANT_BOUND:
+		return value
+	return float('inf') if value > 0 else float('-inf')
+
+def _constant_integer(expr):
+	from . import expression, operators
+	if isinstance(expr, expression.LiteralInteger):
+		return expr.value
+	if isinstance(expr, (operators.UnaryMinus, operators.UnaryPlus)):
+		value = yield _constant_integer(expr.rhs)
+		if value is None:
+			return None
+		return -value if isinstance(expr, operators.UnaryMinus) else value
+	if not isinstance(expr, (operators.Plus, operators.Subtraction,
+			operators.Multiplication, operators.Power,
+			operators.IntegerDivision, operators.Modulo)):
+		return None
+	lhs = yield _constant_integer(expr.lhs)
+	rhs = yield _constant_integer(expr.rhs)
+	if lhs is None or rhs is None:
+		return None
+	if abs(lhs) == float('inf') or abs(rhs) == float('inf'):
+		# don't bother: the array is too large anyway
+		return float('inf')
+	if isinstance(expr, operators.Plus):
+		return _clamp(lhs + rhs)
+	if isinstance(expr, operators.Subtraction):
+		return _clamp(lhs - rhs)
+	if isinstance(expr, operators.Multiplication):
+		return _clamp(lhs * rhs)
+	if isinstance(expr, operators.Power):
+		if rhs < 0:
+			return None
+		if rhs > 64 and abs(lhs) > 1:
+			return float('inf') if lhs > 0 or rhs % 2 == 0 else float('-inf')
+		if rhs > 64:
+			return lhs ** (2 + rhs % 2)
+		return _clamp(lhs ** rhs)
+	if rhs == 0:
+		return None
+	if isinstance(expr, operators.IntegerDivision):
+		return lhs // rhs
+	# JavaScript's remainder has the sign of the dividend
+	return abs(lhs) % abs(rhs) * (-1 if lhs < 0 else 1)
+
+def constant_integer(expr):
+	"""
+	Value of an integer expression made of literals and arithmetic operators,
+	or None if it can't be computed at compile time (e.g. division by zero).
+	Huge values are approximated with infinities, without computing them.
+
+	This also folds the bounds of static arrays for the IR and the
+	interpreter.
+	"""
+	from . import visitor
+	return visitor.run(_constant_integer(expr))
+
+def static_cells(array):
+	"""
+	Number of cells of a static array (possibly infinite), or None if its
+	bounds can't be computed at compile time.
+	"""
+	cells = 1
+	for dim in array.dimensions:
+		low = constant_integer(dim.low)
+		high = constant_integer(dim.high)
+		if low is None or high is None:
+			return None
+		if high < low:
+			return 0
+		cells *= high - low + 1
+	return cells
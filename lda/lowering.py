@@ -0,0 +1,515 @@
+"""
+Lowering pass: translate a checked module into the three-address IR (see
+ir.py).
+
+Like semantic checks, the methods that lower statements and expressions are
+generators run by visitor.run(), so that arbitrarily deep syntax trees can be
+lowered without recursing on the Python stack.
+"""
+
+from . import builtin
+from . import expression
+from . import operators
+from . import statements
+from . import types
+from . import visitor
+from .limits import constant_integer
+from .ir import (Temp, Var, Const, VarLocation, ElementLocation, FieldLocation,
+		CharLocation, NULL, ArrayInit, CompositeInit, Copy, Unary, Binary, CharAt,
+		Substring, LoadElement, StoreElement, LoadField, StoreField, MakeRef, Call,
+		Print, Read, NewArray, Jump, Branch, Return, BasicBlock, IRVariable,
+		IRComposite, IRFunction, IRModule)
+
+
+BINARY_OPS = {
+	operators.Multiplication:  'mul',
+	operators.RealDivision:    'div',
+	operators.IntegerDivision: 'idiv',
+	operators.Modulo:          'mod',
+	operators.Power:           'pow',
+	operators._Addition:       'add',
+	operators._Concatenation:  'concat',
+	operators.Subtraction:     'sub',
+	operators.LessThan:        'lt',
+	operators.GreaterThan:     'gt',
+	operators.LessOrEqual:     'le',
+	operators.GreaterOrEqual:  'ge',
+	operators.Equal:           'eq',
+	operators.NotEqual:        'ne',
+	operators.LogicalAnd:      'and',
+	operators.LogicalOr:       'or',
+}
+
+# Operators whose evaluation may fail at run time (or have side effects), and
+# must therefore not be evaluated eagerly in the RHS of a logical operator.
+FALLIBLE_OPS = (
+	operators.FunctionCall,
+	operators.Subscript,
+	operators._ArraySubscript,
+	operators.RealDivision,
+	operators.IntegerDivision,
+	operators.Modulo,
+	operators.Power,
+)
+
+
+def lower(module):
+	"""
+	Translate a semantically-correct Module into an IRModule.
+	"""
+	return Lowering().module(module)
+
+
+def effective(node):
+	"""
+	Return the type-specific operator behind a polymorphic operator, or the
+	node itself if it isn't polymorphic.
+	"""
+	if isinstance(node, operators.BinaryPolymorphicOp):
+		return node._morph
+	return node
+
+
+def subexpressions(node):
+	"""
+	Return the direct children of an expression node.
+	"""
+	if isinstance(node, operators.BinaryOp):
+		if isinstance(node.rhs, list):
+			return [node.lhs] + node.rhs
+		return [node.lhs, node.rhs]
+	elif isinstance(node, operators.UnaryOp):
+		return [node.rhs]
+	return []
+
+
+def initializer(type_descriptor):
+	"""
+	Return the initializer of a variable of the given type.
+	"""
+	if isinstance(type_descriptor, types.Composite):
+		return CompositeInit(type_descriptor)
+	elif isinstance(type_descriptor, types.Array) and type_descriptor.static:
+		bounds = [(constant_integer(dim.low), constant_integer(dim.high))
+				for dim in type_descriptor.dimensions]
+		return ArrayInit(type_descriptor, bounds,
+				initializer(type_descriptor.resolved_element_type))
+	return NULL
+
+
+class Lowering:
+	"""
+	Builds up IR functions one instruction at a time.
+
+	Expressions are lowered depth-first, left to right, so that the IR
+	evaluates operands in the same order as the JavaScript translation of the
+	AST would.
+	"""
+
+	def __init__(self):
+		self.function = None
+		self.block = None
+		self._has_side_effects = {}
+		self._fallible = {}
+
+	#------------------------------------------------------------------
+	# Containers
+	#------------------------------------------------------------------
+
+	def module(self, module):
+		lexicon = module.lexicon
+		functions = [self.lower_function(f, f.fp_list, f.lexicon)
+				for f in module.functions]
+		if module.algorithms:
+			alg = module.algorithms[0]
+			algorithm = self.lower_function(alg, [], alg.lexicon)
+		else:
+			algorithm = None
+		return IRModule(self.variables(lexicon), self.composites(lexicon),
+				functions, algorithm)
+
+	def variables(self, lexicon):
+		if not lexicon:
+			return []
+		return [IRVariable(v, initializer(v.resolved_type)) for v in lexicon.variables]
+
+	def composites(self, lexicon):
+		if not lexicon:
+			return []
+		return [IRComposite(c, [IRVariable(f, initializer(f.resolved_type))
+				for f in c.fields]) for c in lexicon.composites]
+
+	def lower_function(self, source, params, lexicon):
+		self.function = IRFunction(source, params,
+				self.variables(lexicon), self.composites(lexicon))
+		self.enter(self.new_block())
+		visitor.run(self.statements(source.body))
+		if self.block.terminator is None:
+			self.terminate(Return())
+		self.finish_function()
+		return self.function
+
+	def finish_function(self):
+		"""
+		Thread jumps through empty blocks, drop unreachable blocks, and number
+		the remaining blocks in layout order.
+		"""
+		blocks = self.function.blocks
+		def thread(block):
+			seen = set()
+			while not block.instructions and isinstance(block.terminator, Jump) \
+					and block not in seen:
+				seen.add(block)
+				block = block.terminator.target
+			return block
+		for block in blocks:
+			term = block.terminator
+			if isinstance(term, Jump):
+				term.target = thread(term.target)
+			elif isinstance(term, Branch):
+				term.iftrue = thread(term.iftrue)
+				term.iffalse = thread(term.iffalse)
+		reachable = set()
+		pending = [blocks[0]]
+		while pending:
+			block = pending.pop()
+			if block not in reachable:
+				reachable.add(block)
+				pending.extend(block.terminator.targets)
+		# Lay out the blocks so that as many jumps as possible fall through to
+		# the next block: follow each block with its last unplaced successor,
+		# and start a new chain with the earliest unplaced block when stuck.
+		layout = []
+		placed = set()
+		for start in blocks:
+			block = start
+			while block in reachable and block not in placed:
+				layout.append(block)
+				placed.add(block)
+				successors = [t for t in block.terminator.targets if t not in placed]
+				block = successors[-1] if successors else None
+		self.function.blocks = layout
+		for label, block in enumerate(layout):
+			block.label = label
+
+	#------------------------------------------------------------------
+	# Emission helpers
+	#------------------------------------------------------------------
+
+	def new_block(self):
+		block = BasicBlock(len(self.function.blocks))
+		self.function.blocks.append(block)
+		return block
+
+	def enter(self, block):
+		self.block = block
+
+	def emit(self, instruction):
+		self.block.instructions.append(instruction)
+
+	def terminate(self, terminator):
+		"""
+		Terminate the current block. Any instructions emitted afterwards
+		(i.e. unreachable code) go to a fresh block.
+		"""
+		self.block.terminator = terminator
+		self.enter(self.new_block())
+
+	def new_temp(self, type):
+		temp = Temp(len(self.function.temps), type)
+		self.function.temps.append(temp)
+		return temp
+
+	def emit_value(self, instruction_class, type, *args):
+		"""
+		Emit an instruction producing a value in a new temporary, and return
+		the temporary.
+		"""
+		dest = self.new_temp(type)
+		self.emit(instruction_class(dest, *args))
+		return dest
+
+	#------------------------------------------------------------------
+	# Statements
+	#------------------------------------------------------------------
+
+	def statements(self, body):
+		for statement in body:
+			yield self.statement(statement)
+
+	def statement(self, node):
+		if isinstance(node, statements.Assignment):
+			location = yield self.location(node.lhs)
+			self.store(location, (yield self.expr(node.rhs)))
+		elif isinstance(node, statements.FunctionCallWrapper):
+			yield self.call_statement(node.call_op)
+		elif isinstance(node, statements.Return):
+			value = None
+			if node.expression is not None:
+				value = yield self.expr(node.expression)
+			self.terminate(Return(value))
+		elif isinstance(node, statements.If):
+			yield self.if_statement(node)
+		elif isinstance(node, statements.For):
+			yield self.for_statement(node)
+		elif isinstance(node, statements.While):
+			yield self.while_statement(node)
+		else:
+			raise NotImplementedError(type(node))
+
+	def call_statement(self, call):
+		function = call.function
+		params = call.rhs
+		if function is builtin.print:
+			self.emit(Print((yield self.operands(params))))
+		elif function is builtin.inputmagic:
+			location = yield self.location(params[0])
+			self.store(location, self.emit_value(Read, location.type, location.type))
+		elif function is builtin.arrayalloc:
+			location = yield self.location(params[0])
+			bounds = []
+			for dim in params[1:]:
+				low, high = yield self.operands([dim.lhs, dim.rhs])
+				bounds.append((low, high))
+			self.store(location, self.emit_value(NewArray, location.type,
+					bounds, initializer(location.type.resolved_element_type)))
+		else:
+			self.emit(Call(None, function, (yield self.arguments(function, params))))
+
+	def if_statement(self, node):
+		end = self.new_block()
+		for conditional in node.conditionals:
+			condition = yield self.expr(conditional.condition)
+			then, otherwise = self.new_block(), self.new_block()
+			self.terminate(Branch(condition, then, otherwise))
+			self.enter(then)
+			yield self.statements(conditional)
+			self.terminate(Jump(end))
+			self.enter(otherwise)
+		if node.else_block is not None:
+			yield self.statements(node.else_block)
+		self.terminate(Jump(end))
+		self.enter(end)
+
+	def while_statement(self, node):
+		head, body, end = self.new_block(), self.new_block(), self.new_block()
+		self.terminate(Jump(head))
+		self.enter(head)
+		self.terminate(Branch((yield self.expr(node.condition)), body, end))
+		self.enter(body)
+		yield self.statements(node)
+		self.terminate(Jump(head))
+		self.enter(end)
+
+	def for_statement(self, node):
+		"""
+		Same semantics as For.js(): the body runs at least once, and the stop
+		condition is checked before incrementing the counter.
+		"""
+		body, increment, end = self.new_block(), self.new_block(), self.new_block()
+		location = yield self.location(node.counter)
+		self.store(location, (yield self.expr(node.initial)))
+		self.terminate(Jump(body))
+		self.enter(body)
+		yield self.statements(node)
+		location = yield self.location(node.counter)
+		counter = yield self.protect(self.load(location), [node.final])
+		final = yield self.expr(node.final)
+		stop = self.emit_value(Binary, types.BOOLEAN, 'ge', counter, final)
+		self.terminate(Branch(stop, end, increment))
+		self.enter(increment)
+		location = yield self.location(node.counter)
+		self.store(location, self.emit_value(Binary, types.INTEGER, 'add',
+				self.load(location), Const(1, types.INTEGER)))
+		self.terminate(Jump(body))
+		self.enter(end)
+
+	#------------------------------------------------------------------
+	# Locations
+	#------------------------------------------------------------------
+
+	def location(self, node):
+		"""
+		Lower a writable expression into a location (right away for
+		variables, through a generator otherwise).
+		"""
+		node = effective(node)
+		if isinstance(node, expression.ExpressionIdentifier):
+			return VarLocation(Var(node.bound))
+		return self.compound_location(node)
+
+	def compound_location(self, node):
+		if isinstance(node, operators.MemberSelect):
+			return FieldLocation((yield self.expr(node.lhs)), node.rhs.bound)
+		elif isinstance(node, operators._ArraySubscript):
+			array = yield self.protect((yield self.expr(node.lhs)), node.rhs)
+			return ElementLocation(array, (yield self.operands(node.rhs)), node.resolved_type)
+		elif isinstance(node, operators._StringSubscript):
+			string = yield self.protect((yield self.expr(node.lhs)), [node.index])
+			return CharLocation(string, (yield self.expr(node.index)))
+		raise NotImplementedError(type(node))
+
+	def load(self, location):
+		if isinstance(location, VarLocation):
+			return location.var
+		elif isinstance(location, ElementLocation):
+			return self.emit_value(LoadElement, location.type,
+					location.array, location.indices)
+		elif isinstance(location, FieldLocation):
+			return self.emit_value(LoadField, location.type,
+					location.obj, location.field)
+		elif isinstance(location, CharLocation):
+			return self.emit_value(CharAt, types.CHARACTER,
+					location.string, location.index)
+		raise NotImplementedError(type(location))
+
+	def store(self, location, value):
+		if isinstance(location, VarLocation):
+			last = self.block.instructions[-1] if self.block.instructions else None
+			if isinstance(value, Temp) and last is not None and last.dest is value:
+				# The value was computed right before; store it directly
+				# into the variable instead of going through the temporary.
+				last.dest = location.var
+				self.function.temps.remove(value)
+			else:
+				self.emit(Copy(location.var, value))
+		elif isinstance(location, ElementLocation):
+			self.emit(StoreElement(location.array, location.indices, value))
+		elif isinstance(location, FieldLocation):
+			self.emit(StoreField(location.obj, location.field, value))
+		elif isinstance(location, CharLocation):
+			# Strings are immutable.
+			pass
+		else:
+			raise NotImplementedError(type(location))
+
+	#------------------------------------------------------------------
+	# Expressions
+	#------------------------------------------------------------------
+
+	def expr(self, node):
+		"""
+		Lower an expression and return the operand holding its value.
+
+		Leaves are lowered right away; other expressions are lowered by the
+		generator returned by compound_expr().
+		"""
+		node = effective(node)
+		if isinstance(node, expression.ExpressionIdentifier):
+			return Var(node.bound)
+		elif isinstance(node, expression.Literal):
+			return Const(node.value, node.resolved_type)
+		return self.compound_expr(node)
+
+	def compound_expr(self, node):
+		if isinstance(node, operators.UnaryPlus):
+			return (yield self.expr(node.rhs))
+		elif isinstance(node, operators.UnaryMinus):
+			rhs = yield self.expr(node.rhs)
+			if isinstance(rhs, Const):
+				return Const(-rhs.value, rhs.type)
+			return self.emit_value(Unary, node.resolved_type, 'neg', rhs)
+		elif isinstance(node, operators.LogicalNot):
+			return self.emit_value(Unary, types.BOOLEAN, 'not', (yield self.expr(node.rhs)))
+		elif isinstance(node, operators.FunctionCall):
+			return self.emit_value(Call, node.resolved_type, node.function,
+					(yield self.arguments(node.function, node.rhs)))
+		elif isinstance(node, (operators.MemberSelect, operators._ArraySubscript)):
+			return self.load((yield self.location(node)))
+		elif isinstance(node, operators._StringSubscript):
+			string = yield self.protect((yield self.expr(node.lhs)), [node.index])
+			if node.resolved_type is types.CHARACTER:
+				return self.emit_value(CharAt, types.CHARACTER,
+						string, (yield self.expr(node.index)))
+			low, high = yield self.operands([node.index.lhs, node.index.rhs])
+			return self.emit_value(Substring, types.STRING, string, low, high)
+		op = BINARY_OPS[type(node)]
+		if op in ('and', 'or') and (yield self.fallible(node.rhs)):
+			return (yield self.short_circuit(node, op))
+		lhs = yield self.protect((yield self.expr(node.lhs)), [node.rhs])
+		rhs = yield self.expr(node.rhs)
+		return self.emit_value(Binary, node.resolved_type, op, lhs, rhs)
+
+	def short_circuit(self, node, op):
+		result = self.new_temp(types.BOOLEAN)
+		lhs = yield self.expr(node.lhs)
+		self.emit(Copy(result, lhs))
+		rhs_block, end = self.new_block(), self.new_block()
+		if op == 'and':
+			self.terminate(Branch(lhs, rhs_block, end))
+		else:
+			self.terminate(Branch(lhs, end, rhs_block))
+		self.enter(rhs_block)
+		self.emit(Copy(result, (yield self.expr(node.rhs))))
+		self.terminate(Jump(end))
+		self.enter(end)
+		return result
+
+	def operands(self, nodes):
+		"""
+		Lower a list of expressions evaluated left to right.
+		"""
+		operands = []
+		for i, node in enumerate(nodes):
+			operands.append((yield self.protect((yield self.expr(node)), nodes[i+1:])))
+		return operands
+
+	def arguments(self, function, params):
+		"""
+		Lower the effective parameters of a call to a user-defined function.
+		"""
+		args = []
+		for i, (formal, effective) in enumerate(zip(function.fp_list, params)):
+			if formal.js_fakeptr:
+				arg = self.emit_value(MakeRef, formal.resolved_type,
+						(yield self.location(effective)))
+			else:
+				arg = yield self.protect((yield self.expr(effective)), params[i+1:])
+			args.append(arg)
+		return args
+
+	def protect(self, operand, later):
+		"""
+		Copy a variable operand into a temporary if any of the expressions
+		evaluated `later` may modify the variable (through a function call).
+		"""
+		if isinstance(operand, Var) and later:
+			return self.protect_var(operand, later)
+		return operand
+
+	def protect_var(self, operand, later):
+		for node in later:
+			if (yield self.has_side_effects(node)):
+				return self.emit_value(Copy, operand.type, operand)
+		return operand
+
+	def has_side_effects(self, node):
+		try:
+			return self._has_side_effects[id(node)]
+		except KeyError:
+			return self.find_side_effects(node)
+
+	def find_side_effects(self, node):
+		node = effective(node)
+		found = isinstance(node, operators.FunctionCall)
+		for child in subexpressions(node):
+			if found:
+				break
+			found = yield self.has_side_effects(child)
+		self._has_side_effects[id(node)] = found
+		return found
+
+	def fallible(self, node):
+		try:
+			return self._fallible[id(node)]
+		except KeyError:
+			return self.find_fallible(node)
+
+	def find_fallible(self, node):
+		found = isinstance(node, FALLIBLE_OPS)
+		for child in subexpressions(effective(node)):
+			if found:
+				break
+			found = yield self.fallible(child)
+		self._fallible[id(node)] = found
+		return found
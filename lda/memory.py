@@ -0,0 +1,145 @@
+"""
+Memory accounting of a compilation.
+
+If `options.memory_report` is set, build_tree() and translate_tree() record
+a MemoryReport into the compilation's Telemetry (see lda.telemetry). Each
+phase ('syntax', 'semantic', 'translation') runs between two tracemalloc
+snapshots, which give:
+
+- peak: the most memory allocated at once during the phase, over what was
+  allocated before the phase started;
+- retained: the memory still allocated at the end of the phase (e.g. the
+  syntax tree, for the 'syntax' phase);
+- the source files that allocated the most retained memory.
+
+The report also breaks the checked syntax tree down by node class (count and
+shallow size of the nodes, including the lists and strings they own), and
+records the size of the PrettyPrinter's fragment list at its largest.
+
+Tracing memory slows the compiler down considerably, so phase timings
+recorded along with a memory report aren't meaningful.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import sys
+import tracemalloc
+
+from lda.telemetry import walk
+
+
+# number of allocation sites listed for each phase
+TOP_SITES = 5
+
+
+def owned_size(node):
+	"""
+	Shallow size of a node, plus the size of the lists and strings that it
+	references directly.
+	"""
+	size = sys.getsizeof(node)
+	values = list(getattr(node, '__dict__', {}).values())
+	for cls in type(node).__mro__:
+		slots = getattr(cls, '__slots__', ())
+		for slot in (slots,) if isinstance(slots, str) else slots:
+			if hasattr(node, slot):
+				values.append(getattr(node, slot))
+	for v in values:
+		if type(v) in (list, str):
+			size += sys.getsizeof(v)
+	return size
+
+
+class MemoryReport:
+	def __init__(self):
+		# phase -> {'peak': bytes, 'retained': bytes, 'sites': [(file, bytes)]}
+		self.phases = {}
+		# node class -> count, and node class -> bytes
+		self.node_counts = Counter()
+		self.node_bytes = Counter()
+		# largest PrettyPrinter fragment list, and total fragments
+		self.fragments_peak_count = 0
+		self.fragments_peak_bytes = 0
+		self.fragments_total = 0
+
+	@contextmanager
+	def phase(self, name):
+		started = not tracemalloc.is_tracing()
+		if started:
+			tracemalloc.start()
+		before = tracemalloc.take_snapshot()
+		tracemalloc.reset_peak()
+		current0 = tracemalloc.get_traced_memory()[0]
+		try:
+			yield
+		finally:
+			current1, peak = tracemalloc.get_traced_memory()
+			after = tracemalloc.take_snapshot()
+			if started:
+				tracemalloc.stop()
+			ignore = [tracemalloc.Filter(False, tracemalloc.__file__),
+					tracemalloc.Filter(False, __file__)]
+			stats = after.filter_traces(ignore).compare_to(
+					before.filter_traces(ignore), 'filename')
+			record = {
+				'peak': max(0, peak - current0),
+				'retained': current1 - current0,
+				'sites': [(s.traceback[0].filename, s.size_diff)
+						for s in stats[:TOP_SITES] if s.size_diff > 0],
+			}
+			old = self.phases.get(name)
+			if old is None or old['peak'] < record['peak']:
+				self.phases[name] = record
+
+	def count_nodes(self, root):
+		for node in walk(root):
+			name = type(node).__name__
+			self.node_counts[name] += 1
+			self.node_bytes[name] += owned_size(node)
+
+	def fragments(self, strings):
+		"""
+		Record the size of a PrettyPrinter's fragment list before it's joined.
+		"""
+		self.fragments_total += len(strings)
+		if len(strings) > self.fragments_peak_count:
+			self.fragments_peak_count = len(strings)
+			self.fragments_peak_bytes = sys.getsizeof(strings) + \
+					sum(sys.getsizeof(s) for s in strings)
+
+	def json(self):
+		return {
+			'phases': {name: {'peak': p['peak'], 'retained': p['retained'],
+					'sites': [{'file': f, 'bytes': b} for f, b in p['sites']]}
+					for name, p in self.phases.items()},
+			'nodes': {name: {'count': self.node_counts[name], 'bytes': b}
+					for name, b in self.node_bytes.items()},
+			'fragments': {
+				'peak_count': self.fragments_peak_count,
+				'peak_bytes': self.fragments_peak_bytes,
+				'total': self.fragments_total,
+			},
+		}
+
+	def format(self, top=15):
+		"""
+		Human-readable report.
+		"""
+		lines = ["{:<14} {:>12} {:>12}".format("phase", "pic (Kio)", "retenu (Kio)")]
+		for name, p in self.phases.items():
+			lines.append("{:<14} {:12.1f} {:12.1f}".format(
+					name, p['peak'] / 1024, p['retained'] / 1024))
+			for f, b in p['sites']:
+				lines.append("    {:10.1f}  {}".format(b / 1024, f))
+		lines.append("")
+		lines.append("{:<24} {:>8} {:>12}".format("nœud", "nombre", "taille (Kio)"))
+		for name, b in self.node_bytes.most_common(top):
+			lines.append("{:<24} {:8} {:12.1f}".format(
+					name, self.node_counts[name], b / 1024))
+		lines.append("{:<24} {:8} {:12.1f}".format("total",
+				sum(self.node_counts.values()), sum(self.node_bytes.values()) / 1024))
+		lines.append("")
+		lines.append("fragments : {} au plus ({:.1f} Kio), {} au total".format(
+				self.fragments_peak_count, self.fragments_peak_bytes / 1024,
+				self.fragments_total))
+		return "\n".join(lines)
@@ -3,6 +3,8 @@ from .lexicon import Lexicon
 from .errors import semantic
 
 class Module:
+	__slots__ = ('lexicon', 'functions', 'algorithms', 'telemetry')
+
 	# All identifiers at the module level will pertain
 	# to this "namespace" in the generated JS code.
 	js_namespace = "P."
@@ -22,7 +24,8 @@ class Module:
 				logger.log(semantic.SemanticError(a.pos,
 						"il ne peut y avoir qu'un seul algorithme par module"))
 		for alg in self.algorithms:
-			alg.check(context, logger)
+			with context.telemetry.function("<algorithme>", 'semantic'):
+				alg.check(context, logger)
 		# No need to check functions here, it was done by self.lexicon.check()
 		context.pop()
 
@@ -31,10 +34,12 @@ class Module:
 			pp.putline(self.lexicon)
 			pp.newline(2)
 		for function in self.functions:
-			pp.putline(function)
+			with pp.timing(function.name):
+				pp.putline(function)
 			pp.newline(2)
 		if self.algorithms:
-			pp.putline(self.algorithms[0])
+			with pp.timing("<algorithme>"):
+				pp.putline(self.algorithms[0])
 
 	def js(self, pp):
 		pp.putline("// Compiled program namespace")
@@ -44,11 +49,13 @@ class Module:
 			pp.putline(self.lexicon)
 			pp.newline(2)
 		for function in self.functions:
-			function.js(pp)
+			with pp.timing(function.name):
+				function.js(pp)
 			pp.putline(";")
 			pp.newline()
 		if self.algorithms:
-			self.algorithms[0].js(pp)
+			with pp.timing("<algorithme>"):
+				self.algorithms[0].js(pp)
 			pp.putline(";")
 
 	def quicklda(self):
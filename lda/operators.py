@@ -1,8 +1,9 @@
 from .expression import Expression, surround, nonwritable
 from .errors import semantic
 from . import types
-from . import kw
+from . import kw, kwtables
 from . import semantictools
+from . import visitor
 
 #######################################################################
 #
@@ -22,6 +23,8 @@ class NakedOperator:
 	Instances of NakedOperator must not be placed into the AST!
 	"""
 
+	__slots__ = ('pos', 'cls')
+
 	def __init__(self, pos, cls):
 		self.pos = pos
 		self.cls = cls
@@ -46,6 +49,8 @@ class UnaryOp(Expression):
 	Has a righthand-side operand only.
 	"""
 
+	__slots__ = ('pos', 'root', 'resolved_type', 'rhs')
+
 	right_ass = True
 	terminal = False
 
@@ -53,8 +58,10 @@ class UnaryOp(Expression):
 		super().__init__(pos)
 		self.rhs = rhs
 
+	compared_fields = ('rhs',)
+
 	def __eq__(self, other):
-		return type(self) == type(other) and self.rhs == other.rhs
+		return visitor.equal(self, other)
 
 	@surround
 	def lda(self, pp):
@@ -80,6 +87,8 @@ class BinaryOp(Expression):
 	attribute to the keyword that closes the list of parameters.
 	"""
 
+	__slots__ = ('pos', 'root', 'resolved_type', 'lhs', 'rhs')
+
 	right_ass = False
 	terminal = False
 
@@ -88,10 +97,10 @@ class BinaryOp(Expression):
 		self.lhs = lhs
 		self.rhs = rhs
 
+	compared_fields = ('lhs', 'rhs')
+
 	def __eq__(self, other):
-		return type(self) == type(other) and \
-				self.lhs == other.lhs and \
-				self.rhs == other.rhs
+		return visitor.equal(self, other)
 
 	@classmethod
 	def part_of_rhs(cls, whose):
@@ -116,9 +125,12 @@ class UnaryNumberOp(UnaryOp):
 	"""
 	Unary operator that can only be used with a number type.
 	"""
+
+	__slots__ = ()
+
 	@nonwritable
 	def check(self, context, logger):
-		self.rhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		rtype = self.rhs.resolved_type
 		if rtype not in (types.INTEGER, types.REAL):
 			logger.log(semantic.TypeError(self.pos, "cet opérateur unaire "
@@ -141,10 +153,13 @@ class BinaryChameleonOp(BinaryOp):
 	Binary operator taking operands of equivalent types. The type of the operator
 	is determined by the strongest type among the operands.
 	"""
+
+	__slots__ = ()
+
 	@nonwritable
 	def check(self, context, logger):
-		self.lhs.check(context, logger)
-		self.rhs.check(context, logger)
+		yield self.lhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		ltype, rtype = self.lhs.resolved_type, self.rhs.resolved_type
 		strongtype = ltype.equivalent(rtype)
 		if strongtype is None:
@@ -168,6 +183,8 @@ class BinaryPolymorphicOp(BinaryOp):
 	  `morph_table`.
 	"""
 
+	__slots__ = ('_morph',)
+
 	def check(self, context, logger, mode='r'):
 		"""
 		Check LHS, determine the operator's behavior from LHS's type, and
@@ -177,7 +194,7 @@ class BinaryPolymorphicOp(BinaryOp):
 		"""
 		# Guilty until proven innocent
 		self.resolved_type = types.ERRONEOUS
-		self.lhs.check(context, logger, mode)
+		yield self.lhs.check(context, logger, mode)
 		if isinstance(self.lhs.resolved_type, types.Scalar):
 			key = self.lhs.resolved_type
 		else:
@@ -189,7 +206,7 @@ class BinaryPolymorphicOp(BinaryOp):
 		else:
 			self._morph = morph_cls(self.pos, self.lhs, self.rhs)
 			# From now on, we're nothing more than a proxy to self._morph.
-			self.check_rhs(context, logger)
+			yield self.check_rhs(context, logger)
 
 	def __getattribute__(self, name):
 		try:
@@ -205,9 +222,11 @@ class BinaryPolymorphicOp(BinaryOp):
 		raise NotImplementedError
 
 class NumberArithmeticOp(BinaryChameleonOp):
+	__slots__ = ()
+
 	@nonwritable
 	def check(self, context, logger):
-		super().check(context, logger)
+		yield super().check(context, logger)
 		if self.resolved_type not in (types.INTEGER, types.REAL):
 			logger.log(semantic.TypeError(self.pos,
 					"cet opérateur ne peut être appliqué qu'à des nombres",
@@ -217,12 +236,15 @@ class BinaryComparisonOp(BinaryOp):
 	"""
 	Binary operator of boolean type, taking operands of equivalent types.
 	"""
-	resolved_type = types.BOOLEAN
+
+	__slots__ = ()
+
+	static_type = types.BOOLEAN
 
 	@nonwritable
 	def check(self, context, logger):
-		self.lhs.check(context, logger)
-		self.rhs.check(context, logger)
+		yield self.lhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		ltype, rtype = self.lhs.resolved_type, self.rhs.resolved_type
 		strongtype = ltype.equivalent(rtype)
 		if strongtype is None:
@@ -234,12 +256,15 @@ class BinaryLogicalOp(BinaryOp):
 	"""
 	Binary operator of boolean type, taking operands of boolean types.
 	"""
-	resolved_type = types.BOOLEAN
+
+	__slots__ = ()
+
+	static_type = types.BOOLEAN
 
 	@nonwritable
 	def check(self, context, logger):
 		for side in (self.lhs, self.rhs):
-			side.check(context, logger)
+			yield side.check(context, logger)
 			semantictools.enforce("cet opérande", types.BOOLEAN, side, logger)
 
 
@@ -250,23 +275,26 @@ class BinaryLogicalOp(BinaryOp):
 #######################################################################
 
 class UnaryPlus(UnaryNumberOp):
+	__slots__ = ()
 	keyword_def = kw.PLUS
 
 	def js(self, pp):
-		self.rhs.js(pp)
+		pp.put(self.rhs)
 
 class UnaryMinus(UnaryNumberOp):
+	__slots__ = ()
 	keyword_def = kw.MINUS
 	js_kw = "-"
 
 class LogicalNot(UnaryOp):
+	__slots__ = ()
 	keyword_def = kw.NOT
-	resolved_type = types.BOOLEAN
+	static_type = types.BOOLEAN
 	js_kw = "!"
 
 	@nonwritable
 	def check(self, context, logger):
-		self.rhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		semantictools.enforce("l'opérande du 'non'", types.BOOLEAN, self.rhs, logger)
 
 #######################################################################
@@ -276,6 +304,7 @@ class LogicalNot(UnaryOp):
 #######################################################################
 
 class _ArraySubscript(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.LSBRACK
 	closing = kw.RSBRACK
 
@@ -292,7 +321,7 @@ class _ArraySubscript(BinaryOp):
 			return
 		# check indices in arglist
 		for index in self.rhs:
-			index.check(context, logger)
+			yield index.check(context, logger)
 			semantictools.enforce("cet indice de tableau", types.INTEGER, index, logger)
 		self.resolved_type = array.resolved_element_type
 
@@ -323,6 +352,7 @@ class _ArraySubscript(BinaryOp):
 
 
 class _StringSubscript(BinaryOp):
+	__slots__ = ('index',)
 	keyword_def = kw.LSBRACK
 	closing = kw.RSBRACK
 
@@ -334,7 +364,7 @@ class _StringSubscript(BinaryOp):
 				self.pos, given=rdims, expected=1))
 			return
 		self.index = self.rhs[0]
-		self.index.check(context, logger)
+		yield self.index.check(context, logger)
 		itype = self.index.resolved_type
 		if itype is types.INTEGER:
 			self.resolved_type = types.CHARACTER
@@ -347,7 +377,7 @@ class _StringSubscript(BinaryOp):
 
 	def js(self, pp):
 		if self.resolved_type is types.CHARACTER:
-			pp.put(self.lhs, "[", self.index, "]")
+			pp.put("LDA.charAt(", self.lhs, ", ", self.index, ")")
 		elif self.resolved_type is types.STRING:
 			start = self.index.lhs
 			end = self.index.rhs
@@ -355,6 +385,10 @@ class _StringSubscript(BinaryOp):
 		else:
 			assert False
 
+	# JS setter: strings are immutable, the assignment has no effect
+	def js_assign_lhs(self, pp, assignment):
+		pp.put(self.lhs, "[", self.index, "] = ", assignment.rhs)
+
 	def lda(self, pp):
 		pp.put(self.lhs, "[", self.index, "]")
 
@@ -370,6 +404,8 @@ class Subscript(BinaryPolymorphicOp):
 	Unlike most expressions, this operator is *writable*.
 	"""
 
+	__slots__ = ()
+
 	keyword_def = kw.LSBRACK
 	closing = kw.RSBRACK
 
@@ -391,6 +427,8 @@ class FunctionCall(BinaryOp):
 	RHS is an arglist of effective parameters.
 	"""
 
+	__slots__ = ('function',)
+
 	keyword_def = kw.LPAREN
 	closing = kw.RPAREN
 
@@ -401,7 +439,7 @@ class FunctionCall(BinaryOp):
 
 	@nonwritable
 	def check(self, context, logger):
-		self.lhs.check(context, logger)
+		yield self.lhs.check(context, logger)
 		try:
 			self.function = self.lhs.bound
 			check_call = getattr(self.function, 'check_call')
@@ -409,7 +447,7 @@ class FunctionCall(BinaryOp):
 			logger.log(semantic.NonCallable(self.pos, self.lhs.resolved_type))
 			self.resolved_type = types.ERRONEOUS
 			return
-		check_call(context, logger, self.pos, self.rhs)
+		yield check_call(context, logger, self.pos, self.rhs)
 		self.resolved_type = self.function.resolved_return_type
 
 	def lda(self, pp):
@@ -431,18 +469,20 @@ class MemberSelect(BinaryOp):
 	Unlike most expressions, this operator is *writable*.
 	"""
 
+	__slots__ = ()
+
 	keyword_def = kw.DOT
 
 	def check(self, context, logger, mode='r'):
 		# LHS is supposed to refer to a TypeAlias, which refers to a composite
-		self.lhs.check(context, logger, mode)
+		yield self.lhs.check(context, logger, mode)
 		composite = self.lhs.resolved_type
 		if not isinstance(composite, types.Composite):
 			logger.log(semantic.NonComposite(self.pos, composite))
 			self.resolved_type = types.ERRONEOUS
 		else:
 			# use composite context exclusively for RHS
-			self.rhs.check(composite.context, logger)
+			yield self.rhs.check(composite.context, logger)
 			self.resolved_type = self.rhs.resolved_type
 
 	def lda(self, pp):
@@ -459,6 +499,8 @@ class Power(NumberArithmeticOp):
 	The typedef of both operands must resolve to a number.
 	"""
 
+	__slots__ = ()
+
 	keyword_def = kw.POWER
 	right_ass = True
 
@@ -466,29 +508,32 @@ class Power(NumberArithmeticOp):
 		pp.put("Math.pow(", self.lhs, ", ", self.rhs, ")")
 
 class Multiplication(NumberArithmeticOp):
+	__slots__ = ()
 	keyword_def = kw.TIMES
 	js_kw = "*"
 
 class RealDivision(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.SLASH
 	js_kw = "/"
-	resolved_type = types.REAL
+	static_type = types.REAL
 
 	@nonwritable
 	def check(self, context, logger):
 		for side in (self.lhs, self.rhs):
-			side.check(context, logger)
+			yield side.check(context, logger)
 			semantictools.enforce_compatible("les opérandes d'une division réelle",
 					types.REAL, self.lhs, logger)
 
 class IntegerDivision(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.COLON
-	resolved_type = types.INTEGER
+	static_type = types.INTEGER
 
 	@nonwritable
 	def check(self, context, logger):
 		for side in (self.lhs, self.rhs):
-			side.check(context, logger)
+			yield side.check(context, logger)
 			semantictools.enforce_compatible("les opérandes d'une division entière",
 					types.INTEGER, self.lhs, logger)
 
@@ -496,16 +541,18 @@ class IntegerDivision(BinaryOp):
 		pp.put("Math.floor((", self.lhs, "/", self.rhs, "))")
 
 class Modulo(NumberArithmeticOp):
+	__slots__ = ()
 	keyword_def = kw.MODULO
 	js_kw = "%"
 
 class _Addition(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.PLUS
 	js_kw = "+"
 
 	@nonwritable
 	def check_rhs(self, context, logger):
-		self.rhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		ltype, rtype = self.lhs.resolved_type, self.rhs.resolved_type
 		strongest = ltype.equivalent(rtype)
 		if strongest not in (types.INTEGER, types.REAL):
@@ -516,13 +563,14 @@ class _Addition(BinaryOp):
 			self.resolved_type = strongest
 
 class _Concatenation(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.PLUS
 	js_kw = "+"
-	resolved_type = types.STRING
+	static_type = types.STRING
 
 	@nonwritable
 	def check_rhs(self, context, logger):
-		self.rhs.check(context, logger)
+		yield self.rhs.check(context, logger)
 		ltype, rtype = self.lhs.resolved_type, self.rhs.resolved_type
 		strongest = ltype.equivalent(rtype)
 		if strongest not in (types.STRING, types.CHARACTER):
@@ -541,6 +589,8 @@ class Plus(BinaryPolymorphicOp):
 	check() anyway).
 	"""
 
+	__slots__ = ()
+
 	keyword_def = kw.PLUS
 	js_kw = "+" # Warning: this works because the JS plus has exactly the same behavior
 
@@ -556,51 +606,61 @@ class Plus(BinaryPolymorphicOp):
 	}
 
 class Subtraction(NumberArithmeticOp):
+	__slots__ = ()
 	keyword_def = kw.MINUS
 	js_kw = "-"
 
 class IntegerRange(BinaryOp):
+	__slots__ = ()
 	keyword_def = kw.DOTDOT
-	resolved_type = types.RANGE
+	static_type = types.RANGE
 
 	@nonwritable
 	def check(self, context, logger):
 		for operand in (self.lhs, self.rhs):
-			operand.check(context, logger)
+			yield operand.check(context, logger)
 			semantictools.enforce("une borne d'intervalle", types.INTEGER, operand, logger)
 
 	def js(self, pp):
 		raise NotImplementedError
 
 class LessThan(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.LT
 	js_kw = "<"
 
 class GreaterThan(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.GT
 	js_kw = ">"
 
 class LessOrEqual(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.LE
 	js_kw = "<="
 
 class GreaterOrEqual(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.GE
 	js_kw = ">="
 
 class Equal(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.EQ
 	js_kw = "==="
 
 class NotEqual(BinaryComparisonOp):
+	__slots__ = ()
 	keyword_def = kw.NE
 	js_kw = "!=="
 
 class LogicalAnd(BinaryLogicalOp):
+	__slots__ = ()
 	keyword_def = kw.AND
 	js_kw = "&&"
 
 class LogicalOr(BinaryLogicalOp):
+	__slots__ = ()
 	keyword_def = kw.OR
 	js_kw = "||"
 
@@ -634,6 +694,10 @@ binary_flat = [opcls for sublist in binary_precedence for opcls in sublist]
 unary_keyword_defs = [opcls.keyword_def for opcls in unary]
 binary_keyword_defs = [opcls.keyword_def for opcls in binary_flat]
 
+# first characters of the operators' synonyms (precomputed, see lda.kw)
+unary_initials = kwtables.UNARY_INITIALS
+binary_initials = kwtables.BINARY_INITIALS
+
 for cls in unary:
 	assert(issubclass(cls, UnaryOp))
 
@@ -18,6 +18,49 @@ from .vardecl import VarDecl
 from .lexicon import Lexicon
 
 
+class PendingExpression:
+	"""
+	Expression being parsed by Parser.analyze_expression, with its stacks of
+	operands, of binary operators awaiting their RHS, and of unary operators
+	awaiting their operand.
+
+	`opener` tells what encloses the expression: None at the top level,
+	kw.LPAREN for a parenthesized sub-expression, or the NakedOperator of an
+	encompassing operator for one of its arguments (`args` holds the
+	previous arguments, and `arg_pos` is the argument's position).
+	"""
+
+	__slots__ = ('root', 'opener', 'args', 'arg_pos', 'binary',
+			'operands', 'operators', 'unaries')
+
+	def __init__(self, root, opener=None, args=None, arg_pos=None):
+		self.root = root
+		self.opener = opener
+		self.args = args
+		self.arg_pos = arg_pos
+		self.binary = False
+		self.operands = []
+		self.operators = []
+		self.unaries = []
+
+	def push(self, nbo):
+		self.operators.append(nbo)
+		self.binary = True
+
+	def reduce(self, nbo):
+		"""
+		Build the pending binary operators whose RHS can't extend over the
+		next binary operator `nbo` (None at the end of the expression).
+
+		This is equivalent to recursive precedence climbing because the only
+		right-associative operator (Power) has a precedence level of its own.
+		"""
+		while self.operators and (nbo is None or
+				not nbo.cls.part_of_rhs(self.operators[-1].cls)):
+			rhs = self.operands.pop()
+			lhs = self.operands.pop()
+			self.operands.append(self.operators.pop().build(lhs, rhs))
+
 SCALARS_KW_TO_TYPE = {
 	kw.INT    : types.INTEGER,
 	kw.REAL   : types.REAL,
@@ -205,7 +248,10 @@ class Parser(BaseParser):
 			return identifier_class(pos, name)
 
 	def analyze_statement_list(self):
-		return list(yield_till_none(self.analyze_statement))
+		self.nest()
+		statement_list = list(yield_till_none(self.analyze_statement))
+		self.unnest()
+		return statement_list
 
 	def analyze_statement_block(self):
 		pos = self.pos
@@ -312,66 +358,97 @@ class Parser(BaseParser):
 		return statements.While(kwpos, condition, body)
 
 	def analyze_expression(self, root=True):
-		lhs = self.analyze_primary_expression()
-		if lhs is None:
-			return None
-		# try to find a binary operator
-		nbo1 = self.analyze_naked_binary_operator()
-		if nbo1 is None:
-			return lhs
-		expr, nbo2 = self.analyze_partial_expression(lhs, nbo1)
-		assert nbo2 is None, "expression complete but an operator is still pending!"
-		expr.root = root
-		return expr
-
-	def analyze_partial_expression(self, lhs, nbo1, min_p=0):
-		if nbo1 is not None:
-			assert isinstance(nbo1, operators.NakedOperator)
-			assert issubclass(nbo1.cls, operators.BinaryOp)
-		while nbo1 is not None and nbo1.cls.precedence >= min_p:
-			# Parse the righthand-side operand of the first operator.
-			if hasattr(nbo1.cls, 'closing'):
-				rhs = self.analyze_arglist(self.analyze_expression, nbo1.cls.closing)
-			else:
-				rhs = self.analyze_primary_expression()
-			if rhs is None:
-				raise syntax.MissingRightOperand(nbo1.pos)
-			# Parse the next operator, if any.
-			nbo2 = self.analyze_naked_binary_operator()
-			# Keep extending bo1's RHS as long as the operators to the right (bo2) are
-			# supposed to be part of its RHS (see BinaryOp.part_of_rhs
-			# to see what this means)
-			while nbo2 is not None and nbo2.cls.part_of_rhs(nbo1.cls):
-				rhs, nbo2 = self.analyze_partial_expression(
-						rhs, nbo2, nbo2.cls.precedence)
-			# At this point, either bo2 is an operator that's not supposed to
-			# be part of bo1's RHS, or we hit a non-expression token (in which
-			# case bo2 is None).
-			# Finish building the first binary operator and use it as the
-			# lefthand-side operand for the next operator.
-			lhs = nbo1.build(lhs, rhs)
-			# Prepare next iteration
-			nbo1 = nbo2
-		# Return bo1's LHS (which is supposed to be an expression node in its own
-		# right by now), and bo1 itself, which is a 'naked' operator (no LHS, no
-		# RHS) with a low precedence or None if it's not an operator at all.
-		return lhs, nbo1
-
-	def analyze_primary_expression(self):
-		# check for sub-expression enclosed in parenthesis
-		if self.softskip(kw.LPAREN):
-			sub_expr = self.analyze_expression(False)
-			self.hardskip(kw.RPAREN)
-			return sub_expr
-		# check for a unary operator
-		nuo = self.analyze_naked_operator(operators.unary)
-		if nuo is not None:
-			# analyze unary operator's operand, which is a primary expression
-			rhs = self.analyze_primary_expression()
-			if rhs is None:
-				raise syntax.MissingRightOperand(nuo.pos)
-			return nuo.build(rhs)
-		# terminal
+		"""
+		Parse an expression with operator precedence climbing.
+
+		Parenthesized sub-expressions, unary operators, and the arguments of
+		encompassing operators (see BinaryOp) don't recurse: every expression
+		being parsed is a PendingExpression on an explicit stack, so that
+		deeply nested expressions don't hit Python's recursion limit.
+		"""
+		stack = []
+		expr = PendingExpression(root)
+		while True:
+			# Expect an operand: open parentheses and stack unary operators
+			# until a terminal is found.
+			if self.softskip(kw.LPAREN):
+				self.nest()
+				stack.append(expr)
+				expr = PendingExpression(False, kw.LPAREN)
+				continue
+			nuo = self.analyze_naked_operator(operators.unary, operators.unary_initials)
+			if nuo is not None:
+				self.nest()
+				expr.unaries.append(nuo)
+				continue
+			operand = self.analyze_terminal_expression()
+			# Hand the operand over to the innermost expression, and close the
+			# expressions that end here. An operand is None if it is missing,
+			# or a list if it is the arglist of an encompassing operator.
+			while True:
+				while expr.unaries:
+					nuo = expr.unaries.pop()
+					if operand is None:
+						raise syntax.MissingRightOperand(nuo.pos)
+					operand = nuo.build(operand)
+					self.unnest()
+				if operand is None:
+					if expr.operators:
+						raise syntax.MissingRightOperand(expr.operators[-1].pos)
+					result = None
+				else:
+					expr.operands.append(operand)
+					nbo = self.analyze_naked_binary_operator()
+					expr.reduce(nbo)
+					if nbo is not None:
+						expr.push(nbo)
+						if not hasattr(nbo.cls, 'closing'):
+							# expect the operator's RHS operand
+							break
+						if self.softskip(nbo.cls.closing):
+							# empty arglist
+							operand = []
+							continue
+						self.nest()
+						stack.append(expr)
+						expr = self._start_argument(nbo, [])
+						break
+					result = expr.operands.pop()
+					if expr.binary:
+						result.root = expr.root
+				# The innermost expression is complete.
+				if expr.opener is None:
+					return result
+				if expr.opener is kw.LPAREN:
+					self.hardskip(kw.RPAREN)
+					self.unnest()
+					expr = stack.pop()
+					operand = result
+					continue
+				# argument of an encompassing operator
+				if result is None:
+					raise syntax.SyntaxError(expr.arg_pos, "argument malformé")
+				expr.args.append(result)
+				if self.softskip(kw.COMMA):
+					expr = self._start_argument(expr.opener, expr.args)
+					break
+				# See analyze_arglist about the comma.
+				self.hardskip(expr.opener.cls.closing, kw.COMMA)
+				self.unnest()
+				operand = expr.args
+				expr = stack.pop()
+
+	def _start_argument(self, nbo, args):
+		"""
+		Start parsing an argument of the encompassing operator `nbo`, whose
+		previous arguments are `args` (same errors as analyze_arglist).
+		"""
+		pos = self.pos
+		if self.softskip(kw.COMMA):
+			raise syntax.SyntaxError(pos, "argument vide")
+		return PendingExpression(True, nbo, args, pos)
+
+	def analyze_terminal_expression(self):
 		ident = self.analyze_identifier(expression.ExpressionIdentifier)
 		if ident is not None:
 			return ident
@@ -383,9 +460,13 @@ class Parser(BaseParser):
 				self.analyze_literal_boolean)
 
 	def analyze_naked_binary_operator(self):
-		return self.analyze_naked_operator(operators.binary_flat)
+		return self.analyze_naked_operator(operators.binary_flat, operators.binary_initials)
 
-	def analyze_naked_operator(self, op_list):
+	def analyze_naked_operator(self, op_list, initials):
+		# Most calls don't find any operator: weed them out without trying
+		# every operator's keyword.
+		if self.eof() or self.buf[self.pos.char] not in initials:
+			return None
 		pos = self.pos
 		for op_class in op_list:
 			if self.softskip(op_class.keyword_def):
@@ -456,7 +537,7 @@ class Parser(BaseParser):
 				if char == '"':
 					# skip trailing whitespace
 					self.advance()
-					raise StopIteration
+					return
 				elif char is None:
 					raise syntax.UnclosedItem(kwpos, "guillemet double non-refermé")
 				yield self.unescape(char)
@@ -4,7 +4,8 @@ Parser facilities.
 
 
 from . import position
-from .errors import syntax
+from .errors import syntax, limits
+from .limits import POLL_INTERVAL
 
 
 def yield_till_none(f):
@@ -14,7 +15,7 @@ def yield_till_none(f):
 	while True:
 		o = f()
 		if o is None:
-			raise StopIteration
+			return
 		yield o
 
 
@@ -56,10 +57,22 @@ def backtrack_if_missing(parser_method):
 		ret = parser_method(self, *args, **kwargs)
 		if ret is None:
 			self.pos = pos
+			if self.telemetry is not None:
+				self.telemetry.backtracks[parser_method.__name__] += 1
 		return ret
 	return wrapper
 
 
+def count_calls(telemetry, name, method):
+	"""
+	Wrap a bound analysis method so that its calls are counted.
+	"""
+	def wrapper(*args, **kwargs):
+		telemetry.rules[name] += 1
+		return method(*args, **kwargs)
+	return wrapper
+
+
 class BaseParser:
 	"""
 	Builds up an AST from source code.
@@ -83,10 +96,21 @@ class BaseParser:
 	  the parser from fully constructing the item. A SyntaxError exception is
 	  raised and the current position is left where the parser managed to make
 	  inroads.
+
+	The parser enforces the token and nesting limits set in the options, and
+	the deadline if one is given (see lda.limits).
 	"""
 
-	def __init__(self, options, buf, path):
+	def __init__(self, options, buf, path, telemetry=None, deadline=None):
 		assert hasattr(self, 're_identifier'), "please provide re_identifier"
+		# Parse rules are only instrumented for detailed telemetry (see
+		# lda.telemetry). Instance attributes shadow the analysis methods, so
+		# that every call goes through the counting wrapper.
+		self.telemetry = telemetry if telemetry is not None and telemetry.detailed else None
+		if self.telemetry is not None:
+			for name in dir(self):
+				if name.startswith('analyze_'):
+					setattr(self, name, count_calls(telemetry, name, getattr(self, name)))
 		self.raw_buf = buf
 		self.path = path or "<string>"
 		# set position to start of buffer
@@ -102,9 +126,43 @@ class BaseParser:
 			self.buf = self.raw_buf.lower()
 		else:
 			self.buf = self.raw_buf
+		# compilation limits
+		self.max_tokens = options.max_tokens
+		self.max_depth = options.max_depth
+		self.deadline = deadline
+		self.tokens = 0
+		self.depth = 0
+		self.next_poll = 0
 		# skip initial whitespace
 		self.advance()
 
+	def poll(self):
+		"""
+		Enforce the token limit and the deadline. Called by advance() every
+		once in a while.
+		"""
+		if self.max_tokens is not None and self.tokens > self.max_tokens:
+			raise limits.TooManyTokens(self.pos, self.max_tokens)
+		if self.deadline is not None:
+			self.deadline.check(self.pos)
+			self.next_poll = self.tokens + POLL_INTERVAL
+		else:
+			self.next_poll = float('inf')
+		if self.max_tokens is not None:
+			self.next_poll = min(self.next_poll, self.max_tokens + 1)
+
+	def nest(self):
+		"""
+		Enter a nested item (statement block, parenthesis...). Must be paired
+		with unnest().
+		"""
+		self.depth += 1
+		if self.max_depth is not None and self.depth > self.max_depth:
+			raise limits.TooDeep(self.pos, self.max_depth)
+
+	def unnest(self):
+		self.depth -= 1
+
 	@property
 	def last_good_match(self):
 		"""
@@ -121,7 +179,12 @@ class BaseParser:
 
 		This function must be called at the very beginning of a source file, and
 		after every operation that permanently consumes bytes from the buffer.
+		Each such operation counts as a token.
 		"""
+		if chars != 0:
+			self.tokens += 1
+		if self.tokens >= self.next_poll:
+			self.poll()
 		bpos = self.pos.char
 		line = self.pos.line
 		column = self.pos.column
@@ -229,9 +292,13 @@ class BaseParser:
 		Consume and return a keyword among a set of choices, or return None if
 		it cannot be found.
 		"""
+		if self.telemetry is not None:
+			self.telemetry.softskip_probes += len(choices)
 		for keyword in choices:
 			if self._softskip1(keyword):
 				return keyword
+		if self.telemetry is not None:
+			self.telemetry.softskip_misses += 1
 
 	def hardskip(self, *choices):
 		"""
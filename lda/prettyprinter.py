@@ -1,30 +1,164 @@
+import contextlib
+
 class PrettyPrinter:
 	"""
 	Facilitates the making of a properly-indented file.
+
+	By default, the source code is kept in memory and can be retrieved with
+	str(). If a `sink` is given (any object with a `write` method, such as a
+	file or an io.StringIO), the source code is streamed into it instead:
+	fragments are buffered until they amount to roughly `chunk_size`
+	characters, at which point they are written to the sink in a single call.
+	Don't forget to call flush() when you're done.
+
+	Export methods call each other through put() up to a nesting depth of
+	`max_recursion`. Deeper nodes are exported with an explicit stack instead
+	(see export()), so that arbitrarily deep syntax trees can be exported
+	without paying for the stack on ordinary ones.
 	"""
 
 	# must be defined by subclasses
 	export_method_name = None
 
-	def __init__(self):
+	# default size of the chunks written to the sink, in characters
+	chunk_size = 64 * 1024
+
+	# nesting depth of put() calls beyond which export() takes over
+	max_recursion = 50
+
+	# lda.telemetry.Telemetry recording per-function translation times
+	telemetry = None
+
+	# lda.memory.MemoryReport recording the size of the fragment list
+	memory = None
+
+	def __init__(self, sink=None, chunk_size=None):
 		self.indent = 0
 		self.strings = []
 		self.already_indented = False
+		self.sink = sink
+		self.buffered = 0
+		# nesting depth of put() calls
+		self.depth = 0
+		# operations queued by the export method being run (see export())
+		self.queue = None
+		if chunk_size is not None:
+			self.chunk_size = chunk_size
+
+	def timing(self, function_name):
+		"""
+		Context manager timing the translation of a function, if telemetry
+		is enabled.
+		"""
+		if self.telemetry is None:
+			return contextlib.nullcontext()
+		timer = self.telemetry.function(function_name, 'translation')
+		if self.queue is None:
+			return timer
+		return _QueuedContext(self, timer)
 
 	def put(self, *items):
 		"""
 		Append items to the source code at the current indentation level.
-		If an item is a string, append it right away; otherwise, invoke
+		If an item is a string, append it; otherwise, invoke
 		`item.<export_method_name>(self)`.
 		"""
-		for i in items:
-			if type(i) is str:
+		if self.queue is not None:
+			self.queue.extend(items)
+		elif self.depth >= self.max_recursion:
+			self.export(items)
+		else:
+			self.depth += 1
+			try:
+				for item in items:
+					if type(item) is str:
+						if not self.already_indented:
+							self.write('\t' * self.indent)
+							self.already_indented = True
+						# inlined write()
+						self.strings.append(item)
+						if self.sink is not None:
+							self.buffered += len(item)
+							if self.buffered >= self.chunk_size:
+								self.flush()
+					else:
+						getattr(item, self.export_method_name)(self)
+			finally:
+				self.depth -= 1
+
+	def export(self, items):
+		"""
+		Append items to the source code, using an explicit stack instead of
+		recursion. put() resorts to this once it is nested too deeply.
+
+		While an item's export method runs, the items it puts and the
+		operations it performs on the PrettyPrinter (write, newline, indented,
+		timing...) are queued. Once the export method returns, the queue is
+		pushed onto the stack, so that it gets processed before the items that
+		follow.
+		"""
+		stack = list(reversed(items))
+		pop = stack.pop
+		method_name = self.export_method_name
+		while stack:
+			item = pop()
+			if type(item) is str:
 				if not self.already_indented:
-					self.strings.append('\t' * self.indent)
+					self.write('\t' * self.indent)
 					self.already_indented = True
-				self.strings.append(i)
+				# inlined write()
+				self.strings.append(item)
+				if self.sink is not None:
+					self.buffered += len(item)
+					if self.buffered >= self.chunk_size:
+						self.flush()
+			elif type(item) is tuple:
+				# queued operation
+				item[0](*item[1])
 			else:
-				getattr(i, self.export_method_name)(self)
+				self.queue = []
+				try:
+					getattr(item, method_name)(self)
+				finally:
+					queue, self.queue = self.queue, None
+				queue.reverse()
+				stack.extend(queue)
+
+	def shift(self, delta):
+		"""
+		Change the indentation level.
+		"""
+		if self.queue is not None:
+			self.queue.append((self.shift, (delta,)))
+		else:
+			self.indent += delta
+
+	def write(self, string):
+		"""
+		Append a raw string to the source code, regardless of the current
+		indentation level.
+		"""
+		if self.queue is not None:
+			self.queue.append((self.write, (string,)))
+			return
+		self.strings.append(string)
+		if self.sink is not None:
+			self.buffered += len(string)
+			if self.buffered >= self.chunk_size:
+				self.flush()
+
+	def flush(self):
+		"""
+		Write all buffered fragments to the sink. Does nothing if there is no
+		sink.
+		"""
+		if self.sink is None or not self.strings:
+			return
+		if self.memory is not None:
+			self.memory.fragments(self.strings)
+		self.sink.write(''.join(self.strings))
+		self.strings.clear()
+		self.buffered = 0
 
 	def indented(self, exportfunc, *args):
 		"""
@@ -32,16 +166,19 @@ class PrettyPrinter:
 		:param exportfunc: export function. Typically put, putline, or join.
 		:param args: arguments passed to exportfunc
 		"""
-		self.indent += 1
+		self.shift(1)
 		exportfunc(*args)
-		self.indent -= 1
+		self.shift(-1)
 
 	def newline(self, count=1):
 		"""
 		Append line breaks to the source code.
 		:param count: optional number of line breaks (default: 1)
 		"""
-		self.strings.append(count*'\n')
+		if self.queue is not None:
+			self.queue.append((self.newline, (count,)))
+			return
+		self.write(count*'\n')
 		self.already_indented = False
 
 	def putline(self, *items):
@@ -72,11 +209,49 @@ class PrettyPrinter:
 		"""
 		Return the source code built so far.
 		"""
+		assert self.sink is None, "streamed source code can't be retrieved"
+		if self.memory is not None:
+			self.memory.fragments(self.strings)
 		return ''.join(self.strings)
 
+class _QueuedContext:
+	"""
+	Context manager queueing the entry and exit of another context manager,
+	so that it surrounds the queued operations (see PrettyPrinter.timing()).
+	"""
+
+	def __init__(self, pp, context):
+		self.pp = pp
+		self.context = context
+
+	def __enter__(self):
+		self.pp.queue.append((self.context.__enter__, ()))
+
+	def __exit__(self, *exc_info):
+		self.pp.queue.append((self.context.__exit__, (None, None, None)))
+		return False
+
 class LDAPrettyPrinter(PrettyPrinter):
 	export_method_name = "lda"
 
 class JSPrettyPrinter(PrettyPrinter):
 	export_method_name = "js"
 
+	# If True, inject instruction budget counters at loop iterations and
+	# function entries (see LDA.checkpoint in jsruntime/lda.js).
+	budget = False
+
+	# If True, emit functions as generators, and make them yield when they
+	# need input (see LDA.Session in jsruntime/lda.js). Only supported by the
+	# IR backend.
+	generators = False
+
+	def putbudget(self):
+		"""
+		Append a budget counter, if enabled.
+		"""
+		if self.budget:
+			self.putline("if (--LDA.countdown <= 0) LDA.checkpoint();")
+
+class PyPrettyPrinter(PrettyPrinter):
+	export_method_name = "py"
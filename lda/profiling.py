@@ -0,0 +1,151 @@
+"""
+Profile the compiler on a real input.
+
+A compiler phase ('parse', 'check', 'translate' or 'all') is run a number of
+times, after a few warm-up iterations that aren't profiled. Only the phase
+itself is profiled: the work needed to set up each iteration (e.g. parsing
+the program before checking it) isn't.
+
+Two profilers are available:
+- 'cprofile' writes PREFIX.pstats (see the pstats module, or snakeviz);
+- 'sampling' samples the stack every millisecond or so, and writes
+  PREFIX.collapsed, with one "frame;frame;frame count" line per stack, as
+  expected by flamegraph.pl or speedscope.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from lda import translate_tree, CompilationFailed
+
+
+PHASES = ('parse', 'check', 'translate', 'all')
+PROFILERS = ('cprofile', 'sampling')
+
+
+class Sampler:
+	"""
+	Sampling profiler: a thread records the stack of the profiled thread at
+	regular intervals, while it is enabled.
+	"""
+
+	def __init__(self, interval=0.001):
+		self.interval = interval
+		self.stacks = Counter()
+		self.enabled = False
+		self.stopped = False
+		self.target = threading.get_ident()
+		self.thread = threading.Thread(target=self.run, daemon=True)
+
+	def start(self):
+		self.switch_interval = sys.getswitchinterval()
+		sys.setswitchinterval(self.interval / 4)
+		self.thread.start()
+
+	def stop(self):
+		self.stopped = True
+		self.thread.join()
+		sys.setswitchinterval(self.switch_interval)
+
+	def enable(self):
+		self.enabled = True
+
+	def disable(self):
+		self.enabled = False
+
+	def run(self):
+		while not self.stopped:
+			time.sleep(self.interval)
+			if not self.enabled:
+				continue
+			frame = sys._current_frames().get(self.target)
+			stack = []
+			while frame is not None:
+				code = frame.f_code
+				stack.append("{} ({}:{})".format(code.co_name,
+						os.path.basename(code.co_filename), code.co_firstlineno))
+				frame = frame.f_back
+			self.stacks[';'.join(reversed(stack))] += 1
+
+	def dump_collapsed(self, path):
+		with open(path, 'wt', encoding='utf-8') as f:
+			for stack, count in sorted(self.stacks.items()):
+				f.write("{} {}\n".format(stack, count))
+
+
+def parse(options, buf, path):
+	from lda.errors import syntax
+	from lda.parser import Parser
+	try:
+		return Parser(options, buf, path).analyze_module()
+	except syntax.SyntaxError as e:
+		raise CompilationFailed([e], buf)
+
+def check(options, buf, module):
+	from lda.context import ContextStack
+	from lda.errors.handler import Logger
+	logger = Logger()
+	module.check(ContextStack(options), logger)
+	if logger:
+		raise CompilationFailed(logger.errors, buf)
+	return module
+
+
+def iteration(options, buf, path, phase, fmt):
+	"""
+	Return a (setup, run) pair of functions for one iteration of a phase:
+	run(setup()) performs the phase.
+	"""
+	if phase == 'parse':
+		return (lambda: None), (lambda _: parse(options, buf, path))
+	if phase == 'check':
+		return (lambda: parse(options, buf, path)), (lambda m: check(options, buf, m))
+	if phase == 'translate':
+		module = check(options, buf, parse(options, buf, path))
+		return (lambda: module), (lambda m: translate_tree(options, m, fmt))
+	if phase == 'all':
+		return (lambda: None), (lambda _: translate_tree(options,
+				check(options, buf, parse(options, buf, path)), fmt))
+	raise ValueError("unknown phase: " + phase)
+
+
+def profile(options, buf, path=None, phase='all', fmt='js', iterations=100,
+		warmup=3, profiler='cprofile', prefix='lda'):
+	"""
+	Profile `iterations` runs of a phase, and write the profile into
+	PREFIX.pstats or PREFIX.collapsed. Return a (output path, mean seconds per
+	iteration) tuple. Raise CompilationFailed if the program contains errors.
+	"""
+	setup, run = iteration(options, buf, path, phase, fmt)
+	for _ in range(warmup):
+		run(setup())
+	if profiler == 'cprofile':
+		import cProfile
+		p = cProfile.Profile()
+		output = prefix + ".pstats"
+	elif profiler == 'sampling':
+		p = Sampler()
+		p.start()
+		output = prefix + ".collapsed"
+	else:
+		raise ValueError("unknown profiler: " + profiler)
+	elapsed = 0
+	try:
+		for _ in range(iterations):
+			arg = setup()
+			t0 = time.perf_counter()
+			p.enable()
+			run(arg)
+			p.disable()
+			elapsed += time.perf_counter() - t0
+	finally:
+		if profiler == 'sampling':
+			p.stop()
+	if profiler == 'cprofile':
+		p.dump_stats(output)
+	else:
+		p.dump_collapsed(output)
+	return output, elapsed / max(1, iterations)
@@ -0,0 +1,467 @@
+"""
+Python port of the LDA runtime library (see jsruntime/lda.js), used to run
+programs translated to Python (translate_tree(..., fmt='py')) in-process.
+
+The generated code expects a global named `LDA` referring to a Runtime
+instance, which provides the same services as the `LDA` object of the
+JavaScript runtime. Where JavaScript and Python disagree (number formatting,
+modulo of negative numbers, division by zero...), the runtime follows
+JavaScript, so that both backends print the same output.
+
+JavaScript numbers are doubles: integers are exact up to 2**53 only. Python
+integers never lose precision, so the integer results that may grow beyond
+2**53 are rounded to floats with `jsint`, as JavaScript would have stored them.
+"""
+
+import copy
+import io
+import math
+import re
+import sys
+import threading
+import types
+
+
+#######################################################################
+#
+# EXCEPTIONS
+#
+#######################################################################
+
+class LDARuntimeError(Exception):
+	"""
+	Raised when an illegal operation occurs (e.g. accessing an array element
+	out of bounds).
+	"""
+
+
+class BudgetExceeded(Exception):
+	"""
+	Raised when a program runs out of its step or time budget.
+	"""
+
+
+#######################################################################
+#
+# ARGUMENT PASSING HELPERS
+#
+#######################################################################
+
+class Ptr:
+	"""
+	Fake pointer. Useful when passing `inout` parameters.
+
+	The pointed-to value can be read and written through the `v` property.
+	"""
+
+	__slots__ = ('getter', 'setter')
+
+	def __init__(self, getter, setter):
+		self.getter = getter
+		self.setter = setter
+
+	@property
+	def v(self):
+		return self.getter()
+
+	@v.setter
+	def v(self, value):
+		self.setter(value)
+
+
+def clone(obj):
+	"""
+	Clone an object. This is used to fake pass-by-copy.
+
+	Like LDA.clone in the JavaScript runtime, the clone is shallow: assigning
+	to the clone's fields or elements doesn't affect the original, but nested
+	composites and sub-arrays are shared.
+	"""
+	return copy.copy(obj)
+
+
+#######################################################################
+#
+# ARRAY
+#
+#######################################################################
+
+class Array:
+	"""
+	Construct an array and its sub-arrays recursively.
+
+	- dimensions: sequence of integer ranges, each represented by a (low,
+	  high) tuple. Range bounds are inclusive.
+	- filler: function that generates a value to fill the array with. If
+	  None, the array will be filled with None.
+	"""
+
+	__slots__ = ('low', 'high', 'items')
+
+	def __init__(self, dimensions, filler=None, n=0):
+		self.low, self.high = dimensions[n]
+		if self.low > self.high:
+			raise LDARuntimeError("array dimension: bad range (low > high)")
+		count = self.high - self.low + 1
+		if n < len(dimensions) - 1:
+			self.items = [Array(dimensions, filler, n+1) for _ in range(count)]
+		elif filler is None:
+			self.items = [None] * count
+		else:
+			self.items = [filler() for _ in range(count)]
+
+	def __copy__(self):
+		c = Array.__new__(Array)
+		c.low, c.high, c.items = self.low, self.high, self.items[:]
+		return c
+
+	def get(self, indices):
+		array = self
+		for i in indices:
+			if i < array.low or i > array.high:
+				raise LDARuntimeError("index out of bounds")
+			array = array.items[i - array.low]
+		if array is None:
+			raise LDARuntimeError("accessing null array element")
+		return array
+
+	def set(self, indices, value):
+		array = self
+		last = len(indices) - 1
+		for n, i in enumerate(indices):
+			if i < array.low or i > array.high:
+				raise LDARuntimeError("index out of bounds")
+			if n == last:
+				array.items[i - array.low] = value
+			else:
+				array = array.items[i - array.low]
+
+
+#######################################################################
+#
+# JAVASCRIPT-COMPATIBLE OPERATIONS
+#
+#######################################################################
+
+# largest magnitude up to which JavaScript represents all integers exactly
+MAX_EXACT_INTEGER = 1 << 53
+
+def jsint(value):
+	"""
+	Round an integer beyond 2**53 to the nearest float, like JavaScript.
+	"""
+	if -MAX_EXACT_INTEGER <= value <= MAX_EXACT_INTEGER:
+		return value
+	try:
+		return float(value)
+	except OverflowError:
+		return math.inf if value > 0 else -math.inf
+
+
+def tostr(value):
+	"""
+	Convert a value to a string the way JavaScript does.
+	"""
+	if type(value) is str:
+		return value
+	elif value is None:
+		return "null"
+	elif value is True:
+		return "true"
+	elif value is False:
+		return "false"
+	elif type(value) is int:
+		if -MAX_EXACT_INTEGER <= value <= MAX_EXACT_INTEGER:
+			return str(value)
+		return tostr(jsint(value))
+	elif type(value) is float:
+		if value != value:
+			return "NaN"
+		elif math.isinf(value):
+			return "Infinity" if value > 0 else "-Infinity"
+		elif value == 0:
+			return "0"
+		# Python's repr and JavaScript both find the shortest digit string
+		# that round-trips, but lay it out differently. Let the digits be
+		# 0.DIGITS * 10**n, then follow Number.prototype.toString.
+		sign = "-" if value < 0 else ""
+		mantissa, _, exponent = repr(abs(value)).partition('e')
+		whole, _, fraction = mantissa.partition('.')
+		n = int(exponent or 0) + len(whole)
+		digits = (whole + fraction).rstrip('0')
+		n -= len(digits) - len(digits.lstrip('0'))
+		digits = digits.lstrip('0')
+		k = len(digits)
+		if k <= n <= 21:
+			return sign + digits + "0" * (n - k)
+		elif 0 < n <= 21:
+			return sign + digits[:n] + "." + digits[n:]
+		elif -6 < n <= 0:
+			return sign + "0." + "0" * -n + digits
+		exponent = "e{}{}".format('+' if n > 0 else '-', abs(n - 1))
+		if k == 1:
+			return sign + digits + exponent
+		return sign + digits[0] + "." + digits[1:] + exponent
+	return "[object Object]"
+
+
+def div(a, b):
+	try:
+		return a / b
+	except ZeroDivisionError:
+		if a == 0 or a != a:
+			return math.nan
+		return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def idiv(a, b):
+	try:
+		return a // b
+	except ZeroDivisionError:
+		return div(a, b)
+
+
+def mod(a, b):
+	"""
+	Remainder with the sign of the dividend, like JavaScript's % operator.
+	"""
+	if b == 0:
+		return math.nan
+	if type(a) is int and type(b) is int:
+		r = abs(a) % abs(b)
+		return -r if a < 0 else r
+	return math.fmod(a, b)
+
+
+def power(a, b):
+	try:
+		r = a ** b
+	except ZeroDivisionError:
+		return math.inf
+	except OverflowError:
+		return math.inf
+	if type(r) is int:
+		return jsint(r)
+	return math.nan if type(r) is complex else r
+
+
+def charat(string, index):
+	"""
+	Character at an index. Out-of-range indices are errors, as they are for
+	arrays, and as in the JavaScript runtime (LDA.charAt).
+	"""
+	if index < 0 or index >= len(string):
+		raise LDARuntimeError("string index out of bounds")
+	return string[index]
+
+
+def substr(string, low, high):
+	"""
+	Substring between two inclusive indices (string.substr(low, 1+high-low) in
+	JavaScript).
+	"""
+	if low < 0:
+		low = max(0, len(string) + low)
+	return string[low : low + max(0, 1 + high - low)]
+
+
+#######################################################################
+#
+# TYPED INPUT
+#
+#######################################################################
+
+BOOLEAN_LITERALS = {
+	'vrai': True,
+	'true': True,
+	'oui': True,
+	'yes': True,
+	'faux': False,
+	'false': False,
+	'non': False,
+	'no': False,
+}
+
+_INT_PREFIX = re.compile(r'\s*[+-]?\d+')
+_REAL_PREFIX = re.compile(r'\s*[+-]?(Infinity|(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?)')
+
+def parse_int(line):
+	"""
+	Equivalent of JavaScript's parseInt(). Return None instead of NaN.
+	"""
+	m = _INT_PREFIX.match(line)
+	return jsint(int(m.group())) if m else None
+
+def parse_real(line):
+	"""
+	Equivalent of JavaScript's parseFloat(). Return None instead of NaN.
+	"""
+	m = _REAL_PREFIX.match(line)
+	return float(m.group().replace("Infinity", "inf")) if m else None
+
+def parse_bool(line):
+	return BOOLEAN_LITERALS.get(line.lower())
+
+def parse_char(line):
+	return line if len(line) == 1 else None
+
+
+#######################################################################
+#
+# RUNTIME
+#
+#######################################################################
+
+class Runtime:
+	"""
+	The `LDA` object seen by translated programs. Input is read from `stdin`
+	and output is written to `stdout` (file-like objects).
+	"""
+
+	RuntimeError = LDARuntimeError
+	BudgetExceeded = BudgetExceeded
+	Array = Array
+	Namespace = types.SimpleNamespace
+	ptr = Ptr
+	clone = staticmethod(clone)
+	tostr = staticmethod(tostr)
+	div = staticmethod(div)
+	idiv = staticmethod(idiv)
+	mod = staticmethod(mod)
+	power = staticmethod(power)
+	charat = staticmethod(charat)
+	substr = staticmethod(substr)
+
+	def __init__(self, stdin=None, stdout=None):
+		self.stdin = stdin if stdin is not None else sys.stdin
+		self.stdout = stdout if stdout is not None else sys.stdout
+
+	def print(self, *args):
+		self.stdout.write(' '.join(map(tostr, args)) + '\n')
+
+	def prompt(self, message):
+		self.stdout.write(message)
+		self.stdout.flush()
+		line = self.stdin.readline()
+		if not line:
+			raise LDARuntimeError("end of input")
+		return line.rstrip('\r\n')
+
+	def _read(self, message, convert):
+		v = convert(self.prompt(message))
+		while v is None:
+			self.print("Mauvais type ! Recommencez, SVP.")
+			v = convert(self.prompt(message))
+		return v
+
+	def readStr(self):
+		return self.prompt('chaîne> ')
+
+	def readInt(self):
+		return self._read('entier> ', parse_int)
+
+	def readReal(self):
+		return self._read('réel> ', parse_real)
+
+	def readBool(self):
+		return self._read('booléen> ', parse_bool)
+
+	def readChar(self):
+		return self._read('caractère> ', parse_char)
+
+
+#######################################################################
+#
+# DEEP RECURSION
+#
+#######################################################################
+
+# Each LDA call takes at least one Python frame (several in the interpreter).
+# With deep calls enabled, programs may recurse about as deeply as in the
+# JavaScript runtime.
+RECURSION_LIMIT = 200000
+THREAD_STACK_SIZE = 256 << 20
+
+_deep_calls = False
+
+def enable_deep_calls():
+	"""
+	Let programs recurse deeply: raise the recursion limit, and the stack size
+	of the threads started from now on, for the whole process. Both settings
+	are process-wide and never lowered again, so call this once at startup,
+	before starting other threads.
+	"""
+	global _deep_calls
+	if not _deep_calls:
+		sys.setrecursionlimit(max(RECURSION_LIMIT, sys.getrecursionlimit()))
+		threading.stack_size(THREAD_STACK_SIZE)
+		_deep_calls = True
+
+def call_deep(function, *args):
+	"""
+	Call a function and return its result or raise its exception. If deep
+	calls are enabled (see enable_deep_calls()), the call runs in a new thread,
+	which gets a large stack. A RecursionError is reported as an
+	LDARuntimeError, like the JavaScript runtime does.
+	"""
+	if not _deep_calls:
+		try:
+			return function(*args)
+		except RecursionError:
+			raise LDARuntimeError("too much recursion")
+	outcome = []
+	def target():
+		try:
+			outcome.append((True, function(*args)))
+		except BaseException as e:
+			outcome.append((False, e))
+	thread = threading.Thread(target=target)
+	thread.start()
+	thread.join()
+	ok, value = outcome[0]
+	if ok:
+		return value
+	if isinstance(value, RecursionError):
+		raise LDARuntimeError("too much recursion")
+	raise value
+
+
+#######################################################################
+#
+# RUNNING TRANSLATED PROGRAMS
+#
+#######################################################################
+
+def compile_program(source, filename="<lda>"):
+	"""
+	Compile Python source code produced by translate_tree(..., fmt='py') into
+	a code object, which may be executed any number of times.
+	"""
+	return compile(source, filename, 'exec')
+
+def load(code, stdin=None, stdout=None):
+	"""
+	Execute a translated program's top-level code (source or code object),
+	and return its `P` namespace, whose `main` attribute runs the algorithm.
+	"""
+	if isinstance(code, str):
+		code = compile_program(code)
+	namespace = {'LDA': Runtime(stdin, stdout)}
+	exec(code, namespace)
+	return namespace['P']
+
+def execute(code, stdin=None, stdout=None):
+	"""
+	Run a translated program's algorithm with the given input and output
+	streams (sys.stdin and sys.stdout by default).
+	"""
+	call_deep(load(code, stdin, stdout).main)
+
+def run(code, inputstr=''):
+	"""
+	Run a translated program with the given keyboard input and return its
+	output, like jsshell.run().
+	"""
+	stdout = io.StringIO()
+	execute(code, io.StringIO(inputstr.strip()), stdout)
+	return stdout.getvalue().replace("\r", "").strip()
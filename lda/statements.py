@@ -12,6 +12,8 @@ from .expression import LiteralInteger
 #######################################################################
 
 class StatementBlock:
+	__slots__ = ('pos', 'body', 'returns')
+
 	def __init__(self, pos, body):
 		self.pos = pos
 		self.body = body
@@ -37,7 +39,9 @@ class StatementBlock:
 		self.returns = False
 		warned = False
 		for statement in self:
-			statement.check(context, logger)
+			if context.deadline is not None:
+				context.deadline.check(statement.pos)
+			yield statement.check(context, logger)
 			if self.returns and not warned:
 				logger.log(semantic.UnreachableStatement(statement.pos))
 				warned = True
@@ -49,14 +53,16 @@ class Conditional(StatementBlock):
 	block is only executed if the condition is verified.
 	"""
 
+	__slots__ = ('condition',)
+
 	def __init__(self, pos, condition, body):
 		super().__init__(pos, body)
 		self.condition = condition
 
 	def check(self, context, logger):
-		self.condition.check(context, logger)
+		yield self.condition.check(context, logger)
 		semantictools.enforce("la condition", types.BOOLEAN, self.condition, logger)
-		super().check(context, logger)
+		yield super().check(context, logger)
 
 
 #######################################################################
@@ -66,6 +72,8 @@ class Conditional(StatementBlock):
 #######################################################################
 
 class Assignment:
+	__slots__ = ('pos', 'lhs', 'rhs')
+
 	returns = False
 
 	def __init__(self, pos, lhs, rhs):
@@ -74,8 +82,8 @@ class Assignment:
 		self.rhs = rhs
 
 	def check(self, context, logger):
-		self.lhs.check(context, logger, mode='w')
-		self.rhs.check(context, logger)
+		yield self.lhs.check(context, logger, mode='w')
+		yield self.rhs.check(context, logger)
 		ltype = self.lhs.resolved_type
 		rtype = self.rhs.resolved_type
 		if not ltype.compatible(rtype):
@@ -104,6 +112,8 @@ class Return:
 	May own an expression or not, in which case self.expression is None.
 	"""
 
+	__slots__ = ('pos', 'expression')
+
 	returns = True
 
 	def __init__(self, pos, expr):
@@ -123,7 +133,7 @@ class Return:
 
 	def check(self, context, logger):
 		if self.expression is not None:
-			self.expression.check(context, logger)
+			yield self.expression.check(context, logger)
 		# The return statement may only occur in a context owned by an algorithm
 		# or a function, so if the assertion below fails, we have a compiler bug.
 		assert hasattr(context.parent, "check_return"), "please implement check_return()"
@@ -139,6 +149,9 @@ class FunctionCallWrapper:
 	FunctionCall operators that are not the root of an expression must not use
 	this class.
 	"""
+
+	__slots__ = ('pos', 'call_op')
+
 	returns = False
 
 	def __init__(self, call_op):
@@ -152,7 +165,7 @@ class FunctionCallWrapper:
 		pp.put(self.call_op, ";")
 
 	def check(self, context, logger):
-		self.call_op.check(context, logger)
+		yield self.call_op.check(context, logger)
 
 
 #######################################################################
@@ -162,6 +175,8 @@ class FunctionCallWrapper:
 #######################################################################
 
 class If:
+	__slots__ = ('pos', 'conditionals', 'else_block', 'returns')
+
 	def __init__(self, conditionals, else_block=None):
 		self.pos = conditionals[0].pos
 		self.conditionals = conditionals
@@ -170,10 +185,10 @@ class If:
 	def check(self, context, logger):
 		self.returns = True
 		for clause in self.conditionals:
-			clause.check(context, logger)
+			yield clause.check(context, logger)
 			self.returns &= clause.returns
 		if self.else_block is not None:
-			self.else_block.check(context, logger)
+			yield self.else_block.check(context, logger)
 			self.returns &= self.else_block.returns
 		else:
 			self.returns = False
@@ -201,6 +216,8 @@ class If:
 		pp.put("}")
 
 class For(StatementBlock):
+	__slots__ = ('counter', 'initial', 'final')
+
 	_COMPONENT_NAMES = [
 			"le compteur de la boucle",
 			"la valeur initiale du compteur",
@@ -215,14 +232,14 @@ class For(StatementBlock):
 
 	def check(self, context, logger):
 		# Check each component
-		self.counter.check(context, logger, mode='w')
-		self.initial.check(context, logger)
-		self.final.check(context, logger)
+		yield self.counter.check(context, logger, mode='w')
+		yield self.initial.check(context, logger)
+		yield self.final.check(context, logger)
 		# Ensure they are all integers
 		components = [self.counter, self.initial, self.final]
 		for comp, name in zip(components, For._COMPONENT_NAMES):
 			semantictools.enforce(name, types.INTEGER, comp, logger)
-		super().check(context, logger)
+		yield super().check(context, logger)
 
 	def lda(self, pp):
 		pp.putline(kw.FOR, " ", self.counter, " ", kw.FROM, " ", self.initial,
@@ -262,6 +279,7 @@ class For(StatementBlock):
 		pp.put("; true; ")
 		synth_incr.js(pp, False)
 		pp.putline(") {")
+		pp.indented(pp.putbudget)
 		if self.body:
 			pp.indented(pp.putline, super())
 		# The stop condition is checked before incrementing the counter, so
@@ -271,6 +289,8 @@ class For(StatementBlock):
 		pp.put("}")
 
 class While(Conditional):
+	__slots__ = ()
+
 	def lda(self, pp):
 		pp.putline(kw.WHILE, " ", self.condition, " ", kw.DO)
 		if self.body:
@@ -279,6 +299,7 @@ class While(Conditional):
 
 	def js(self, pp):
 		pp.putline("while (", self.condition, ") {")
+		pp.indented(pp.putbudget)
 		if self.body:
 			pp.indented(pp.putline, super())
 		pp.put("}")
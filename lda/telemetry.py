@@ -0,0 +1,164 @@
+"""
+Compilation telemetry: where compile time goes, and what the compiler did.
+
+A Telemetry object is threaded through build_tree() and translate_tree(),
+which record the time spent in each phase ('syntax', 'semantic' and
+'translation') and in each function, and the errors found. If `detailed` is
+set, the parser also counts calls to each parse rule, rewinds caused by
+backtrack_if_missing and keyword probes (softskip), and the syntax tree's
+nodes are counted by class. This slows parsing down a bit.
+
+Telemetry objects can be merged (e.g. to accumulate totals in a server), and
+exported as JSON or as Prometheus counters.
+
+The `memory` attribute holds a MemoryReport if memory accounting was
+requested (see lda.memory); it isn't merged nor exported.
+"""
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+import time
+
+
+class Telemetry:
+	def __init__(self, detailed=False):
+		self.detailed = detailed
+		self.compilations = 0
+		# phase -> seconds
+		self.phases = Counter()
+		# (function name, phase) -> seconds
+		self.functions = Counter()
+		# parse rule -> number of calls
+		self.rules = Counter()
+		# parse rule -> number of rewinds
+		self.backtracks = Counter()
+		# keyword lookups, and those that failed
+		self.softskip_probes = 0
+		self.softskip_misses = 0
+		# node class -> count
+		self.nodes = Counter()
+		# error class -> count
+		self.errors = Counter()
+		# lda.memory.MemoryReport, or None
+		self.memory = None
+
+	@contextmanager
+	def phase(self, name):
+		memory = self.memory.phase(name) if self.memory is not None else nullcontext()
+		t0 = time.monotonic()
+		try:
+			with memory:
+				yield
+		finally:
+			self.phases[name] += time.monotonic() - t0
+
+	@contextmanager
+	def function(self, name, phase):
+		t0 = time.monotonic()
+		try:
+			yield
+		finally:
+			self.functions[name, phase] += time.monotonic() - t0
+
+	def count_errors(self, errors):
+		self.errors.update(e.__class__.__name__ for e in errors)
+
+	def count_nodes(self, root):
+		"""
+		Count the nodes of a syntax tree by class (if detailed).
+		"""
+		if self.detailed:
+			self.nodes.update(type(node).__name__ for node in walk(root))
+
+	def merge(self, other):
+		"""
+		Add another Telemetry's (or its json()'s) figures to this one's.
+		"""
+		if isinstance(other, dict):
+			other = Telemetry.from_json(other)
+		self.compilations += other.compilations
+		self.softskip_probes += other.softskip_probes
+		self.softskip_misses += other.softskip_misses
+		for k in ('phases', 'functions', 'rules', 'backtracks', 'nodes', 'errors'):
+			getattr(self, k).update(getattr(other, k))
+
+	def json(self):
+		return {
+			'compilations': self.compilations,
+			'phases': dict(self.phases),
+			'functions': [{'function': f, 'phase': p, 'seconds': s}
+					for (f, p), s in sorted(self.functions.items())],
+			'rules': dict(self.rules),
+			'backtracks': dict(self.backtracks),
+			'softskip_probes': self.softskip_probes,
+			'softskip_misses': self.softskip_misses,
+			'nodes': dict(self.nodes),
+			'errors': dict(self.errors),
+		}
+
+	@staticmethod
+	def from_json(j):
+		t = Telemetry()
+		t.compilations = j['compilations']
+		t.softskip_probes = j['softskip_probes']
+		t.softskip_misses = j['softskip_misses']
+		for k in ('phases', 'rules', 'backtracks', 'nodes', 'errors'):
+			getattr(t, k).update(j[k])
+		for f in j['functions']:
+			t.functions[f['function'], f['phase']] += f['seconds']
+		return t
+
+	def prometheus(self, prefix="lda"):
+		"""
+		Export as Prometheus counters (text exposition format). Per-function
+		timings are left out, since function names are unbounded.
+		"""
+		lines = []
+		def counter(name, help, values, label=None):
+			name = prefix + "_" + name
+			lines.append("# HELP {} {}".format(name, help))
+			lines.append("# TYPE {} counter".format(name))
+			if label is None:
+				lines.append("{} {}".format(name, values))
+				return
+			for k, v in sorted(values.items()):
+				lines.append('{}{{{}="{}"}} {}'.format(name, label, k, v))
+		counter("compilations_total", "Compilations.", self.compilations)
+		counter("phase_seconds_total", "Time spent in each compiler phase.",
+				self.phases, "phase")
+		counter("parse_rule_calls_total", "Calls to each parse rule.",
+				self.rules, "rule")
+		counter("parse_backtracks_total", "Rewinds after a parse rule failed.",
+				self.backtracks, "rule")
+		counter("softskip_probes_total", "Keyword lookups.", self.softskip_probes)
+		counter("softskip_misses_total", "Keyword lookups that failed.",
+				self.softskip_misses)
+		counter("nodes_total", "Syntax tree nodes, by class.", self.nodes, "type")
+		counter("errors_total", "Errors found, by class.", self.errors, "type")
+		return "\n".join(lines) + "\n"
+
+
+def walk(root):
+	"""
+	Yield every node reachable from root: objects defined in the lda package,
+	found in attributes, lists or tuples, except for positions.
+	"""
+	seen = set()
+	stack = [root]
+	while stack:
+		obj = stack.pop()
+		if isinstance(obj, (list, tuple)):
+			stack.extend(obj)
+			continue
+		if id(obj) in seen or not type(obj).__module__.startswith('lda.') \
+				or type(obj).__name__ == 'Position':
+			continue
+		seen.add(id(obj))
+		yield obj
+		attrs = getattr(obj, '__dict__', {})
+		stack.extend(attrs.values())
+		for cls in type(obj).__mro__:
+			slots = getattr(cls, '__slots__', ())
+			for slot in (slots,) if isinstance(slots, str) else slots:
+				if slot not in attrs and hasattr(obj, slot):
+					stack.append(getattr(obj, slot))
@@ -2,8 +2,8 @@ from .errors import semantic, handler
 from . import kw
 from . import prettyprinter
 from . import semantictools
+from . import visitor
 from .identifier import PureIdentifier
-from types import MethodType
 
 def nonvoid(t):
 	"""
@@ -28,6 +28,8 @@ class TypeDescriptor:
 	if this TypeDescriptor translates to an `object` type in JavaScript.
 	"""
 
+	__slots__ = ()
+
 	needs_initialization = False
 
 	def __eq__(self, other):
@@ -88,6 +90,8 @@ class BlackHole(TypeDescriptor):
 	an expression doesn't have a type.
 	"""
 
+	__slots__ = ('human_name', 'relevant_in_semantic_errors')
+
 	js_object = False
 
 	def __init__(self, human_name):
@@ -135,8 +139,13 @@ class Scalar(TypeDescriptor):
 	Scalar types are meant to be compared using Python's 'is' operator. As
 	such, the Scalar class is not meant to be instantiated (besides the
 	pre-defined Scalar instances in this module: INTEGER, REAL, etc.).
+
+	A scalar type may be equivalent to a `stronger` scalar type, e.g. an
+	integer can be used wherever a real is expected.
 	"""
 
+	__slots__ = ('keyword', 'name', 'stronger')
+
 	needs_initialization = True
 
 	# `number`, `boolean`, `string` are not objects in JavaScript
@@ -145,6 +154,7 @@ class Scalar(TypeDescriptor):
 	def __init__(self, keyword, name=None):
 		super().__init__()
 		self.keyword = keyword
+		self.stronger = None
 		if name is None:
 			self.name = str(self.keyword)
 		else:
@@ -159,6 +169,12 @@ class Scalar(TypeDescriptor):
 	def __repr__(self):
 		return self.name
 
+	def equivalent(self, other):
+		if other is self or other is self.stronger:
+			return other
+		if getattr(other, 'stronger', None) is self:
+			return self
+
 	def resolve_type(self, context, logger):
 		return self
 
@@ -168,16 +184,6 @@ class Scalar(TypeDescriptor):
 	def js_declare(self, pp):
 		pp.put("null")
 
-def _dual_scalar_compatibility(weak, strong):
-	def weak_equivalent(self, other):
-		if other in (weak, strong):
-			return other
-	def strong_equivalent(self, other):
-		if other in (weak, strong):
-			return self
-	weak.equivalent   = MethodType(weak_equivalent, weak)
-	strong.equivalent = MethodType(strong_equivalent, strong)
-
 INTEGER   = Scalar(kw.INT)
 REAL      = Scalar(kw.REAL)
 BOOLEAN   = Scalar(kw.BOOL)
@@ -186,8 +192,8 @@ STRING    = Scalar(kw.STRING)
 VOID      = Scalar(None, "<vide>")
 RANGE     = Scalar(None, "<intervalle>")
 
-_dual_scalar_compatibility(weak=INTEGER,   strong=REAL)
-_dual_scalar_compatibility(weak=CHARACTER, strong=STRING)
+INTEGER.stronger   = REAL
+CHARACTER.stronger = STRING
 
 #######################################################################
 #
@@ -202,6 +208,8 @@ class TypeAlias(PureIdentifier, TypeDescriptor):
 	It is bound to a Composite during the semantic analysis.
 	"""
 
+	__slots__ = ('bound',)
+
 	def resolve_type(self, context, logger):
 		try:
 			symbol = context[self.name]
@@ -223,8 +231,14 @@ class Array(TypeDescriptor):
 	"""
 	Array type declaration. The array must contain at least one dimension. Each
 	dimension can be static or dynamic.
+
+	The `dynamic` and `static` attributes are only set once the dimensions have
+	been checked (see resolve_type()).
 	"""
 
+	__slots__ = ('pos', 'element_type', 'dimensions', 'dynamic', 'static',
+			'needs_initialization', 'resolved_element_type')
+
 	js_object = True
 
 	class StaticDimension:
@@ -233,6 +247,8 @@ class Array(TypeDescriptor):
 		time.
 		"""
 
+		__slots__ = ('pos', 'expression', 'low', 'high')
+
 		def __init__(self, expression):
 			self.pos = expression.pos
 			self.expression = expression
@@ -253,7 +269,7 @@ class Array(TypeDescriptor):
 			# Don't let the expression look up variables.
 			# It has to be evaluable at compile time.
 			try:
-				self.expression.check({}, handler.Raiser())
+				visitor.run(self.expression.check({}, handler.Raiser()))
 			except semantic.MissingDeclaration as e:
 				logger.log(semantic.SemanticError(e.pos,
 						"il est interdit d'introduire des variables dans la définition "
@@ -278,6 +294,8 @@ class Array(TypeDescriptor):
 		Created from the '?' keyword.
 		"""
 
+		__slots__ = ('pos',)
+
 		def __init__(self, pos):
 			self.pos = pos
 
@@ -299,6 +317,7 @@ class Array(TypeDescriptor):
 		self.pos = pos
 		self.element_type = element_type
 		self.dimensions = dimensions
+		self.needs_initialization = False
 
 	def __eq__(self, other):
 		if self is other:
@@ -342,6 +361,27 @@ class Array(TypeDescriptor):
 							"complètement dynamique"))
 					erroneous = True
 					mixed_dims = True
+			# Don't let the JS runtime fill a huge static array.
+			max_cells = context.options.max_array_cells
+			if self.static and not erroneous and max_cells is not None:
+				from .limits import static_cells
+				from .errors.limits import ArrayTooLarge
+				cells = static_cells(self)
+				if cells is not None and cells > max_cells:
+					logger.log(ArrayTooLarge(self.pos, max_cells))
+					erroneous = True
+			# The backends build static arrays from the values of their bounds.
+			if self.static and not erroneous:
+				from .limits import constant_integer
+				for dim in self.dimensions:
+					for bound in (dim.low, dim.high):
+						value = constant_integer(bound)
+						if value is None or abs(value) == float('inf'):
+							logger.log(semantic.SemanticError(bound.pos,
+									"cette borne de tableau statique ne peut pas être "
+									"calculée (division par zéro, exposant négatif "
+									"ou valeur trop grande)"))
+							erroneous = True
 		# Resolve element type.
 		self.resolved_element_type = self.element_type.resolve_type(context, logger)
 		# If an error occured during this method, the entire type is erroneous.
@@ -402,6 +442,8 @@ class Composite(TypeDescriptor):
 	composite type) and a list of member fields.
 	"""
 
+	__slots__ = ('ident', 'fields', 'parent', 'context')
+
 	js_object = True
 
 	def __init__(self, ident, fields):
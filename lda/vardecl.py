@@ -23,6 +23,9 @@ class VarDecl:
 	lefthand side of an assignment statement.
 	"""
 
+	__slots__ = ('ident', 'type_descriptor', 'formal', 'inout', 'initialized',
+			'used', 'resolved_type', 'parent', 'js_fakeptr', 'js_fakepbc')
+
 	def __init__(self, ident, type_descriptor, formal, inout):
 		self.ident = ident
 		self.type_descriptor = type_descriptor
@@ -121,3 +124,9 @@ class VarDecl:
 		if access and self.js_fakeptr:
 			pp.put(".v")
 
+	def py_ident(self, pp, access):
+		"""
+		Generate Python identifier for this variable (see js_ident).
+		"""
+		self.js_ident(pp, access)
+
@@ -0,0 +1,90 @@
+"""
+Non-recursive syntax tree traversals.
+
+Statements and expressions can be nested arbitrarily deep, so the passes that
+walk them mustn't recurse on the Python stack:
+
+- Semantic checks are generators. A check method that needs to check a child
+  node yields the child's check (`yield self.rhs.check(context, logger)`),
+  and run() drives all these generators from an explicit stack. A check that
+  doesn't need to check anything else may be a regular method: yielding its
+  result (None) is harmless. Outside of a check, use run() to check a node.
+
+- The IR lowering pass and the interpreter's compiler follow the same scheme
+  as checks.
+
+- Exports (lda, js, py, ir) go through PrettyPrinter.put(). Past a certain
+  nesting depth, it queues what each export method puts instead of exporting
+  child nodes right away (see PrettyPrinter.export()).
+
+- Expressions are compared with equal().
+"""
+
+from types import GeneratorType
+
+
+def run(task):
+	"""
+	Run a task to completion, and return its result.
+
+	A task is a generator, or the result of a function that did its work
+	right away (typically None). Each value yielded by a generator is run as
+	a subtask, whose result is sent back into the generator. Exceptions raised
+	by a subtask are thrown into the generator that yielded it.
+	"""
+	if type(task) is not GeneratorType:
+		return task
+	stack = [task]
+	value = None
+	error = None
+	while stack:
+		try:
+			if error is None:
+				subtask = stack[-1].send(value)
+			else:
+				error, e = None, error
+				subtask = stack[-1].throw(e)
+		except StopIteration as stop:
+			stack.pop()
+			value = stop.value
+			continue
+		except BaseException as e:
+			stack.pop()
+			if not stack:
+				raise
+			error = e
+			continue
+		if type(subtask) is GeneratorType:
+			stack.append(subtask)
+			value = None
+		else:
+			value = subtask
+	return value
+
+
+def equal(a, b):
+	"""
+	Compare two expressions (or lists of expressions) like `a == b` would.
+
+	Nodes whose class defines `compared_fields` are equal if they are of the
+	same class and if these fields are equal; other nodes are compared with
+	their own __eq__ method, which mustn't recurse.
+	"""
+	stack = [(a, b)]
+	while stack:
+		a, b = stack.pop()
+		if type(a) is list:
+			if type(b) is not list or len(a) != len(b):
+				return False
+			# list.__eq__ considers identical items equal
+			stack.extend((x, y) for x, y in zip(reversed(a), reversed(b)) if x is not y)
+			continue
+		fields = getattr(type(a), 'compared_fields', None)
+		if fields is None:
+			if not a == b:
+				return False
+		elif type(a) != type(b):
+			return False
+		else:
+			stack.extend((getattr(a, f), getattr(b, f)) for f in reversed(fields))
+	return True
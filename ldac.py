@@ -2,18 +2,33 @@
 
 """
 LDA compiler command line front-end.
+
+Given several files, directories or glob patterns, ldac compiles them all in a
+process pool (batch mode), writes each output file next to its input (or into
+--output-dir), and prints one JSON record per file on stdout.
+
+Startup time is most of the wall time of a one-shot compilation, so modules
+that only some modes need are imported when these modes run.
 """
 
 from lda import build_tree, translate_tree, CompilationFailed
+from lda.telemetry import Telemetry
+from lda import profiling
 import argparse
+import glob
+import os
 import sys
+import time
 
 ap = argparse.ArgumentParser(
 	description="Compilateur de LDA (langage de description d'algorithme)")
 
-ap.add_argument('path',
+ap.add_argument('paths',
 		metavar='LDA',
-		help="chemin vers un fichier LDA")
+		nargs='+',
+		help="""chemin vers un fichier LDA. Plusieurs fichiers, dossiers ou
+		motifs (*.lda, **/*.lda) peuvent être donnés pour les compiler
+		en lot""")
 
 ap.add_argument('--format', '-f',
 		default='js',
@@ -23,6 +38,14 @@ ap.add_argument('--output-file', '-o',
 		help="""fichier de sortie.
 		Si omis, le résultat sera émis sur stdout.""")
 
+ap.add_argument('--output-dir', '-d',
+		help="""(en lot) dossier où écrire les fichiers compilés.
+		Si omis, chaque fichier compilé est écrit à côté de sa source.""")
+
+ap.add_argument('--jobs', '-j', type=int, default=None,
+		help="""(en lot) nombre de processus de compilation
+		(par défaut, un par cœur)""")
+
 ap.add_argument('--no-output', '-n', action='store_true',
 		help="""vérifie uniquement la cohérence syntaxique et sémantique
 		sans générer de code""")
@@ -30,30 +53,283 @@ ap.add_argument('--no-output', '-n', action='store_true',
 ap.add_argument('--ignore-case', '-c', action='store_true',
 		help="""Ignorer la casse dans les identificateurs et les mot-clés""")
 
+ap.add_argument('--ir-backend', action='store_true',
+		help="""Générer le JavaScript à partir de la représentation
+		intermédiaire (utiliser -f ir pour afficher celle-ci)""")
+
+ap.add_argument('--budget', action='store_true',
+		help="""Injecter des compteurs d'instructions dans le JavaScript généré,
+		pour pouvoir interrompre les programmes qui ne terminent pas
+		(voir LDA.setBudget et LDA.onYield dans jsruntime/lda.js)""")
+
+ap.add_argument('--generators', action='store_true',
+		help="""Générer les fonctions sous forme de générateurs JavaScript, qui
+		rendent la main au lieu de bloquer lorsqu'ils attendent une saisie
+		(voir LDA.Session dans jsruntime/lda.js)""")
+
 ap.add_argument('--execute', '-x', action='store_true',
 		help="""Exécuter le programme immédiatement s'il ne contient
 		aucune erreur""")
 
-args = ap.parse_args()
-
-args.extra_js_code = ""
-args.stats_comment = True
-
-try:
-	module = build_tree(args, None, args.path)
-except CompilationFailed as cf:
-	for error in cf.errors:
-		print(error.pretty(cf.buf), file=sys.stderr)
-	sys.exit(1)
-if args.no_output:
-	sys.exit(0)
-code = translate_tree(args, module, args.format)
-if args.execute:
-	assert args.format == 'js', "on ne peut exécuter que du JavaScript !"
-	import jsshell
-	jsshell.run_interactive(code + "\nP.main();")
-elif args.output_file:
-	with open(args.output_file, 'wt', encoding='utf8') as f:
-		f.write(code)
-else:
-	print(code)
+ap.add_argument('--memory-report', action='store_true',
+		help="""Mesurer la mémoire utilisée par chaque phase de la compilation
+		(pic, mémoire retenue, taille de l'arbre syntaxique par type de nœud)
+		et l'afficher sur stderr (en lot : dans l'enregistrement JSON).
+		Ralentit fortement la compilation""")
+
+limits = ap.add_argument_group("limites",
+		"""Limites de compilation, pour les programmes dont on ne connaît pas
+		la provenance (voir lda/limits.py). Par défaut, aucune limite.""")
+
+limits.add_argument('--max-source-bytes', type=int, metavar='N',
+		help="taille maximale du fichier source, en octets")
+
+limits.add_argument('--max-tokens', type=int, metavar='N',
+		help="nombre maximal de symboles lus par l'analyse syntaxique")
+
+limits.add_argument('--max-depth', type=int, metavar='N',
+		help="""profondeur maximale d'imbrication (blocs d'instructions,
+		parenthèses, arguments, opérateurs unaires)""")
+
+limits.add_argument('--max-errors', type=int, metavar='N',
+		help="nombre d'erreurs sémantiques au-delà duquel l'analyse s'arrête")
+
+limits.add_argument('--max-array-cells', type=int, metavar='N',
+		help="nombre maximal de cases d'un tableau statique")
+
+limits.add_argument('--deadline', type=float, metavar='SECONDES',
+		help="temps maximal alloué aux analyses syntaxique et sémantique")
+
+ap.add_argument('--profile', choices=profiling.PHASES,
+		help="""Profiler le compilateur : répéter une phase (analyse
+		syntaxique, sémantique, traduction, ou tout) sur le fichier donné, et
+		écrire le profil dans PREFIXE.pstats ou PREFIXE.collapsed""")
+
+ap.add_argument('--profile-iterations', type=int, default=20, metavar='N',
+		help="(profil) nombre d'itérations profilées")
+
+ap.add_argument('--profile-warmup', type=int, default=3, metavar='N',
+		help="(profil) nombre d'itérations de chauffe, non profilées")
+
+ap.add_argument('--profiler', choices=profiling.PROFILERS, default='cprofile',
+		help="""(profil) cprofile (.pstats) ou échantillonnage des piles
+		(.collapsed, pour flamegraph.pl ou speedscope)""")
+
+ap.add_argument('--profile-output', metavar='PREFIXE',
+		help="""(profil) préfixe des fichiers de profil
+		(par défaut, le nom du fichier LDA suivi de la phase)""")
+
+
+#######################################################################
+#
+# BATCH MODE
+#
+#######################################################################
+
+def expand(paths):
+	"""
+	Yield the LDA files designated by paths, directories or glob patterns.
+	"""
+	for path in paths:
+		if glob.has_magic(path):
+			yield from sorted(glob.glob(path, recursive=True))
+		elif os.path.isdir(path):
+			for dirpath, dirnames, filenames in os.walk(path):
+				dirnames.sort()
+				for fn in sorted(filenames):
+					if fn.endswith('.lda'):
+						yield os.path.join(dirpath, fn)
+		else:
+			yield path
+
+def output_path(args, path):
+	stem = os.path.splitext(path)[0]
+	out = stem + '.' + args.format
+	if os.path.abspath(out) == os.path.abspath(path):
+		out = stem + '.out.' + args.format
+	if args.output_dir:
+		rel = os.path.relpath(out)
+		if rel.startswith(os.pardir):
+			rel = os.path.basename(out)
+		out = os.path.join(args.output_dir, rel)
+	return out
+
+def write_output(args, module, out):
+	"""
+	Translate a module into a file. The translation goes to a temporary file,
+	renamed into place once complete, so that a failed translation leaves no
+	partial output behind.
+	"""
+	tmp = "{}.{}.tmp".format(out, os.getpid())
+	try:
+		with open(tmp, 'wt', encoding='utf8') as f:
+			translate_tree(args, module, args.format, f)
+		os.replace(tmp, out)
+	except BaseException:
+		os.remove(tmp)
+		raise
+
+def compile_file(args, path):
+	"""
+	Compile a file (in a pool process) and return its JSON record.
+	"""
+	record = {'path': path, 'output': None, 'status': 'ok', 'errors': [], 'timings': {}}
+	telemetry = Telemetry()
+	t0 = time.monotonic()
+	try:
+		module = build_tree(args, None, path, telemetry)
+		if not args.no_output:
+			out = output_path(args, path)
+			os.makedirs(os.path.dirname(out) or os.curdir, exist_ok=True)
+			write_output(args, module, out)
+			record['output'] = out
+	except CompilationFailed as cf:
+		record['status'] = 'error'
+		record['errors'] = [e.json() for e in cf.errors]
+	except Exception as e:
+		record['status'] = 'crash'
+		record['errors'] = [{'message': repr(e)}]
+	record['timings'] = dict(telemetry.phases, total=time.monotonic() - t0)
+	if telemetry.memory is not None:
+		record['memory'] = telemetry.memory.json()
+	return record
+
+def compile_isolated(args, path):
+	"""
+	Compile a file in a pool process of its own, and return its JSON record,
+	even if the process dies.
+	"""
+	from concurrent.futures import ProcessPoolExecutor
+	from concurrent.futures.process import BrokenProcessPool
+	with ProcessPoolExecutor(1) as executor:
+		try:
+			return executor.submit(compile_file, args, path).result()
+		except BrokenProcessPool as e:
+			return {'path': path, 'output': None, 'status': 'crash',
+					'errors': [{'message': repr(e)}], 'timings': {}}
+
+def batch(args):
+	"""
+	Compile many files, and return the exit status: 0 if all of them were
+	compiled, 1 if some contain errors, 2 if the compiler crashed on some of
+	them (or no file was found).
+
+	A pool process that dies (e.g. killed for running out of memory) breaks
+	the pool: the file it was compiling is reported as a crash, and the
+	remaining files go to a new pool.
+	"""
+	from concurrent.futures import ProcessPoolExecutor
+	from concurrent.futures.process import BrokenProcessPool
+	import json
+	paths = list(expand(args.paths))
+	counts = {'ok': 0, 'error': 0, 'crash': 0}
+	executor = ProcessPoolExecutor(args.jobs)
+	try:
+		futures = [executor.submit(compile_file, args, path) for path in paths]
+		for i, path in enumerate(paths):
+			try:
+				record = futures[i].result()
+			except BrokenProcessPool:
+				# Every file in flight failed: find out if this one is to blame.
+				executor.shutdown()
+				record = compile_isolated(args, path)
+				executor = ProcessPoolExecutor(args.jobs)
+				futures[i + 1:] = [f if f.done() and f.exception() is None
+						else executor.submit(compile_file, args, p)
+						for f, p in zip(futures[i + 1:], paths[i + 1:])]
+			counts[record['status']] += 1
+			print(json.dumps(record, ensure_ascii=False), flush=True)
+	finally:
+		executor.shutdown()
+	print("{} fichiers : {ok} compilés, {error} avec erreurs, {crash} plantages"
+			.format(len(paths), **counts), file=sys.stderr)
+	if counts['crash'] or not paths:
+		return 2
+	return 1 if counts['error'] else 0
+
+
+#######################################################################
+#
+# SINGLE FILE
+#
+#######################################################################
+
+def single(args):
+	try:
+		module = build_tree(args, None, args.paths[0])
+	except CompilationFailed as cf:
+		for error in cf.errors:
+			print(error.pretty(cf.buf), file=sys.stderr)
+		return 1
+	if args.no_output:
+		return 0
+	if args.execute and args.format == 'py':
+		from lda import pyruntime
+		pyruntime.enable_deep_calls()
+		try:
+			pyruntime.execute(translate_tree(args, module, args.format))
+		except pyruntime.LDARuntimeError as e:
+			print("Erreur d'exécution :", e, file=sys.stderr)
+			return 1
+	elif args.execute:
+		assert args.format == 'js', "on ne peut exécuter que du JavaScript ou du Python !"
+		code = translate_tree(args, module, args.format)
+		import jsshell
+		if args.generators:
+			jsshell.run_interactive(code + "\nLDA.runSync(P.main());")
+		else:
+			jsshell.run_interactive(code + "\nP.main();")
+	elif args.output_file:
+		write_output(args, module, args.output_file)
+	else:
+		translate_tree(args, module, args.format, sys.stdout)
+	if module.telemetry.memory is not None:
+		print(module.telemetry.memory.format(), file=sys.stderr)
+	return 0
+
+
+#######################################################################
+#
+# PROFILING
+#
+#######################################################################
+
+def profile(args):
+	path = args.paths[0]
+	with open(path, 'rt', encoding='utf-8') as f:
+		buf = f.read()
+	prefix = args.profile_output or \
+			os.path.splitext(path)[0] + "." + args.profile
+	try:
+		output, mean = profiling.profile(args, buf, path, args.profile,
+				args.format, args.profile_iterations, args.profile_warmup,
+				args.profiler, prefix)
+	except CompilationFailed as cf:
+		for error in cf.errors:
+			print(error.pretty(cf.buf), file=sys.stderr)
+		return 1
+	print("{} : {} itérations, {:.2f} ms par itération -> {}".format(
+			args.profile, args.profile_iterations, mean * 1000, output),
+			file=sys.stderr)
+	return 0
+
+
+def main():
+	args = ap.parse_args()
+	args.extra_js_code = ""
+	args.stats_comment = True
+	is_batch = len(args.paths) > 1 or args.output_dir or \
+			any(glob.has_magic(p) or os.path.isdir(p) for p in args.paths)
+	if args.profile and is_batch:
+		ap.error("--profile ne s'applique qu'à un seul fichier")
+	if args.profile:
+		return profile(args)
+	if not is_batch:
+		return single(args)
+	if args.execute or args.output_file:
+		ap.error("--execute et --output-file ne s'appliquent qu'à un seul fichier")
+	return batch(args)
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+
+"""
+LDA compile service: a small HTTP/JSON server keeping the compiler warm.
+
+	POST /compile
+	{"source": "...", "format": "js", "options": {"ignore_case": false, ...}}
+
+Responses are JSON objects:
+- 200: {"status": "ok", "code": "..."}
+- 422: {"status": "error", "errors": [LDAError.json(), ...]}, including
+  programs exceeding a compilation limit (see LIMITS)
+- 4xx/5xx: {"status": "error", "message": "..."} for malformed requests, or
+  when too many requests are pending.
+
+Identical requests arriving while the first one is being compiled wait for
+its result instead of being compiled again (see SingleFlight).
+
+Compilation runs in a bounded pool of worker processes. Connections are kept
+alive (HTTP/1.1). Each response carries a Server-Timing header with the time
+spent waiting for a worker and in each compiler phase.
+
+In prefork mode (--prefork N), a master process loads and warms up the
+compiler, freezes its heap, and forks N workers sharing the listening socket
+and, copy-on-write, the compiler's memory. Each worker compiles in-process,
+and is replaced after serving a number of requests or when it grows too big.
+GET /metrics returns the service's counters (per worker, in prefork mode), and
+GET /metrics/prometheus the compiler's telemetry (see lda.telemetry) as
+Prometheus counters. In prefork mode, each worker reports its own telemetry.
+"""
+
+import argparse
+import asyncio
+import gc
+import hashlib
+import json
+import os
+import signal
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+from lda import build_tree, translate_tree, CompilationFailed, DefaultOptions
+from lda.telemetry import Telemetry
+
+
+# Options that clients may set.
+CLIENT_OPTIONS = ('ignore_case', 'ir_backend', 'budget', 'generators')
+
+# Compilation limits (see lda.limits), so that no program can hold a worker
+# for long. The depth limit also keeps the recursive statement parser away
+# from Python's recursion limit. The other passes walk syntax trees without
+# recursion (see lda.visitor): long chains of binary operators, which the
+# depth limit doesn't count, are fine.
+LIMITS = {
+	'max_source_bytes': 256 << 10,
+	'max_tokens': 200000,
+	'max_depth': 100,
+	'max_errors': 100,
+	'max_array_cells': 10 ** 7,
+	'deadline': 5.0,
+}
+
+FORMATS = ('js', 'lda', 'py', 'ir')
+
+MAX_BODY_SIZE = 1 << 20
+MAX_HEADER_LINES = 100
+
+REASONS = {
+	200: "OK",
+	400: "Bad Request",
+	404: "Not Found",
+	405: "Method Not Allowed",
+	413: "Payload Too Large",
+	422: "Unprocessable Entity",
+	500: "Internal Server Error",
+	503: "Service Unavailable",
+}
+
+
+class BadRequest(Exception):
+	def __init__(self, status, message):
+		super().__init__(message)
+		self.status = status
+
+
+def make_options(client_options):
+	options = DefaultOptions()
+	options.stats_comment = False
+	for k, v in LIMITS.items():
+		setattr(options, k, v)
+	for k, v in client_options.items():
+		if k not in CLIENT_OPTIONS or not isinstance(v, bool):
+			raise BadRequest(400, "bad option: {}".format(k))
+		setattr(options, k, v)
+	return options
+
+
+def compile_source(source, fmt, client_options, detailed=False):
+	"""
+	Compile a program (in a worker process). Return a (status, body, telemetry)
+	tuple, where telemetry is the compilation's Telemetry in JSON form.
+	"""
+	options = make_options(client_options)
+	telemetry = Telemetry(detailed)
+	try:
+		module = build_tree(options, source, telemetry=telemetry)
+	except CompilationFailed as cf:
+		return 422, {'status': 'error', 'errors': [e.json() for e in cf.errors]}, telemetry.json()
+	code = translate_tree(options, module, fmt)
+	return 200, {'status': 'ok', 'code': code}, telemetry.json()
+
+
+class SingleFlight:
+	"""
+	Coalesce concurrent identical calls: while a call with a given key is in
+	flight, further calls with the same key wait for it, and get its result
+	or its exception.
+
+	Counters:
+	- misses: calls actually made
+	- hits: calls that waited for an identical call in flight
+	- coalesced: calls whose outcome was shared by several callers
+	"""
+
+	def __init__(self):
+		self.flights = {}
+		self.misses = 0
+		self.hits = 0
+		self.coalesced = 0
+
+	async def do(self, key, function, *args):
+		"""
+		Return `await function(*args)`, unless a call with the same key is
+		already in flight.
+
+		The call runs in a task of its own: a caller that is cancelled (e.g.
+		when its client disconnects) leaves it running for the other callers.
+		It is only cancelled along with the last one.
+		"""
+		flight = self.flights.get(key)
+		if flight is None:
+			self.misses += 1
+			task = asyncio.ensure_future(function(*args))
+			task.add_done_callback(lambda task: self.land(key, task))
+			# task, hits, callers waiting
+			flight = self.flights[key] = [task, 0, 0]
+		else:
+			self.hits += 1
+			if flight[1] == 0:
+				self.coalesced += 1
+			flight[1] += 1
+		task = flight[0]
+		flight[2] += 1
+		try:
+			return await asyncio.shield(task)
+		except asyncio.CancelledError:
+			if flight[2] == 1:
+				task.cancel()
+			raise
+		finally:
+			flight[2] -= 1
+
+	def land(self, key, task):
+		del self.flights[key]
+		if not task.cancelled():
+			# Mark the exception as retrieved, even if nobody waits for it.
+			task.exception()
+
+	def json(self):
+		return {'misses': self.misses, 'hits': self.hits, 'coalesced': self.coalesced}
+
+
+def request_key(source, fmt, client_options):
+	"""
+	Hash of everything a compilation's outcome depends on.
+	"""
+	blob = json.dumps([source, fmt, sorted(client_options.items())])
+	return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class CompileService:
+	"""
+	- executor: where compile_source runs (a process pool by default).
+	- max_pending: number of compilations that may be running or waiting for
+	  a worker at once; beyond that, requests get a 503. Requests waiting
+	  for an identical compilation in flight don't count.
+	- sampling: one compilation out of `sampling` records detailed
+	  telemetry, which is slower (0: never).
+	"""
+
+	def __init__(self, executor=None, max_pending=64, sampling=100):
+		self.executor = executor or ProcessPoolExecutor()
+		self.pending = asyncio.Semaphore(max_pending)
+		self.sampling = sampling
+		self.telemetry = Telemetry()
+		self.requests = 0
+		# When set, connections are closed after the current request.
+		self.draining = False
+		# Number of requests being processed.
+		self.active = 0
+		self.singleflight = SingleFlight()
+
+	async def compile(self, source, fmt, client_options):
+		"""
+		Return a (status, body, timings) tuple, where timings maps compiler
+		phases to seconds. Identical concurrent requests share the same tuple.
+		"""
+		return await self.singleflight.do(request_key(source, fmt, client_options),
+				self.run_compile, source, fmt, client_options)
+
+	async def run_compile(self, source, fmt, client_options):
+		if self.pending.locked():
+			raise BadRequest(503, "too many pending requests")
+		detailed = bool(self.sampling) and self.telemetry.compilations % self.sampling == 0
+		async with self.pending:
+			loop = asyncio.get_running_loop()
+			status, response, telemetry = await loop.run_in_executor(self.executor,
+					compile_source, source, fmt, client_options, detailed)
+		self.telemetry.merge(telemetry)
+		return status, response, telemetry['phases']
+
+	async def handle_compile(self, body):
+		try:
+			payload = json.loads(body.decode('utf-8'))
+			source = payload['source']
+			fmt = payload.get('format', 'js')
+			client_options = payload.get('options', {})
+		except (ValueError, KeyError, TypeError, AttributeError):
+			raise BadRequest(400, "expected a JSON object with a 'source' string")
+		if not isinstance(source, str) or fmt not in FORMATS \
+				or not isinstance(client_options, dict):
+			raise BadRequest(400, "bad source, format or options")
+		make_options(client_options)
+		t0 = time.perf_counter()
+		status, response, timings = await self.compile(source, fmt, client_options)
+		return status, response, dict(timings, worker=time.perf_counter() - t0)
+
+	async def route(self, method, path, body):
+		if path == '/metrics' and method == 'GET':
+			return 200, self.metrics(), {}
+		if path == '/metrics/prometheus' and method == 'GET':
+			return 200, self.telemetry.prometheus(), {}
+		if path != '/compile':
+			raise BadRequest(404, "no such resource")
+		if method != 'POST':
+			raise BadRequest(405, "use POST")
+		return await self.handle_compile(body)
+
+	def metrics(self):
+		return {'status': 'ok', 'requests': self.requests,
+				'singleflight': self.singleflight.json(),
+				'telemetry': self.telemetry.json()}
+
+	def after_request(self):
+		"""
+		Called after each response is sent.
+		"""
+
+	async def handle_connection(self, reader, writer):
+		"""
+		Serve requests on a connection until the client closes it or asks to.
+		"""
+		try:
+			while True:
+				request = await read_request(reader)
+				if request is None:
+					break
+				method, path, version, headers, body = request
+				t0 = time.perf_counter()
+				self.requests += 1
+				self.active += 1
+				try:
+					status, response, timings = await self.route(method, path, body)
+				except BadRequest as e:
+					status, response, timings = e.status, {'status': 'error', 'message': str(e)}, {}
+				except Exception as e:
+					status, response, timings = 500, {'status': 'error', 'message': repr(e)}, {}
+				finally:
+					self.active -= 1
+				timings['total'] = time.perf_counter() - t0
+				keep_alive = version == 'HTTP/1.1' and not self.draining and \
+						headers.get('connection', '').lower() != 'close'
+				write_response(writer, status, response, timings, keep_alive)
+				await writer.drain()
+				self.after_request()
+				if not keep_alive:
+					break
+		except BadRequest as e:
+			write_response(writer, e.status, {'status': 'error', 'message': str(e)}, {}, False)
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			writer.close()
+
+	async def start(self, host='127.0.0.1', port=8000, sock=None):
+		"""
+		Start serving, on the given address or on an already bound socket.
+		Return the asyncio Server.
+		"""
+		if sock is not None:
+			return await asyncio.start_server(self.handle_connection, sock=sock)
+		return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def read_request(reader):
+	"""
+	Read an HTTP request. Return a (method, path, version, headers, body)
+	tuple, or None if the client closed the connection.
+	"""
+	line = await reader.readline()
+	if not line.strip():
+		return None
+	try:
+		method, path, version = line.decode('latin-1').split()
+	except ValueError:
+		raise BadRequest(400, "malformed request line")
+	headers = {}
+	for _ in range(MAX_HEADER_LINES):
+		line = await reader.readline()
+		if line in (b'\r\n', b'\n', b''):
+			break
+		name, _, value = line.decode('latin-1').partition(':')
+		headers[name.strip().lower()] = value.strip()
+	else:
+		raise BadRequest(400, "too many headers")
+	try:
+		length = int(headers.get('content-length', 0))
+	except ValueError:
+		raise BadRequest(400, "bad Content-Length")
+	if length > MAX_BODY_SIZE:
+		raise BadRequest(413, "request body too large")
+	body = await reader.readexactly(length)
+	return method, path, version, headers, body
+
+
+def write_response(writer, status, response, timings, keep_alive):
+	"""
+	Send a response: a JSON object, or plain text if `response` is a string.
+	"""
+	if isinstance(response, str):
+		body = response.encode('utf-8')
+		content_type = "text/plain; version=0.0.4; charset=utf-8"
+	else:
+		body = json.dumps(response).encode('utf-8')
+		content_type = "application/json; charset=utf-8"
+	server_timing = ", ".join("{};dur={:.3f}".format(k, v * 1000)
+			for k, v in timings.items())
+	head = [
+		"HTTP/1.1 {} {}".format(status, REASONS.get(status, "")),
+		"Content-Type: " + content_type,
+		"Content-Length: {}".format(len(body)),
+		"Connection: {}".format("keep-alive" if keep_alive else "close"),
+	]
+	if server_timing:
+		head.append("Server-Timing: " + server_timing)
+	writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+
+
+#######################################################################
+#
+# PREFORK MODE
+#
+#######################################################################
+
+def warm_up():
+	"""
+	Run every compiler phase once, so that whatever the compiler computes
+	lazily is computed before the workers are forked.
+	"""
+	source = """
+		lexique
+			C = <x: entier>
+		fonction f(t: tableau C[?], n: inout entier): réel
+		début
+			n <- n + 1
+			retourne t[0].x / 2
+		fin
+		algorithme
+		lexique
+			t: tableau C[?]
+			i: entier
+			s: chaîne
+		début
+			redim(t, 1)
+			lire(i)
+			si i > 0 et non faux alors
+				écrire(f(t, i), s[0], s[0..1])
+			fsi
+			pour i de 1 jusque 3 faire
+				tantque i < 0 faire
+				ftant
+			fpour
+		fin"""
+	for fmt in FORMATS:
+		compile_source(source, fmt, {})
+
+
+def current_rss():
+	"""
+	Resident memory of the current process, in bytes.
+	"""
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except OSError:
+		import resource
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class WorkerMetrics:
+	"""
+	Per-worker metrics, in memory shared by the master and all workers.
+	"""
+
+	FIELDS = ('pid', 'started', 'requests', 'rss', 'generation',
+			'misses', 'hits', 'coalesced')
+
+	def __init__(self, slots):
+		self.slots = slots
+		self.table = RawArray('d', slots * len(self.FIELDS))
+
+	def set(self, slot, **values):
+		for k, v in values.items():
+			self.table[slot * len(self.FIELDS) + self.FIELDS.index(k)] = v
+
+	def get(self, slot, field):
+		return self.table[slot * len(self.FIELDS) + self.FIELDS.index(field)]
+
+	def json(self):
+		return [{k: self.get(slot, k) for k in self.FIELDS}
+				for slot in range(self.slots)]
+
+
+class WorkerService(CompileService):
+	"""
+	Compile service run by a forked worker. Compilation happens in-process.
+	"""
+
+	def __init__(self, metrics, slot, max_requests, max_memory, max_pending, sampling):
+		super().__init__(ThreadPoolExecutor(1), max_pending, sampling)
+		self.metrics_table = metrics
+		self.slot = slot
+		self.max_requests = max_requests
+		self.max_memory = max_memory
+		self.done = asyncio.Event()
+
+	def metrics(self):
+		return {'status': 'ok', 'workers': self.metrics_table.json(),
+				'telemetry': self.telemetry.json()}
+
+	def after_request(self):
+		rss = current_rss()
+		self.metrics_table.set(self.slot, requests=self.requests, rss=rss,
+				**self.singleflight.json())
+		if (self.max_requests and self.requests >= self.max_requests) or \
+				(self.max_memory and rss >= self.max_memory):
+			self.draining = True
+			self.done.set()
+
+
+DRAIN_TIMEOUT = 30
+
+def run_worker(sock, metrics, slot, args):
+	signal.signal(signal.SIGINT, signal.SIG_DFL)
+	signal.signal(signal.SIGTERM, signal.SIG_DFL)
+	gc.enable()
+
+	async def serve():
+		service = WorkerService(metrics, slot, args.max_requests,
+				args.max_memory, args.max_pending, args.telemetry_sampling)
+		server = await service.start(sock=sock)
+		await service.done.wait()
+		server.close()
+		# Let the requests being processed finish; idle connections are
+		# simply dropped.
+		deadline = time.monotonic() + DRAIN_TIMEOUT
+		while service.active and time.monotonic() < deadline:
+			await asyncio.sleep(0.05)
+
+	asyncio.run(serve())
+
+
+# A worker that exits with an error sooner than MIN_LIFETIME seconds after
+# starting is replaced after a delay, which doubles with each such exit (up to
+# MAX_RESPAWN_DELAY), so that a worker crashing at startup doesn't turn the
+# master into a fork loop.
+MIN_LIFETIME = 10
+RESPAWN_DELAY = 0.1
+MAX_RESPAWN_DELAY = 30
+
+def respawn_delay(previous, exitcode, lifetime):
+	"""
+	Delay before replacing a worker that exited with the given code after
+	`lifetime` seconds, given the previous delay for its slot.
+	"""
+	if exitcode == 0 or lifetime >= MIN_LIFETIME:
+		return 0
+	return min(MAX_RESPAWN_DELAY, max(RESPAWN_DELAY, previous * 2))
+
+def wait_child(timeout):
+	"""
+	Wait for a child process to exit, for at most `timeout` seconds (None: no
+	limit). Return its (pid, status), or (0, 0) if none exited.
+	"""
+	if timeout is None:
+		return os.wait()
+	deadline = time.monotonic() + timeout
+	while True:
+		try:
+			pid, status = os.waitpid(-1, os.WNOHANG)
+		except ChildProcessError:
+			pid, status = 0, 0
+		remaining = deadline - time.monotonic()
+		if pid or remaining <= 0:
+			return pid, status
+		time.sleep(min(0.05, remaining))
+
+def prefork(args):
+	"""
+	Run the master process: warm up, fork workers, and replace them as they
+	exit.
+	"""
+	sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	sock.bind((args.host, args.port))
+	sock.listen(128)
+	sock.setblocking(False)
+
+	warm_up()
+	metrics = WorkerMetrics(args.prefork)
+	# Move everything allocated so far out of the collector's reach, so that
+	# collections in the workers don't touch (and copy) the shared pages.
+	gc.disable()
+	gc.freeze()
+
+	children = {}
+	started = {}
+	delays = [0] * args.prefork
+	respawns = {}
+
+	def spawn(slot):
+		generation = metrics.get(slot, 'generation') + 1
+		pid = os.fork()
+		if pid == 0:
+			status = 1
+			try:
+				metrics.set(slot, pid=os.getpid(), started=time.time(),
+						requests=0, rss=current_rss(), generation=generation)
+				run_worker(sock, metrics, slot, args)
+				status = 0
+			except BaseException:
+				traceback.print_exc()
+			finally:
+				os._exit(status)
+		children[pid] = slot
+		started[slot] = time.monotonic()
+
+	def stop(signum, frame):
+		for pid in children:
+			os.kill(pid, signal.SIGTERM)
+		raise SystemExit(0)
+
+	signal.signal(signal.SIGTERM, stop)
+	signal.signal(signal.SIGINT, stop)
+	for slot in range(args.prefork):
+		spawn(slot)
+	while True:
+		now = time.monotonic()
+		for slot, when in list(respawns.items()):
+			if when <= now:
+				del respawns[slot]
+				spawn(slot)
+		timeout = min(respawns.values()) - now if respawns else None
+		pid, status = wait_child(timeout)
+		slot = children.pop(pid, None)
+		if slot is None:
+			continue
+		delays[slot] = respawn_delay(delays[slot], os.waitstatus_to_exitcode(status),
+				time.monotonic() - started[slot])
+		respawns[slot] = time.monotonic() + delays[slot]
+
+
+def main():
+	ap = argparse.ArgumentParser(description="Service de compilation LDA (HTTP/JSON)")
+	ap.add_argument('--host', default='127.0.0.1',
+			help="adresse d'écoute")
+	ap.add_argument('--port', '-p', type=int, default=8000,
+			help="port d'écoute")
+	ap.add_argument('--workers', '-w', type=int, default=None,
+			help="nombre de processus de compilation (par défaut, un par cœur)")
+	ap.add_argument('--max-pending', type=int, default=64,
+			help="nombre maximal de compilations en attente")
+	ap.add_argument('--telemetry-sampling', type=int, default=100, metavar='N',
+			help="""enregistrer une télémétrie détaillée pour une compilation
+			sur N (0 : jamais)""")
+	ap.add_argument('--prefork', type=int, default=0, metavar='N',
+			help="""lancer N processus qui compilent eux-mêmes, après avoir
+			préchargé le compilateur dans le processus maître""")
+	ap.add_argument('--max-requests', type=int, default=1000,
+			help="""(prefork) nombre de requêtes après lequel un processus
+			est remplacé (0 : illimité)""")
+	ap.add_argument('--max-memory', type=int, default=256 << 20,
+			help="""(prefork) mémoire résidente, en octets, au-delà de laquelle
+			un processus est remplacé (0 : illimitée)""")
+	args = ap.parse_args()
+
+	if args.prefork:
+		prefork(args)
+		return
+
+	async def serve():
+		service = CompileService(ProcessPoolExecutor(args.workers), args.max_pending,
+				args.telemetry_sampling)
+		server = await service.start(args.host, args.port)
+		async with server:
+			await server.serve_forever()
+
+	asyncio.run(serve())
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,9 @@
+LDA.setBudget(100000);
+try {
+	P.main();
+} catch (e) {
+	if (!(e instanceof LDA.BudgetExceeded)) {
+		throw e;
+	}
+	LDA.print("budget exceeded");
+}
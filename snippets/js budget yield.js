@@ -0,0 +1,6 @@
+var yields = 0;
+LDA.yieldInterval = 10;
+LDA.onYield = function() { yields++; };
+LDA.setBudget(1000);
+P.main();
+LDA.print(yields >= 10);
@@ -7,6 +7,7 @@ from lda import statements
 from lda import expression
 from lda import module
 from lda import function
+from lda import visitor
 from lda import DefaultOptions
 from lda.context import ContextStack
 
@@ -110,5 +111,5 @@ class LDATestCase(unittest.TestCase):
 		if hasattr(root, 'resolve_type'):
 			root.resolve_type(context, error_handler)
 		else:
-			root.check(context, error_handler)
+			visitor.run(root.check(context, error_handler))
 		return root
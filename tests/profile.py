@@ -1,20 +1,25 @@
 #!/usr/bin/python3
 
-import lda.parser
+"""
+Profile the parser on a file, and print the hottest functions.
+(See `ldac.py --profile` for more phases and profilers.)
+
+Usage:
+	python3 -m tests.profile COUNT PATH
+"""
+
+import pstats
 import sys
-import cProfile
+from lda import DefaultOptions, profiling
 
 count = int(sys.argv[1])
 path = sys.argv[2]
 
 print ("#### PROFIL : PARSER {}, {} FOIS ####".format(path, count))
 
-p = lda.parser.Parser(path)
-
-def doit():
-	for i in range(count):
-		p.reset_pos()
-		p.analyze_module()
-
-cProfile.run("doit()", sort="time")
+with open(path, 'rt', encoding='utf-8') as f:
+	buf = f.read()
 
+output, mean = profiling.profile(DefaultOptions(), buf, path, 'parse',
+		iterations=count, prefix="parser")
+pstats.Stats(output).sort_stats("time").print_stats(30)
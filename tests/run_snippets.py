@@ -0,0 +1,145 @@
+"""
+Parallel front-end to the snippet torture test (see test_snippets.py).
+
+Snippets are sharded across a pool of processes. The result of each snippet
+that passes is cached, keyed by a hash of the snippet (and its auxiliary JS
+file), of the compiler's source code, and of the JS runtime: as long as none
+of these change, the snippet is not run again. Failing snippets are never
+cached.
+
+Usage:
+	python -m tests.run_snippets [-j JOBS] [--no-cache] [--slowest N] [PATTERN...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fnmatch import fnmatch
+
+from tests.test_snippets import SNIPPETSDIR, TestSnippets
+
+
+CACHEDIR = ".snippetcache"
+
+
+def hash_files(paths):
+	h = hashlib.sha256()
+	for path in sorted(paths):
+		h.update(path.encode('utf-8'))
+		with open(path, 'rb') as f:
+			h.update(f.read())
+	return h.hexdigest()
+
+def tree_files(top, pattern):
+	for dirpath, dirnames, filenames in os.walk(top):
+		for fn in filenames:
+			if fnmatch(fn, pattern):
+				yield os.path.join(dirpath, fn)
+
+def compiler_hash():
+	# the harness also grades the snippets' test cases (grading.py)
+	return hash_files(list(tree_files('lda', '*.py')) +
+			[os.path.join('tests', 'test_snippets.py'), 'grading.py'])
+
+def runtime_hash():
+	return hash_files(list(tree_files('jsruntime', '*.js')) + ['jsshell.py'])
+
+def snippet_key(snipname, compiler, runtime):
+	paths = [os.path.join(SNIPPETSDIR, snipname + ext) for ext in ('.lda', '.js')]
+	h = hashlib.sha256()
+	h.update(hash_files(p for p in paths if os.path.exists(p)).encode('ascii'))
+	h.update(compiler.encode('ascii'))
+	h.update(runtime.encode('ascii'))
+	return h.hexdigest()
+
+
+def run_snippet(snipname):
+	"""
+	Run a single snippet (in a pool process). Return a (snippet name, error
+	message or None, elapsed seconds) tuple.
+	"""
+	t0 = time.perf_counter()
+	try:
+		TestSnippets().c(snipname, os.path.join(SNIPPETSDIR, snipname + ".lda"))
+		error = None
+	except Exception:
+		error = traceback.format_exc()
+	return snipname, error, time.perf_counter() - t0
+
+
+class Cache:
+	def __init__(self, path):
+		self.path = path
+		os.makedirs(path, exist_ok=True)
+
+	def get(self, key):
+		try:
+			with open(os.path.join(self.path, key), 'rt') as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return None
+
+	def put(self, key, record):
+		with open(os.path.join(self.path, key), 'wt') as f:
+			json.dump(record, f)
+
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Run the LDA snippets in parallel.")
+	ap.add_argument('patterns', metavar='PATTERN', nargs='*', default=['*'],
+			help="only run snippets whose name matches one of these patterns")
+	ap.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+			help="number of processes")
+	ap.add_argument('--no-cache', action='store_true',
+			help="run all snippets, even those whose result is cached")
+	ap.add_argument('--slowest', type=int, default=10,
+			help="number of slowest snippets to list")
+	args = ap.parse_args(argv)
+
+	snipnames = [fn[:-4] for fn in sorted(os.listdir(SNIPPETSDIR))
+			if fnmatch(fn, '*.lda')
+			and any(fnmatch(fn[:-4], p) for p in args.patterns)]
+	cache = Cache(CACHEDIR)
+	compiler, runtime = compiler_hash(), runtime_hash()
+	keys = {n: snippet_key(n, compiler, runtime) for n in snipnames}
+
+	t0 = time.perf_counter()
+	timings = {}
+	failures = {}
+	todo = []
+	for n in snipnames:
+		record = None if args.no_cache else cache.get(keys[n])
+		if record is None:
+			todo.append(n)
+		else:
+			timings[n] = record['elapsed']
+
+	with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+		futures = [executor.submit(run_snippet, n) for n in todo]
+		for future in as_completed(futures):
+			n, error, elapsed = future.result()
+			timings[n] = elapsed
+			if error is None:
+				cache.put(keys[n], {'snippet': n, 'elapsed': elapsed})
+			else:
+				failures[n] = error
+				print("FAIL: {}\n{}".format(n, error), file=sys.stderr)
+
+	wall = time.perf_counter() - t0
+	print("{:>8} {}".format("ms", "slowest snippets"))
+	for n in sorted(timings, key=timings.get, reverse=True)[:args.slowest]:
+		print("{:8.1f} {}{}".format(timings[n] * 1000, n,
+				"" if n in todo else " (cached)"))
+	print("{} snippets: {} run, {} cached, {} failed in {:.2f} s".format(
+			len(snipnames), len(todo), len(snipnames) - len(todo),
+			len(failures), wall))
+	return 1 if failures else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,80 @@
+import copy
+import unittest
+from lda import DefaultOptions, build_tree, translate_tree
+from bench.synth import Shape, generate
+from bench import throughput, runtime, startup
+
+class TestSynth(unittest.TestCase):
+	SHAPES = [
+		Shape(functions=3, statements=15),
+		Shape(functions=2, statements=30, depth=6, expr_depth=5),
+		Shape(functions=4, statements=10, depth=0, composites=0, dims=0),
+		Shape(functions=1, statements=10, composites=5, dims=4),
+	]
+
+	def test_valid(self):
+		for base in self.SHAPES:
+			for seed in range(5):
+				shape = Shape(**dict(vars(base), seed=seed))
+				with self.subTest(shape=shape):
+					module = build_tree(DefaultOptions(), generate(shape))
+					translate_tree(DefaultOptions(), module, 'js')
+
+	def test_deterministic(self):
+		self.assertEqual(generate(Shape(seed=3)), generate(Shape(seed=3)))
+		self.assertNotEqual(generate(Shape(seed=3)), generate(Shape(seed=4)))
+
+	def test_scaled(self):
+		small = generate(Shape(functions=2))
+		large = generate(Shape(functions=2).scaled(4))
+		self.assertEqual(2, small.count("\nfonction ") + small.startswith("fonction "))
+		self.assertEqual(8, large.count("\nfonction ") + large.startswith("fonction "))
+
+class TestThroughput(unittest.TestCase):
+	def test_compare(self):
+		current = {'x1': throughput.measure(Shape(functions=1, statements=5), repeat=1)}
+		self.assertEqual([], throughput.compare(current, current, 0.2))
+		slower = copy.deepcopy(current)
+		slower['x1']['phases']['check']['nodes_per_s'] /= 2
+		slower['x1']['phases']['parse']['peak_kib'] *= 2
+		regressions = throughput.compare(slower, current, 0.2)
+		self.assertEqual(2, len(regressions))
+		self.assertTrue(regressions[0].startswith("x1 check"))
+		# baselines recorded for another shape are ignored
+		other = copy.deepcopy(current)
+		other['x1']['shape']['functions'] = 2
+		self.assertEqual([], throughput.compare(slower, other, 0.2))
+
+class TestRuntime(unittest.TestCase):
+	def test_corpus_compiles(self):
+		names = []
+		for name, path in runtime.corpus():
+			names.append(name)
+			with open(path, 'rt', encoding='utf-8') as f:
+				buf = f.read()
+			self.assertTrue(runtime.SESSION_REGEXP.search(buf), name)
+			build_tree(DefaultOptions(), buf, path)
+		self.assertIn("tri rapide", names)
+
+	def test_measure(self):
+		path = dict(runtime.corpus())["construction de chaines"]
+		record = runtime.measure(path, repeat=1)
+		self.assertEqual(set(runtime.BACKENDS), set(record))
+		for figures in record.values():
+			self.assertIsNone(figures['error'])
+			self.assertTrue(figures['js_bytes'] > 0)
+		self.assertEqual([], runtime.compare({'p': record}, {'p': record}, 0.05, 0.2))
+		bigger = copy.deepcopy(record)
+		bigger['ast']['js_bytes'] *= 2
+		bigger['ir']['error'] = "wrong output: 42"
+		self.assertEqual(2, len(runtime.compare({'p': bigger}, {'p': record}, 0.05, 0.2)))
+
+class TestStartup(unittest.TestCase):
+	def test_compare(self):
+		current = {'import': startup.measure(startup.MODES['import'], repeat=1)}
+		self.assertEqual(['lda', 'lda.telemetry'], current['import']['lda_modules'])
+		self.assertEqual([], startup.compare(current, current, 0.2))
+		heavier = copy.deepcopy(current)
+		heavier['import']['best_ms'] *= 2
+		heavier['import']['lda_modules'].append('lda.parser')
+		self.assertEqual(2, len(startup.compare(heavier, current, 0.2)))
@@ -0,0 +1,136 @@
+import random
+import sys
+import unittest
+from lda import DefaultOptions, expression, kw, operators
+from lda.parser import Parser
+from lda.errors import syntax
+
+class RecursiveParser(Parser):
+	"""
+	Reference implementation: the recursive precedence climbing parser that
+	Parser.analyze_expression replaces.
+	"""
+
+	def analyze_expression(self, root=True):
+		lhs = self.analyze_primary_expression()
+		if lhs is None:
+			return None
+		nbo1 = self.analyze_naked_binary_operator()
+		if nbo1 is None:
+			return lhs
+		expr, nbo2 = self.analyze_partial_expression(lhs, nbo1)
+		assert nbo2 is None
+		expr.root = root
+		return expr
+
+	def analyze_partial_expression(self, lhs, nbo1, min_p=0):
+		while nbo1 is not None and nbo1.cls.precedence >= min_p:
+			if hasattr(nbo1.cls, 'closing'):
+				rhs = self.analyze_arglist(self.analyze_expression, nbo1.cls.closing)
+			else:
+				rhs = self.analyze_primary_expression()
+			if rhs is None:
+				raise syntax.MissingRightOperand(nbo1.pos)
+			nbo2 = self.analyze_naked_binary_operator()
+			while nbo2 is not None and nbo2.cls.part_of_rhs(nbo1.cls):
+				rhs, nbo2 = self.analyze_partial_expression(rhs, nbo2, nbo2.cls.precedence)
+			lhs = nbo1.build(lhs, rhs)
+			nbo1 = nbo2
+		return lhs, nbo1
+
+	def analyze_primary_expression(self):
+		if self.softskip(kw.LPAREN):
+			sub_expr = self.analyze_expression(False)
+			self.hardskip(kw.RPAREN)
+			return sub_expr
+		nuo = self.analyze_naked_operator(operators.unary, operators.unary_initials)
+		if nuo is not None:
+			rhs = self.analyze_primary_expression()
+			if rhs is None:
+				raise syntax.MissingRightOperand(nuo.pos)
+			return nuo.build(rhs)
+		return self.analyze_terminal_expression()
+
+def dump(node):
+	"""
+	Nested tuples describing an expression tree, its positions and root flags.
+	"""
+	if node is None or isinstance(node, list):
+		return node and [dump(n) for n in node]
+	fields = [type(node).__name__, node.pos.char, getattr(node, 'root', None)]
+	for attr in ('lhs', 'rhs'):
+		if hasattr(node, attr):
+			fields.append(dump(getattr(node, attr)))
+	for attr in ('name', 'value'):
+		if hasattr(node, attr):
+			fields.append(getattr(node, attr))
+	return tuple(fields)
+
+def parse(parser_class, buf):
+	p = parser_class(DefaultOptions(), buf, None)
+	try:
+		return dump(p.analyze_expression()), p.pos.char
+	except syntax.SyntaxError as e:
+		return type(e).__name__, e.pos.char, str(e)
+
+def random_expression(rng, depth):
+	r = rng.random()
+	if depth <= 0 or r < 0.2:
+		return rng.choice(["a", "1", "2.5", "vrai", '"s"', "'c'"])
+	sub = lambda: random_expression(rng, depth - 1)
+	if r < 0.35:
+		return "(" + sub() + ")"
+	if r < 0.45:
+		return rng.choice(["-", "+", "non "]) + sub()
+	if r < 0.55:
+		return sub() + "(" + ", ".join(sub() for _ in range(rng.randint(0, 3))) + ")"
+	if r < 0.62:
+		return sub() + "[" + ", ".join(sub() for _ in range(rng.randint(1, 3))) + "]"
+	if r < 0.66:
+		return sub() + ".x"
+	op = rng.choice(["+", "-", "*", "/", ":", "**", "mod", "et", "ou", "<", "<=", "=", "!=", ".."])
+	return sub() + " " + op + " " + sub()
+
+TOKENS = ["a", "1", "(", ")", "[", "]", ",", "+", "-", "*", "**", "mod", "non",
+		"<", "<=", "..", ".", "f"]
+
+class TestIterativeExpressions(unittest.TestCase):
+	def test_right_associativity(self):
+		# PendingExpression.reduce relies on this
+		for group in operators.binary_precedence:
+			if any(cls.right_ass for cls in group):
+				self.assertEqual(1, len(group))
+
+	def test_same_as_recursive(self):
+		rng = random.Random(0)
+		for _ in range(3000):
+			buf = random_expression(rng, 6)
+			self.assertEqual(parse(RecursiveParser, buf), parse(Parser, buf), buf)
+
+	def test_same_errors_as_recursive(self):
+		rng = random.Random(0)
+		for _ in range(3000):
+			buf = " ".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 10)))
+			self.assertEqual(parse(RecursiveParser, buf), parse(Parser, buf), buf)
+
+	def test_deep_nesting(self):
+		n = sys.getrecursionlimit() * 10
+		def test(buf, cls):
+			p = Parser(DefaultOptions(), buf, None)
+			self.assertIsInstance(p.analyze_expression(), cls)
+			self.assertTrue(p.eof())
+		test("(" * n + "a" + ")" * n, expression.ExpressionIdentifier)
+		test("-" * n + "a", operators.UnaryMinus)
+		test("non " * n + "vrai", operators.LogicalNot)
+		test("f(" * n + ")" * n, operators.FunctionCall)
+		test("t[" * n + "1" + "]" * n, operators.Subscript)
+		test("a ** " * n + "a", operators.Power)
+
+	def test_deep_nesting_errors(self):
+		n = sys.getrecursionlimit() * 10
+		p = Parser(DefaultOptions(), "(" * n + "a" + ")" * (n - 1), None)
+		self.assertRaises(syntax.ExpectedKeyword, p.analyze_expression)
+		p = Parser(DefaultOptions(), "f(" * n + "1 +" + ")" * n, None)
+		with self.assertRaises(syntax.MissingRightOperand) as cm:
+			p.analyze_expression()
+		self.assertEqual(2 * n + 2, cm.exception.pos.char)
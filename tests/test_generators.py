@@ -0,0 +1,56 @@
+import json
+import unittest
+import jsshell
+from lda import build_tree, translate_tree, DefaultOptions
+
+class TestGenerators(unittest.TestCase):
+	def translate(self, program):
+		options = DefaultOptions()
+		options.stats_comment = False
+		options.generators = True
+		return translate_tree(options, build_tree(options, program), 'js')
+
+	def test_interleaved_sessions(self):
+		js = self.translate("""
+			lexique
+				total: entier
+			fonction ajouter(): entier
+			lexique
+				n: entier
+			début
+				lire(n)
+				total <- total + n
+				retourne n
+			fin
+			algorithme
+			lexique
+				i: entier
+			début
+				total <- 0
+				pour i de 1 jusque 3 faire
+					ajouter()
+				fpour
+				écrire(total)
+			fin""")
+		# Each session evaluates the program separately to get its own P.
+		driver = """
+			var source = {};
+			function start(name) {{
+				var P = new Function(source + "\\nreturn P;")();
+				var s = new LDA.Session(P.main(), function(text) {{
+					putstr(text.indexOf(">") >= 0? "": name + ":" + text);
+				}});
+				s.resume();
+				return s;
+			}}
+			var a = start("a"), b = start("b");
+			a.resume("1"); b.resume("10");
+			a.resume("2"); b.resume("x"); b.resume("20");
+			a.resume("3");
+			LDA.print(a.done, b.done, b.prompt);
+			b.resume("30");
+			LDA.print(b.done);
+			""".format(json.dumps(js))
+		self.assertEqual("b:Mauvais type ! Recommencez, SVP.\na:6\n"
+				"true false entier> \nb:60\ntrue",
+				jsshell.run(driver, ""))
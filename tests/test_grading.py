@@ -0,0 +1,55 @@
+import unittest
+import grading
+from lda import build_tree, DefaultOptions
+
+class TestGrading(unittest.TestCase):
+	def setUp(self):
+		self.module = build_tree(DefaultOptions(), """
+			lexique
+				appels: entier
+			fonction double(x: entier): entier
+			début
+				appels <- appels + 1
+				retourne 2 * x
+			fin
+			algorithme
+			lexique
+				n: entier
+			début
+				lire(n)
+				écrire(double(n), appels)
+			fin""")
+
+	def test_parse_session(self):
+		case = grading.parse_session("(*| entier> | 3 | 6 |*)")
+		self.assertEqual("3", case.inputstr)
+		self.assertEqual("entier> 6", case.expected)
+
+	def test_grade_many_cases_with_fresh_state(self):
+		results = grading.grade(self.module, [
+				"entier> | 3 | 6 1",
+				"(*| entier> | abc | Mauvais type ! Recommencez, SVP.\n"
+						"entier> | 5 | 10 1 |*)",
+				"entier> | 4 | 9 1"])
+		self.assertEqual([True, True, False], [r.passed for r in results])
+		self.assertEqual("entier> 8 1", results[2].output)
+		self.assertTrue(all(r.elapsed >= 0 for r in results))
+
+	def test_runtime_error_and_budget(self):
+		module = build_tree(DefaultOptions(), """
+			algorithme
+			lexique
+				t: tableau entier[1..2]
+				n: entier
+			début
+				lire(n)
+				tantque n > 0 faire
+					n <- n + 1
+				ftant
+				t[3] <- 1
+			fin""")
+		results = grading.grade(module, ["entier> | 0 |", "entier> | 1 |"],
+				max_steps=1000)
+		self.assertIn("out of bounds", results[0].error)
+		self.assertIn("LDABudgetExceeded", results[1].error)
+		self.assertFalse(any(r.passed for r in results))
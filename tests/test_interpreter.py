@@ -0,0 +1,98 @@
+import subprocess
+import sys
+import unittest
+from lda import build_tree, DefaultOptions, pyruntime
+from lda.interpreter import compile_module
+from lda.pyruntime import BudgetExceeded, LDARuntimeError
+
+class TestInterpreter(unittest.TestCase):
+	def compile(self, program):
+		return compile_module(build_tree(DefaultOptions(), program))
+
+	def test_program_can_run_many_times(self):
+		program = self.compile("""
+			lexique
+				total: entier
+			fonction ajouter(x: entier, t: inout entier)
+			début
+				t <- t + x
+			fin
+			algorithme
+			lexique
+				n: entier
+			début
+				total <- 0
+				lire(n)
+				ajouter(n, total)
+				ajouter(n, total)
+				écrire(total)
+			fin""")
+		self.assertEqual("entier> 6", program.run("3"))
+		self.assertEqual("entier> 10", program.run("5"))
+
+	def test_steps_are_counted(self):
+		program = self.compile("""
+			algorithme
+			lexique
+				i: entier
+			début
+				pour i de 1 jusque 100 faire
+				fpour
+			fin""")
+		ex = program.execute(max_steps=1000)
+		# one step per iteration, plus one for entering the algorithm
+		self.assertEqual(101, ex.steps)
+		self.assertRaises(BudgetExceeded, program.execute, max_steps=50)
+
+	def test_time_budget(self):
+		program = self.compile("""
+			algorithme
+			début
+				tantque vrai faire
+				ftant
+			fin""")
+		self.assertRaises(BudgetExceeded, program.execute, max_time=0.05)
+
+	def test_deep_recursion(self):
+		buf = """
+			fonction somme(n: entier): entier
+			début
+				si n = 0 alors
+					retourne 0
+				fsi
+				retourne n + somme(n - 1)
+			fin
+			algorithme
+			lexique
+				n: entier
+			début
+				lire(n)
+				écrire(somme(n))
+			fin"""
+		self.assertRaises(LDARuntimeError, self.compile(buf).run, "10000")
+		# as deep as the JavaScript runtime goes, once deep calls are enabled
+		# (in a process of their own: the settings are process-wide)
+		script = ("import sys\n"
+				"from lda import build_tree, DefaultOptions, pyruntime\n"
+				"from lda.interpreter import compile_module\n"
+				"pyruntime.enable_deep_calls()\n"
+				"program = compile_module(build_tree(DefaultOptions(), sys.stdin.read()))\n"
+				"print(program.run('10000'))\n"
+				"print(program.run('10000'))\n"
+				"print(sys.getrecursionlimit())\n")
+		out = subprocess.run([sys.executable, '-c', script], input=buf, check=True,
+				stdout=subprocess.PIPE, encoding='utf-8').stdout
+		self.assertEqual(["entier> 50005000", "entier> 50005000",
+				str(pyruntime.RECURSION_LIMIT)], out.splitlines())
+
+	def test_infinite_recursion(self):
+		program = self.compile("""
+			fonction f(n: entier): entier
+			début
+				retourne f(n + 1)
+			fin
+			algorithme
+			début
+				écrire(f(0))
+			fin""")
+		self.assertRaises(LDARuntimeError, program.run)
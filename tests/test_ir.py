@@ -0,0 +1,87 @@
+import unittest
+from lda import build_tree, DefaultOptions, ir
+from lda.lowering import lower
+from lda.prettyprinter import JSPrettyPrinter
+
+class TestIR(unittest.TestCase):
+	def lower(self, program):
+		return lower(build_tree(DefaultOptions(), program))
+
+	def instructions(self, function):
+		return [i for b in function.blocks for i in b.instructions]
+
+	def js(self, function):
+		pp = JSPrettyPrinter()
+		pp.put(function)
+		return str(pp)
+
+	def test_straight_function_has_no_dispatcher(self):
+		irmod = self.lower("""
+			fonction f(x: entier): entier
+			début
+				retourne x * (x + 1)
+			fin""")
+		f = irmod.functions[0]
+		self.assertEqual(1, len(f.blocks))
+		self.assertEqual(['add', 'mul'], [i.op for i in self.instructions(f)])
+		self.assertNotIn("switch", self.js(f))
+
+	def test_for_loop_has_back_edge(self):
+		irmod = self.lower("""
+			algorithme
+			lexique
+				i: entier
+			début
+				pour i de 1 jusque 10 faire
+					écrire(i)
+				fpour
+			fin""")
+		alg = irmod.algorithm
+		self.assertEqual(1, len(alg.back_edges()))
+		self.assertIn("switch", self.js(alg))
+
+	def test_eager_logical_operator(self):
+		irmod = self.lower("""
+			algorithme
+			lexique
+				a: entier
+				b: booléen
+			début
+				a <- 3
+				b <- a > 1 et a < 5
+			fin""")
+		alg = irmod.algorithm
+		self.assertEqual(1, len(alg.blocks))
+		self.assertIn('and', [getattr(i, 'op', None) for i in self.instructions(alg)])
+
+	def test_short_circuit_logical_operator(self):
+		irmod = self.lower("""
+			algorithme
+			lexique
+				a: entier
+				b: booléen
+			début
+				a <- 0
+				b <- a = 0 ou 10 : a > 1
+			fin""")
+		alg = irmod.algorithm
+		self.assertNotIn('or', [getattr(i, 'op', None) for i in self.instructions(alg)])
+		self.assertTrue(any(isinstance(b.terminator, ir.Branch) for b in alg.blocks))
+
+	def test_protect_variable_from_call(self):
+		irmod = self.lower("""
+			lexique
+				g: entier
+			fonction f(): entier
+			début
+				g <- g + 1
+				retourne g
+			fin
+			algorithme
+			début
+				g <- 1
+				écrire(g + f())
+			fin""")
+		alg = irmod.algorithm
+		add = [i for i in self.instructions(alg) if isinstance(i, ir.Binary)][0]
+		self.assertIsInstance(add.lhs, ir.Temp)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+import unittest
+import jsshell
+
+class TestPool(unittest.TestCase):
+	def setUp(self):
+		self.pool = jsshell.Pool(size=2, max_runs=3)
+
+	def tearDown(self):
+		self.pool.close()
+
+	def test_fresh_global_per_run(self):
+		self.assertEqual(("undefined\n", None),
+				self.pool.run("LDA.print(typeof leak); leak = 1;"))
+		self.assertEqual(("undefined\n", None),
+				self.pool.run("LDA.print(typeof leak); leak = 1;"))
+
+	def test_input_and_error(self):
+		output, error = self.pool.run("LDA.print(LDA.readInt() + 1); null.x;", "41")
+		self.assertEqual("entier> 42\n", output)
+		self.assertIsNotNone(error)
+
+	def test_recycle_after_max_runs(self):
+		self.pool.run("")
+		worker = self.pool.idle.queue[0]
+		self.pool.run("")
+		self.pool.run("")
+		self.assertNotIn(worker, self.pool.idle.queue)
+		self.assertIsNotNone(worker.process.poll())
+
+	def test_crashed_worker_is_replaced(self):
+		self.assertRaises(BrokenPipeError, self.pool.run, "quit(1);")
+		self.assertEqual(("ok\n", None), self.pool.run("LDA.print('ok');"))
+
+	def test_timeout(self):
+		pool = jsshell.Pool(size=1, timeout=0.5)
+		try:
+			self.assertRaises(TimeoutError, pool.run, "for (;;) {}")
+			self.assertEqual(0, pool.idle.qsize())
+			self.assertEqual(("ok\n", None), pool.run("LDA.print('ok');"))
+		finally:
+			pool.close()
+
+	def test_run_raises_on_uncaught_exception(self):
+		self.assertRaises(subprocess.CalledProcessError,
+				jsshell.run, "throw new LDA.RuntimeError('oops');", shutup=True)
+
+
+class TestStream(unittest.TestCase):
+	FLOOD = "for (var i = 0; ; i++) LDA.print(i);"
+
+	def test_line_cap(self):
+		s = jsshell.stream(self.FLOOD, max_lines=3)
+		self.assertEqual(["0\n", "1\n", "2\n"], list(s))
+		self.assertTrue(s.truncated)
+		self.assertIsNotNone(s.returncode)
+
+	def test_byte_cap(self):
+		s = jsshell.stream(self.FLOOD, max_bytes=5)
+		self.assertEqual("0\n1\n2", "".join(s))
+		self.assertTrue(s.truncated)
+
+	def test_interactive_input(self):
+		s = jsshell.stream("LDA.print(LDA.readInt() * 2); LDA.print(LDA.readStr());")
+		lines = iter(s)
+		self.assertEqual("entier> ", next(lines))
+		s.send("21")
+		self.assertEqual("42\n", next(lines))
+		self.assertEqual("chaîne> ", next(lines))
+		s.send("fin")
+		self.assertEqual(["fin\n"], list(lines))
+		self.assertFalse(s.truncated)
+
+	def test_async_stream(self):
+		async def collect():
+			lines = []
+			async for line in await jsshell.astream(self.FLOOD, max_lines=2):
+				lines.append(line)
+			return lines
+		self.assertEqual(["0\n", "1\n"], asyncio.run(collect()))
+
+
+class TestRunLimited(unittest.TestCase):
+	def test_usage(self):
+		output, usage = jsshell.run_limited("LDA.print(LDA.readInt() + 1);", "41")
+		self.assertEqual("entier> 42", output)
+		self.assertEqual(0, usage.returncode)
+		self.assertGreater(usage.max_rss, 0)
+		self.assertGreaterEqual(usage.wall_time, usage.cpu_time / 4)
+
+	def test_wall_timeout(self):
+		with self.assertRaises(jsshell.Timeout) as cm:
+			jsshell.run_limited("LDA.print('start'); for (;;) {}",
+					policy=jsshell.Policy(wall_timeout=0.5))
+		self.assertEqual("start", cm.exception.output)
+
+	def test_cpu_limit(self):
+		self.assertRaises(jsshell.Timeout, jsshell.run_limited,
+				"for (;;) {}", policy=jsshell.Policy(cpu_seconds=1, wall_timeout=10))
+
+	@unittest.skipUnless(os.path.isdir('/proc'), "needs /proc to find the shell")
+	def test_kill_is_not_a_cpu_timeout(self):
+		marker = "kill me {}".format(os.getpid())
+		def kill():
+			deadline = time.monotonic() + 10
+			while time.monotonic() < deadline:
+				for pid in filter(str.isdigit, os.listdir('/proc')):
+					try:
+						with open('/proc/{}/cmdline'.format(pid), 'rb') as f:
+							found = marker.encode() in f.read()
+					except OSError:
+						continue
+					if found and int(pid) != os.getpid():
+						os.kill(int(pid), signal.SIGKILL)
+						return
+				time.sleep(0.05)
+		threading.Thread(target=kill, daemon=True).start()
+		with self.assertRaises(jsshell.ProgramError) as cm:
+			jsshell.run_limited("'" + marker + "'; for (;;) {}",
+					policy=jsshell.Policy(cpu_seconds=30, wall_timeout=20))
+		self.assertEqual("killed by SIGKILL", str(cm.exception))
+
+	def test_output_limit(self):
+		with self.assertRaises(jsshell.OutputLimitExceeded) as cm:
+			jsshell.run_limited("for (;;) LDA.print('spam');",
+					policy=jsshell.Policy(max_output=100))
+		self.assertEqual(100, cm.exception.usage.output_bytes)
+
+	def test_out_of_memory(self):
+		self.assertRaises(jsshell.OutOfMemory, jsshell.run_limited,
+				"var a = []; for (var i = 0; ; i++) a.push([i, i + 0.5]);",
+				policy=jsshell.Policy(address_space=1 << 30, wall_timeout=30))
+
+	def test_runtime_error(self):
+		with self.assertRaises(jsshell.ProgramError) as cm:
+			jsshell.run_limited("LDA.print('a'); throw new LDA.RuntimeError('oops');")
+		self.assertIn("oops", str(cm.exception))
+		self.assertEqual("a", cm.exception.output)
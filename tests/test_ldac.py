@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import mock
+import ldac
+
+GOOD = "algorithme\ndébut\n\técrire(1)\nfin\n"
+BAD = "algorithme\ndébut\n\tx <- 1\nfin\n"
+
+compile_file = ldac.compile_file
+
+def compile_or_die(args, path):
+	# a pool process killed while compiling (e.g. out of memory)
+	if os.path.basename(path) == 'die.lda':
+		os._exit(1)
+	return compile_file(args, path)
+
+class TestBatch(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.root = self.dir.name
+		os.makedirs(os.path.join(self.root, 'sub'))
+		for name, source in (('a.lda', GOOD), ('sub/b.lda', GOOD), ('sub/c.lda', BAD)):
+			with open(os.path.join(self.root, name), 'wt', encoding='utf8') as f:
+				f.write(source)
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def batch(self, *argv):
+		args = ldac.ap.parse_args(argv)
+		args.extra_js_code = ""
+		args.stats_comment = False
+		out = io.StringIO()
+		with redirect_stdout(out), redirect_stderr(io.StringIO()):
+			status = ldac.batch(args)
+		return status, [json.loads(l) for l in out.getvalue().splitlines()]
+
+	def test_expand(self):
+		self.assertEqual(3, len(list(ldac.expand([self.root]))))
+		self.assertEqual(2, len(list(ldac.expand([os.path.join(self.root, 'sub', '*.lda')]))))
+
+	def test_outputs_next_to_inputs(self):
+		status, records = self.batch(self.root, '-j', '2')
+		self.assertEqual(1, status)
+		by_name = {os.path.basename(r['path']): r for r in records}
+		self.assertEqual('ok', by_name['a.lda']['status'])
+		self.assertTrue(os.path.exists(os.path.join(self.root, 'a.js')))
+		self.assertIn('translation', by_name['a.lda']['timings'])
+		self.assertEqual('error', by_name['c.lda']['status'])
+		self.assertEqual(3, by_name['c.lda']['errors'][0]['line'])
+		self.assertIsNone(by_name['c.lda']['output'])
+
+	def test_output_dir(self):
+		outdir = os.path.join(self.root, 'out')
+		status, records = self.batch(os.path.join(self.root, 'a.lda'),
+				os.path.join(self.root, 'sub', 'b.lda'), '-d', outdir, '-f', 'py')
+		self.assertEqual(0, status)
+		for r in records:
+			self.assertTrue(r['output'].startswith(outdir))
+			self.assertTrue(os.path.exists(r['output']))
+
+	def test_memory_report(self):
+		status, records = self.batch(os.path.join(self.root, 'a.lda'), '--memory-report')
+		self.assertEqual(0, status)
+		memory = records[0]['memory']
+		self.assertEqual({'syntax', 'semantic', 'translation'}, set(memory['phases']))
+		self.assertIn('Algorithm', memory['nodes'])
+
+	def test_dead_pool_process(self):
+		with open(os.path.join(self.root, 'die.lda'), 'wt', encoding='utf8') as f:
+			f.write(GOOD)
+		with mock.patch.object(ldac, 'compile_file', compile_or_die):
+			status, records = self.batch(self.root, '-j', '2')
+		self.assertEqual(2, status)
+		by_name = {os.path.basename(r['path']): r['status'] for r in records}
+		self.assertEqual({'a.lda': 'ok', 'die.lda': 'crash', 'b.lda': 'ok',
+				'c.lda': 'error'}, by_name)
+
+	def test_no_partial_output(self):
+		def translate_tree(args, module, fmt, f):
+			f.write("partial")
+			raise RuntimeError("boom")
+		args = ldac.ap.parse_args([self.root])
+		args.extra_js_code = ""
+		with mock.patch.object(ldac, 'translate_tree', translate_tree):
+			record = ldac.compile_file(args, os.path.join(self.root, 'a.lda'))
+		self.assertEqual('crash', record['status'])
+		self.assertEqual(['a.lda', 'sub'], sorted(os.listdir(self.root)))
+
+	def test_limits(self):
+		status, records = self.batch(os.path.join(self.root, 'a.lda'), '--max-tokens', '5')
+		self.assertEqual(1, status)
+		self.assertEqual('max_tokens', records[0]['errors'][0]['limit'])
+
+class TestProfile(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'a.lda')
+		with open(self.path, 'wt', encoding='utf8') as f:
+			f.write(GOOD)
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def profile(self, *argv):
+		args = ldac.ap.parse_args((self.path,) + argv)
+		args.extra_js_code = ""
+		args.stats_comment = False
+		with redirect_stderr(io.StringIO()):
+			return ldac.profile(args)
+
+	def test_cprofile(self):
+		import pstats
+		for phase in ('parse', 'check', 'translate', 'all'):
+			self.assertEqual(0, self.profile('--profile', phase,
+					'--profile-iterations', '3'))
+			stats = pstats.Stats(os.path.join(self.dir.name, 'a.' + phase + '.pstats'))
+			self.assertTrue(stats.total_calls > 0)
+		# setup isn't profiled: checking doesn't include parsing
+		stats = pstats.Stats(os.path.join(self.dir.name, 'a.check.pstats'))
+		self.assertFalse(any(f[2] == 'analyze_module' for f in stats.stats))
+
+	def test_sampling(self):
+		prefix = os.path.join(self.dir.name, 'out')
+		self.assertEqual(0, self.profile('--profile', 'all', '--profiler', 'sampling',
+				'--profile-iterations', '200', '--profile-output', prefix))
+		with open(prefix + '.collapsed', 'rt', encoding='utf8') as f:
+			lines = f.read().splitlines()
+		self.assertTrue(lines)
+		for line in lines:
+			stack, count = line.rsplit(' ', 1)
+			self.assertTrue(int(count) > 0)
+
+	def test_errors(self):
+		with open(self.path, 'wt', encoding='utf8') as f:
+			f.write(BAD)
+		self.assertEqual(1, self.profile('--profile', 'check'))
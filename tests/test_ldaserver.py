@@ -0,0 +1,190 @@
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import ldaserver
+
+PROGRAM = """
+algorithme
+début
+	écrire("bonjour")
+fin
+"""
+
+async def request(reader, writer, payload, close=False):
+	body = json.dumps(payload).encode('utf-8')
+	writer.write("POST /compile HTTP/1.1\r\nContent-Length: {}\r\n{}\r\n"
+			.format(len(body), "Connection: close\r\n" if close else "")
+			.encode('latin-1') + body)
+	status = int((await reader.readline()).split()[1])
+	headers = {}
+	while True:
+		line = (await reader.readline()).decode('latin-1').strip()
+		if not line:
+			break
+		name, _, value = line.partition(':')
+		headers[name.lower()] = value.strip()
+	body = await reader.readexactly(int(headers['content-length']))
+	return status, headers, json.loads(body.decode('utf-8'))
+
+class TestCompileService(unittest.TestCase):
+	def serve(self, client, **kwargs):
+		async def go():
+			service = ldaserver.CompileService(ThreadPoolExecutor(2), **kwargs)
+			server = await service.start('127.0.0.1', 0)
+			port = server.sockets[0].getsockname()[1]
+			async with server:
+				reader, writer = await asyncio.open_connection('127.0.0.1', port)
+				try:
+					return await client(reader, writer)
+				finally:
+					writer.close()
+		return asyncio.run(go())
+
+	def test_keep_alive_and_diagnostics(self):
+		async def client(reader, writer):
+			ok = await request(reader, writer, {'source': PROGRAM})
+			bad = await request(reader, writer, {'source': "algorithme début x <- 1 fin"})
+			last = await request(reader, writer, {'source': PROGRAM, 'format': 'py'}, close=True)
+			return ok, bad, last, await reader.read()
+		ok, bad, last, rest = self.serve(client)
+		status, headers, body = ok
+		self.assertEqual(200, status)
+		self.assertIn('P.main = function', body['code'])
+		self.assertEqual('keep-alive', headers['connection'])
+		self.assertIn('syntax;dur=', headers['server-timing'])
+		status, headers, body = bad
+		self.assertEqual(422, status)
+		self.assertEqual({'line', 'column', 'message', 'intent', 'tip'},
+				set(body['errors'][0]))
+		status, headers, body = last
+		self.assertEqual(200, status)
+		self.assertIn('def main', body['code'])
+		self.assertEqual('close', headers['connection'])
+		self.assertEqual(b'', rest)
+
+	def test_bad_requests(self):
+		async def client(reader, writer):
+			return [(await request(reader, writer, payload))[0] for payload in (
+					{'src': PROGRAM},
+					{'source': PROGRAM, 'format': 'cobol'},
+					{'source': PROGRAM, 'options': {'stats_comment': True}})]
+		self.assertEqual([400, 400, 400], self.serve(client))
+
+
+class TestPrefork(unittest.TestCase):
+	def test_respawn_backoff(self):
+		delay = 0
+		delays = []
+		for _ in range(12):
+			delay = ldaserver.respawn_delay(delay, 1, 0.01)
+			delays.append(delay)
+		self.assertEqual([0.1, 0.2, 0.4, 0.8], delays[:4])
+		self.assertEqual(ldaserver.MAX_RESPAWN_DELAY, delays[-1])
+		# recycled workers, and workers that ran for a while, are replaced
+		# right away
+		self.assertEqual(0, ldaserver.respawn_delay(delay, 0, 0.01))
+		self.assertEqual(0, ldaserver.respawn_delay(delay, -9, ldaserver.MIN_LIFETIME))
+
+	def test_workers_are_recycled(self):
+		with socket.socket() as s:
+			s.bind(('127.0.0.1', 0))
+			port = s.getsockname()[1]
+		master = subprocess.Popen([sys.executable, 'ldaserver.py', '--port', str(port),
+				'--prefork', '2', '--max-requests', '3'])
+		try:
+			async def client():
+				for _ in range(50):
+					try:
+						reader, writer = await asyncio.open_connection('127.0.0.1', port)
+						break
+					except OSError:
+						await asyncio.sleep(0.1)
+				writer.close()
+				for _ in range(12):
+					reader, writer = await asyncio.open_connection('127.0.0.1', port)
+					status, _, _ = await request(reader, writer, {'source': PROGRAM}, close=True)
+					self.assertEqual(200, status)
+					writer.close()
+				reader, writer = await asyncio.open_connection('127.0.0.1', port)
+				writer.write(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n")
+				response = await reader.read()
+				writer.close()
+				return json.loads(response.split(b"\r\n\r\n", 1)[1].decode('utf-8'))
+			workers = asyncio.run(client())['workers']
+			self.assertEqual(2, len(workers))
+			self.assertGreater(sum(w['generation'] for w in workers), 2)
+			self.assertTrue(all(w['rss'] > 0 for w in workers))
+		finally:
+			master.terminate()
+			master.wait()
+
+
+class TestSingleFlight(unittest.TestCase):
+	def test_identical_calls_are_coalesced(self):
+		calls = []
+		async def work(x):
+			calls.append(x)
+			await asyncio.sleep(0.05)
+			if x < 0:
+				raise ValueError(x)
+			return x * 2
+		async def go():
+			sf = ldaserver.SingleFlight()
+			results = await asyncio.gather(
+					*[sf.do('a', work, 1) for _ in range(50)],
+					sf.do('b', work, 2),
+					*[sf.do('c', work, -1) for _ in range(3)],
+					return_exceptions=True)
+			return sf, results
+		sf, results = asyncio.run(go())
+		self.assertEqual([1, 2, -1], calls)
+		self.assertEqual([2] * 50 + [4], results[:51])
+		self.assertTrue(all(isinstance(e, ValueError) for e in results[51:]))
+		self.assertEqual({'misses': 3, 'hits': 51, 'coalesced': 2}, sf.json())
+		self.assertEqual({}, sf.flights)
+
+	def test_cancelled_caller(self):
+		calls = []
+		async def work(x):
+			calls.append(x)
+			await asyncio.sleep(0.05)
+			return x * 2
+		async def go():
+			sf = ldaserver.SingleFlight()
+			# the first caller starts the call, then goes away
+			first = asyncio.ensure_future(sf.do('a', work, 1))
+			second = asyncio.ensure_future(sf.do('a', work, 1))
+			await asyncio.sleep(0.01)
+			first.cancel()
+			result = await second
+			self.assertTrue(first.cancelled())
+			# the call is cancelled along with its last caller
+			third = asyncio.ensure_future(sf.do('b', work, 2))
+			await asyncio.sleep(0.01)
+			task = sf.flights['b'][0]
+			third.cancel()
+			await asyncio.wait([task])
+			self.assertTrue(task.cancelled())
+			return sf, result
+		sf, result = asyncio.run(go())
+		self.assertEqual(2, result)
+		self.assertEqual([1, 2], calls)
+		self.assertEqual({}, sf.flights)
+
+	def test_service_coalesces_identical_requests(self):
+		async def go():
+			service = ldaserver.CompileService(ThreadPoolExecutor(2))
+			payload = json.dumps({'source': PROGRAM}).encode('utf-8')
+			results = await asyncio.gather(*[service.handle_compile(payload)
+					for _ in range(10)])
+			return service, results
+		service, results = asyncio.run(go())
+		self.assertEqual({200}, set(r[0] for r in results))
+		self.assertEqual(1, service.singleflight.misses)
+		self.assertEqual(9, service.singleflight.hits)
+		self.assertEqual(1, service.telemetry.compilations)
+		self.assertIn('lda_nodes_total{type="Algorithm"} 1', service.telemetry.prometheus())
@@ -0,0 +1,109 @@
+import unittest
+from lda import build_tree, CompilationFailed, DefaultOptions
+from lda.errors import limits
+from lda.limits import constant_integer
+from lda.parser import Parser
+import ldaserver
+
+def program(body, lexicon=""):
+	return ("algorithme\nlexique\n\tx: entier\n" + lexicon + "début\n"
+			"\tx <- 1\n\técrire(x)\n" + body + "fin\n")
+
+def options(**limits):
+	options = DefaultOptions()
+	for k, v in limits.items():
+		setattr(options, k, v)
+	return options
+
+class TestLimits(unittest.TestCase):
+	def fail(self, buf, error_class, **limits):
+		with self.assertRaises(CompilationFailed) as cm:
+			build_tree(options(**limits), buf)
+		errors = [e for e in cm.exception.errors if isinstance(e, error_class)]
+		self.assertEqual(1, len(errors), cm.exception.errors)
+		self.assertEqual(error_class.limit, errors[0].json()['limit'])
+		return cm.exception.errors
+
+	def test_unlimited_by_default(self):
+		build_tree(DefaultOptions(), program("\tx <- " + "(" * 500 + "x" + ")" * 500 + "\n"))
+
+	def test_source_bytes(self):
+		buf = program("")
+		size = len(buf.encode('utf-8'))
+		build_tree(options(max_source_bytes=size), buf)
+		self.fail(buf, limits.SourceTooLarge, max_source_bytes=size - 1)
+		# non-ASCII characters take several bytes
+		self.fail(buf, limits.SourceTooLarge, max_source_bytes=len(buf))
+
+	def test_tokens(self):
+		buf = program("")
+		p = Parser(DefaultOptions(), buf, None)
+		p.analyze_module()
+		build_tree(options(max_tokens=p.tokens), buf)
+		self.fail(buf, limits.TooManyTokens, max_tokens=p.tokens - 1)
+
+	def test_depth(self):
+		# the algorithm's body is the first level
+		build_tree(options(max_depth=3), program("\tx <- -(x)\n"))
+		build_tree(options(max_depth=3), program("\tsi vrai alors\n\t\tx <- (2)\n\tfsi\n"))
+		self.fail(program("\tx <- ((x))\n"), limits.TooDeep, max_depth=2)
+		self.fail(program("\tx <- -(x)\n"), limits.TooDeep, max_depth=2)
+		self.fail(program("\tx <- f(g(x))\n"), limits.TooDeep, max_depth=2)
+		self.fail(program("\tsi vrai alors\n\t\tx <- (2)\n\tfsi\n"), limits.TooDeep, max_depth=2)
+
+	def test_errors(self):
+		buf = program("".join("\ty{} <- 1\n".format(i) for i in range(20)))
+		with self.assertRaises(CompilationFailed) as cm:
+			build_tree(options(max_errors=20), buf)
+		self.assertEqual(20, len(cm.exception.errors))
+		errors = self.fail(buf, limits.TooManyErrors, max_errors=5)
+		self.assertEqual(6, len(errors))
+		self.assertIsInstance(errors[-1], limits.TooManyErrors)
+
+	def test_array_cells(self):
+		build_tree(options(max_array_cells=100), program("\técrire(t)\n",
+				"\tt: tableau entier[1..10, -9..0]\n"))
+		for bounds in ("1..101", "1..10, 0..10", "1..2**70", "-(2 ** 99)..0",
+				"1..10*10+1"):
+			self.fail(program("\técrire(t)\n", "\tt: tableau entier[" + bounds + "]\n"),
+					limits.ArrayTooLarge, max_array_cells=100)
+
+	def test_constant_integer(self):
+		def value(buf):
+			p = Parser(DefaultOptions(), buf, None)
+			return constant_integer(p.analyze_expression())
+		self.assertEqual(-3, value("-3"))
+		self.assertEqual(7, value("1 + 2 * 3"))
+		self.assertEqual(-4, value("-7 : 2"))
+		self.assertEqual(-1, value("-7 mod 2"))
+		self.assertEqual(1, value("(-1) ** 1000"))
+		self.assertEqual(float('inf'), value("2 ** 1000"))
+		self.assertEqual(float('inf'), value("2 ** 1000 - 2 ** 1000"))
+		self.assertIsNone(value("1 : 0"))
+		self.assertIsNone(value("1 mod (2 - 2)"))
+		# never computed
+		self.assertEqual(float('inf'), value("2 ** 10 ** 10"))
+		self.assertIsNone(value("x + 1"))
+
+	def test_deadline(self):
+		self.fail(program(""), limits.DeadlineExceeded, deadline=0)
+
+class TestServiceLimits(unittest.TestCase):
+	def test_limits_apply(self):
+		options = ldaserver.make_options({})
+		for k, v in ldaserver.LIMITS.items():
+			self.assertEqual(v, getattr(options, k))
+
+	def test_diagnostic(self):
+		buf = program("\tx <- " + "(" * 200 + "x" + ")" * 200 + "\n")
+		status, body, _ = ldaserver.compile_source(buf, 'js', {})
+		self.assertEqual(422, status)
+		self.assertEqual(['max_depth'], [e['limit'] for e in body['errors']])
+
+	def test_long_binary_chain(self):
+		# binary operators aren't counted by max_depth
+		buf = program("\tx <- " + " + ".join(["1"] * 3000) + "\n")
+		for fmt, client_options in (('js', {}), ('js', {'generators': True}),
+				('lda', {}), ('py', {}), ('ir', {})):
+			status, body, _ = ldaserver.compile_source(buf, fmt, client_options)
+			self.assertEqual(200, status, (fmt, client_options))
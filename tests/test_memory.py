@@ -0,0 +1,63 @@
+import io
+import tracemalloc
+import unittest
+from lda import build_tree, translate_tree, DefaultOptions
+
+PROGRAM = """
+fonction f(x: entier): entier
+début
+	retourne x + 1
+fin
+algorithme
+lexique
+	i: entier
+	t: tableau entier[1..10]
+début
+	pour i de 1 jusque 10 faire
+		t[i] <- f(i)
+		écrire(t[i])
+	fpour
+fin
+"""
+
+class MemoryOptions(DefaultOptions):
+	memory_report = True
+
+class TestMemoryReport(unittest.TestCase):
+	def test_off_by_default(self):
+		module = build_tree(DefaultOptions(), PROGRAM)
+		self.assertIsNone(module.telemetry.memory)
+
+	def test_phases(self):
+		options = MemoryOptions()
+		module = build_tree(options, PROGRAM)
+		translate_tree(options, module, 'js')
+		report = module.telemetry.memory
+		self.assertEqual({'syntax', 'semantic', 'translation'}, set(report.phases))
+		syntax = report.phases['syntax']
+		self.assertGreater(syntax['peak'], 0)
+		self.assertGreaterEqual(syntax['peak'], syntax['retained'])
+		self.assertFalse(tracemalloc.is_tracing())
+
+	def test_nodes_and_fragments(self):
+		options = MemoryOptions()
+		module = build_tree(options, PROGRAM)
+		out = io.StringIO()
+		translate_tree(options, module, 'js', out)
+		report = module.telemetry.memory
+		self.assertEqual(1, report.node_counts['For'])
+		self.assertEqual(1, report.node_counts['Algorithm'])
+		self.assertGreater(report.node_bytes['For'], 0)
+		self.assertGreater(report.fragments_peak_count, 0)
+		self.assertGreaterEqual(report.fragments_total, report.fragments_peak_count)
+		json = report.json()
+		self.assertEqual(report.node_counts['For'], json['nodes']['For']['count'])
+		self.assertIn('fragments', report.format())
+
+	def test_already_tracing(self):
+		tracemalloc.start()
+		try:
+			build_tree(MemoryOptions(), PROGRAM)
+			self.assertTrue(tracemalloc.is_tracing())
+		finally:
+			tracemalloc.stop()
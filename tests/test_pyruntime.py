@@ -0,0 +1,127 @@
+import io
+import subprocess
+import sys
+import unittest
+import jsshell
+from lda import build_tree, translate_tree, DefaultOptions, pyruntime
+from lda.interpreter import compile_module
+
+class TestPyRuntime(unittest.TestCase):
+	def translate(self, program):
+		options = DefaultOptions()
+		options.stats_comment = False
+		return translate_tree(options, build_tree(options, program), 'py')
+
+	def test_tostr_mimics_javascript(self):
+		tostr = pyruntime.tostr
+		self.assertEqual("null", tostr(None))
+		self.assertEqual("true false", tostr(True) + " " + tostr(False))
+		self.assertEqual("3", tostr(3.0))
+		self.assertEqual("2.5", tostr(2.5))
+		self.assertEqual("0.000001", tostr(1e-6))
+		self.assertEqual("1e-7", tostr(1e-7))
+		self.assertEqual("1e+21", tostr(1e21))
+		self.assertEqual("Infinity", tostr(pyruntime.div(1, 0)))
+		self.assertEqual("NaN", tostr(pyruntime.mod(1, 0)))
+		self.assertEqual("12157665459056929000", tostr(3 ** 40))
+		self.assertEqual("1.5511210043330986e+25", tostr(15511210043330985984000000))
+		self.assertEqual("-1.5e-9", tostr(-1.5e-9))
+
+	def test_arithmetic_mimics_javascript(self):
+		self.assertEqual(-1, pyruntime.mod(-7, 3))
+		self.assertEqual(1, pyruntime.mod(7, -3))
+		self.assertEqual(-4, pyruntime.idiv(-7, 2))
+		self.assertEqual("bon", pyruntime.substr("bonjour", 0, 2))
+		self.assertEqual("", pyruntime.substr("bonjour", 3, 1))
+		self.assertEqual(2 ** 53, pyruntime.jsint(2 ** 53))
+		self.assertEqual(float(2 ** 53), pyruntime.jsint(2 ** 53 + 1))
+		self.assertEqual(float('-inf'), pyruntime.jsint(-10 ** 400))
+
+	def test_array_bounds(self):
+		a = pyruntime.Array(((1, 3), (0, 1)), lambda: 0)
+		a.set((3, 1), 42)
+		self.assertEqual(42, a.get((3, 1)))
+		self.assertRaises(pyruntime.LDARuntimeError, a.get, (4, 0))
+		self.assertRaises(pyruntime.LDARuntimeError, pyruntime.Array(((1, 2),)).get, (1,))
+		self.assertRaises(pyruntime.LDARuntimeError, pyruntime.Array, ((2, 1),))
+
+	def test_clone_is_independent(self):
+		a = pyruntime.Array(((1, 2),), lambda: 0)
+		b = pyruntime.clone(a)
+		b.set((1,), 1)
+		self.assertEqual(0, a.get((1,)))
+
+	def test_injected_streams(self):
+		code = pyruntime.compile_program(self.translate("""
+			algorithme
+			lexique
+				n: entier
+			début
+				lire(n)
+				écrire(n * 2)
+			fin"""))
+		for given, expected in (("3", "6"), ("-5", "-10")):
+			stdout = io.StringIO()
+			pyruntime.execute(code, io.StringIO("abc\n" + given), stdout)
+			self.assertEqual("entier> Mauvais type ! Recommencez, SVP.\n"
+					"entier> " + expected + "\n", stdout.getvalue())
+
+	def test_runtime_error(self):
+		py = self.translate("""
+			algorithme
+			lexique
+				t: tableau entier[1..2]
+			début
+				t[3] <- 1
+			fin""")
+		self.assertRaises(pyruntime.LDARuntimeError, pyruntime.run, py)
+
+	def test_string_index_out_of_bounds(self):
+		# every backend raises, instead of JavaScript's undefined
+		program = """
+			algorithme
+			lexique
+				s: chaîne
+			début
+				s <- "abc"
+				s[5] <- 'x'
+				écrire(s[2])
+				écrire(s[3])
+			fin"""
+		options = DefaultOptions()
+		options.stats_comment = False
+		module = build_tree(options, program)
+		self.assertRaises(pyruntime.LDARuntimeError, pyruntime.run, self.translate(program))
+		self.assertRaises(pyruntime.LDARuntimeError, compile_module(module).run)
+		for ir_backend in (False, True):
+			options.ir_backend = ir_backend
+			options.extra_js_code = "P.main();"
+			with self.assertRaises(subprocess.CalledProcessError) as cm:
+				jsshell.run(translate_tree(options, module, 'js'), shutup=True)
+			self.assertEqual("c", cm.exception.output.strip())
+
+	def test_deep_recursion(self):
+		py = self.translate("""
+			fonction somme(n: entier): entier
+			début
+				si n = 0 alors
+					retourne 0
+				fsi
+				retourne n + somme(n - 1)
+			fin
+			algorithme
+			début
+				écrire(somme(5000))
+			fin""")
+		# too deep for the default recursion limit
+		self.assertRaises(pyruntime.LDARuntimeError, pyruntime.run, py)
+		# enable_deep_calls() changes process-wide settings: use a process of
+		# its own
+		script = ("import sys\n"
+				"from lda import pyruntime\n"
+				"pyruntime.enable_deep_calls()\n"
+				"print(pyruntime.run(sys.stdin.read()))\n"
+				"print(sys.getrecursionlimit())\n")
+		out = subprocess.run([sys.executable, '-c', script], input=py, check=True,
+				stdout=subprocess.PIPE, encoding='utf-8').stdout
+		self.assertEqual(["12502500", str(pyruntime.RECURSION_LIMIT)], out.splitlines())
@@ -0,0 +1,55 @@
+import glob
+import unittest
+from lda import build_tree, translate_tree, CompilationFailed, DefaultOptions
+from lda.parser import Parser
+from lda.context import ContextStack
+from lda.errors.handler import Logger
+from lda.telemetry import walk, Telemetry
+from lda import kw, types
+from bench.synth import Shape, generate
+
+class TestSlots(unittest.TestCase):
+	"""
+	Syntax tree nodes declare all their attributes (including those set by
+	the semantic analysis and the translation) in __slots__.
+	"""
+
+	def assertNoDict(self, root):
+		for node in walk(root):
+			if isinstance(node, (kw.Keyword, kw.Synonym, Telemetry)):
+				continue
+			self.assertFalse(hasattr(node, '__dict__'),
+					"{} has a __dict__".format(type(node).__name__))
+
+	def test_snippets(self):
+		for path in sorted(glob.glob('snippets/*.lda')):
+			with open(path, 'rt', encoding='utf-8') as f:
+				buf = f.read()
+			with self.subTest(snippet=path):
+				try:
+					module = build_tree(DefaultOptions(), buf)
+				except CompilationFailed:
+					# checked with errors: erroneous types and partial bindings
+					try:
+						module = Parser(DefaultOptions(), buf).analyze_module()
+					except Exception:
+						continue
+					module.check(ContextStack(DefaultOptions()), Logger())
+				else:
+					for fmt in ('js', 'lda', 'ir', 'py'):
+						translate_tree(DefaultOptions(), module, fmt)
+				self.assertNoDict(module)
+
+	def test_synthetic(self):
+		module = build_tree(DefaultOptions(), generate(Shape(functions=3)))
+		self.assertNoDict(module)
+
+	def test_dual_scalars(self):
+		self.assertIs(types.REAL, types.INTEGER.equivalent(types.REAL))
+		self.assertIs(types.REAL, types.REAL.equivalent(types.INTEGER))
+		self.assertIs(types.STRING, types.CHARACTER.equivalent(types.STRING))
+		self.assertIs(types.INTEGER, types.INTEGER.equivalent(types.INTEGER))
+		self.assertIsNone(types.INTEGER.equivalent(types.STRING))
+		self.assertIsNone(types.BOOLEAN.equivalent(types.INTEGER))
+		self.assertTrue(types.REAL.compatible(types.INTEGER))
+		self.assertFalse(types.INTEGER.compatible(types.REAL))
@@ -6,6 +6,9 @@ You can also call this script from the command line in the following fashion to
 test one snippet at a time:
 	python -m tests.test_snippets SNIPPETNAME
 
+To run all snippets in parallel, skipping those whose result is cached, see
+tests/run_snippets.py.
+
 The snippets may either be:
 - incorrect, to test the compiler's error reporting system; the expected errors
 must be specified as specially-formatted comments in the snippet; or
@@ -23,6 +26,11 @@ we weren't expecting any, keep going.
 - Compile to LDA and then back to JS; ensure this JS version is identical to
 the one obtained above.
 - Run JS and ensure the JS output matches that defined in the snippet's comments
+- Compile to JS through the intermediate representation, run it, and ensure its
+output matches as well
+- Compile to JS generators, run them, and ensure their output matches as well
+- Compile to Python, run it in-process, and ensure its output matches as well
+- Run it with the interpreter, and ensure its output matches as well
 """
 
 import os
@@ -32,10 +40,13 @@ import sys
 from fnmatch import fnmatch
 from itertools import count
 import jsshell
+import grading
 
 from lda.errors import syntax, semantic
 from lda import build_tree, CompilationFailed, DefaultOptions, translate_tree
 from lda import kw
+from lda import pyruntime
+from lda import interpreter
 
 
 SNIPPETSDIR = "snippets"
@@ -133,14 +144,32 @@ class TestSnippets(unittest.TestCase):
 		if not module.algorithms:
 			return
 		if session_match:
-			fragments = session_match.group('session').strip().split('|')
-			snippet_output = ' '.join(f.strip() for f in fragments[0::2])
-			snippet_input = '\n'.join(f.strip() for f in fragments[1::2])
+			case = grading.parse_session(session_match.group('session'))
+			snippet_output, snippet_input = case.expected, case.inputstr
 		else:
 			snippet_output = ''
 			snippet_input = ''
 		gotten_output = jsshell.run(js1, snippet_input)
 		self.assertEqual(snippet_output, gotten_output.strip())
+		# ---- run JS generated through the intermediate representation ----
+		options.ir_backend = True
+		js3 = translate_tree(options, module, 'js')
+		gotten_output = jsshell.run(js3, snippet_input)
+		self.assertEqual(snippet_output, gotten_output.strip(),
+				"intermediate representation backend")
+		# ---- run Python in-process, and JS generators driven by LDA.runSync
+		# (auxiliary JS code expects P.main to run the program straight away)
+		if not os.path.exists(jspath):
+			options.generators = True
+			options.extra_js_code = "LDA.runSync(P.main());"
+			js4 = translate_tree(options, module, 'js')
+			gotten_output = jsshell.run(js4, snippet_input)
+			self.assertEqual(snippet_output, gotten_output.strip(), "JS generators")
+			py = translate_tree(options, module, 'py')
+			gotten_output = pyruntime.run(py, snippet_input)
+			self.assertEqual(snippet_output, gotten_output, "Python backend")
+			gotten_output = interpreter.compile_module(module).run(snippet_input)
+			self.assertEqual(snippet_output, gotten_output, "interpreter")
 
 for fn in sorted(os.listdir(SNIPPETSDIR)):
 	if not fnmatch(fn, '*.lda'):
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import unittest
+from lda import kw, kwtables
+
+def imported_after(statement):
+	"""
+	Return the lda modules and the output of a fresh interpreter running
+	`statement`.
+	"""
+	code = statement + "\nimport sys\nprint(' '.join(sorted(m for m in sys.modules if m.startswith('lda'))))"
+	out = subprocess.run([sys.executable, '-c', code], check=True,
+			stdout=subprocess.PIPE).stdout.decode('utf-8').splitlines()
+	return set(out[-1].split()), out[:-1]
+
+class TestKeywordTables(unittest.TestCase):
+	def test_up_to_date(self):
+		tables = kw.compute_tables()
+		for name, value in tables.items():
+			self.assertEqual(value, getattr(kwtables, name),
+					"lda/kwtables.py is stale: run python3 -m lda.kw")
+
+	def test_priorities(self):
+		lt = next(s for s in kw.LT.synonyms if s.word == "<")
+		self.assertEqual(["<-", "<="], [s.word for s in lt.give_way])
+		self.assertEqual([], kw.LE.synonyms[0].give_way)
+		self.assertIn("début", kw.reserved)
+
+class TestLazyImports(unittest.TestCase):
+	def test_import_lda(self):
+		modules, _ = imported_after("import lda")
+		self.assertEqual({'lda', 'lda.telemetry'}, modules)
+
+	def test_check_only(self):
+		modules, _ = imported_after("from lda import build_tree, DefaultOptions\n"
+				"build_tree(DefaultOptions(), 'algorithme\\ndébut\\n\\técrire(1)\\nfin\\n')")
+		self.assertIn('lda.parser', modules)
+		self.assertNotIn('lda.ir', modules)
+		self.assertNotIn('lda.lowering', modules)
+		self.assertNotIn('lda.memory', modules)
+
+	def test_no_import_side_effects(self):
+		_, output = imported_after("import jsshell")
+		self.assertEqual([], output)
@@ -0,0 +1,60 @@
+import io
+import unittest
+from lda import build_tree, translate_tree, DefaultOptions
+from lda.prettyprinter import JSPrettyPrinter
+
+PROGRAM = """
+lexique
+	Moule = <a: entier, b: chaîne>
+fonction f(x: entier): entier
+début
+	retourne x * 2
+fin
+algorithme
+lexique
+	m: Moule
+	i: entier
+début
+	pour i de 1 jusque 10 faire
+		m.a <- f(i)
+		écrire(m.a)
+	fpour
+fin
+"""
+
+class RecordingSink:
+	def __init__(self):
+		self.chunks = []
+
+	def write(self, s):
+		self.chunks.append(s)
+
+class TestStreamingOutput(unittest.TestCase):
+	def setUp(self):
+		self.options = DefaultOptions()
+		self.options.stats_comment = False
+		self.module = build_tree(self.options, PROGRAM)
+
+	def test_streamed_output_matches_string_output(self):
+		for fmt in ('js', 'lda'):
+			sink = io.StringIO()
+			self.assertIsNone(translate_tree(self.options, self.module, fmt, sink))
+			self.assertEqual(translate_tree(self.options, self.module, fmt),
+					sink.getvalue())
+
+	def test_chunked_writes(self):
+		sink = RecordingSink()
+		pp = JSPrettyPrinter(sink, chunk_size=16)
+		pp.put(self.module)
+		pp.flush()
+		self.assertGreater(len(sink.chunks), 1)
+		self.assertTrue(all(sink.chunks))
+		self.assertEqual(''.join(sink.chunks), self.module.quickjs())
+
+	def test_nothing_written_before_chunk_is_full(self):
+		sink = RecordingSink()
+		pp = JSPrettyPrinter(sink, chunk_size=1 << 20)
+		pp.put(self.module)
+		self.assertEqual([], sink.chunks)
+		pp.flush()
+		self.assertEqual(1, len(sink.chunks))
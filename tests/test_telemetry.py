@@ -0,0 +1,59 @@
+import unittest
+from lda import build_tree, translate_tree, CompilationFailed, DefaultOptions
+from lda.telemetry import Telemetry
+
+PROGRAM = """
+fonction f(x: entier): entier
+début
+	retourne x + 1
+fin
+algorithme
+lexique
+	i: entier
+début
+	pour i de 1 jusque 3 faire
+		écrire(f(i))
+	fpour
+fin
+"""
+
+class TestTelemetry(unittest.TestCase):
+	def test_phases_and_functions(self):
+		options = DefaultOptions()
+		module = build_tree(options, PROGRAM)
+		translate_tree(options, module, 'js')
+		t = module.telemetry
+		self.assertEqual({'syntax', 'semantic', 'translation'}, set(t.phases))
+		self.assertIn(('f', 'semantic'), t.functions)
+		self.assertIn(('<algorithme>', 'translation'), t.functions)
+		self.assertEqual({}, t.rules)
+
+	def test_detailed(self):
+		t = Telemetry(detailed=True)
+		build_tree(DefaultOptions(), PROGRAM, telemetry=t)
+		self.assertEqual(1, t.rules['analyze_module'])
+		self.assertGreater(t.rules['analyze_statement'], t.backtracks['analyze_statement'])
+		self.assertGreater(t.backtracks['analyze_statement'], 0)
+		self.assertGreater(t.softskip_probes, t.softskip_misses)
+		self.assertEqual(1, t.nodes['For'])
+		self.assertEqual(2, t.nodes['FunctionCall'])
+
+	def test_errors(self):
+		t = Telemetry()
+		with self.assertRaises(CompilationFailed) as cm:
+			build_tree(DefaultOptions(), "algorithme début x <- y fin", telemetry=t)
+		self.assertIs(t, cm.exception.telemetry)
+		self.assertEqual({'MissingDeclaration': 2}, dict(t.errors))
+
+	def test_merge_and_export(self):
+		totals = Telemetry()
+		for _ in range(2):
+			t = Telemetry(detailed=True)
+			build_tree(DefaultOptions(), PROGRAM, telemetry=t)
+			totals.merge(t.json())
+		self.assertEqual(2, totals.compilations)
+		self.assertEqual(2, totals.nodes['For'])
+		prom = totals.prometheus()
+		self.assertIn("# TYPE lda_compilations_total counter\nlda_compilations_total 2\n", prom)
+		self.assertIn('lda_nodes_total{type="For"} 2\n', prom)
+		self.assertIn('lda_phase_seconds_total{phase="syntax"}', prom)
@@ -0,0 +1,137 @@
+import sys
+import unittest
+from lda import DefaultOptions, CompilationFailed, build_tree, translate_tree, visitor
+from lda import expression, operators, statements
+from lda.context import ContextStack
+from lda.errors.handler import Logger
+
+# deeper than any recursive traversal could go
+DEPTH = 100000
+# nesting depth of the compiled programs (parsing them takes a while)
+PROGRAM_DEPTH = 10000
+
+class Options(DefaultOptions):
+	stats_comment = False
+
+def program(expression):
+	return ("algorithme\nlexique\n\tx: entier\n\tb: booléen\ndébut\n"
+			"\tx <- 1\n\tb <- " + expression + "\n\técrire(x, b)\nfin\n")
+
+class TestRun(unittest.TestCase):
+	def test_plain_task(self):
+		self.assertIsNone(visitor.run(None))
+		self.assertEqual(3, visitor.run(3))
+
+	def test_subtask_results(self):
+		def countdown(n):
+			if n == 0:
+				return 0
+			return 1 + (yield countdown(n - 1))
+		self.assertEqual(DEPTH, visitor.run(countdown(DEPTH)))
+
+	def test_exceptions_reach_parent(self):
+		def fail():
+			raise KeyError("x")
+			yield
+		def catch():
+			try:
+				yield fail()
+			except KeyError:
+				return "caught"
+		def parent():
+			return (yield catch())
+		self.assertEqual("caught", visitor.run(parent()))
+		self.assertRaises(KeyError, visitor.run, fail())
+
+class TestEqual(unittest.TestCase):
+	def chain(self, n, leaf=1):
+		tree = expression.LiteralInteger(None, leaf)
+		for i in range(n):
+			tree = operators.Subtraction(None, operators.UnaryMinus(None,
+					expression.LiteralInteger(None, i)), tree)
+		return tree
+
+	def test_deep_equal(self):
+		a = self.chain(DEPTH)
+		b = self.chain(DEPTH)
+		self.assertIsNot(a, b)
+		self.assertTrue(a == b)
+		self.assertFalse(a != b)
+
+	def test_deep_not_equal(self):
+		a = self.chain(DEPTH)
+		b = self.chain(DEPTH, 2)
+		self.assertFalse(a == b)
+		self.assertTrue(a != b)
+		self.assertFalse(a == self.chain(DEPTH - 1))
+
+	def test_lists(self):
+		a = self.chain(1)
+		self.assertTrue(visitor.equal([a, a], [a, self.chain(1)]))
+		self.assertFalse(visitor.equal([a], [a, a]))
+		self.assertFalse(visitor.equal([a], a))
+
+class TestDeepTrees(unittest.TestCase):
+	def translate(self, buf):
+		module = build_tree(Options(), buf)
+		js = translate_tree(Options(), module, 'js')
+		lda = translate_tree(Options(), module, 'lda')
+		return js, lda
+
+	def test_deep_binary_expressions(self):
+		for op in ("-", "**"):
+			js, lda = self.translate(program(("x " + op + " ") * PROGRAM_DEPTH + "x > 0"))
+			self.assertEqual(PROGRAM_DEPTH + 4, js.count("$x"))
+			# the LDA output is parsed back to the same tree
+			self.assertTrue(lda == self.translate(lda)[1])
+
+	def test_deep_unary_expressions(self):
+		js, lda = self.translate(program("non " * PROGRAM_DEPTH + "vrai"))
+		self.assertEqual(PROGRAM_DEPTH, js.count("!"))
+		js, lda = self.translate(program("-" * PROGRAM_DEPTH + "x > 0"))
+		self.assertTrue(lda == self.translate(lda)[1])
+
+	def test_deep_error(self):
+		# the innermost operand is ill-typed
+		buf = program("non " * PROGRAM_DEPTH + "1")
+		with self.assertRaises(CompilationFailed) as cm:
+			build_tree(Options(), buf)
+		self.assertEqual(1, len(cm.exception.errors))
+
+	def nested_ifs(self, depth):
+		# The statement parser is recursive: nest the statements by hand.
+		module = build_tree(Options(), program("x = 1"))
+		body = module.algorithms[0].body
+		statement = assignment = body.body[1]
+		for _ in range(depth):
+			statement = statements.If([statements.Conditional(
+					assignment.pos, assignment.rhs, [statement])])
+		body.body[1] = statement
+		logger = Logger()
+		module.check(ContextStack(Options()), logger)
+		self.assertFalse(logger)
+		return module
+
+	def test_deep_statements(self):
+		self.nested_ifs(DEPTH)
+		# each level is indented: keep the output reasonably small
+		depth = sys.getrecursionlimit() * 2
+		module = self.nested_ifs(depth)
+		lda = translate_tree(Options(), module, 'lda')
+		self.assertEqual(depth, lda.count("fsi"))
+		js = translate_tree(Options(), module, 'js')
+		self.assertEqual(depth, js.count("if ("))
+
+	def test_deep_trees_in_other_backends(self):
+		from lda import pyruntime
+		from lda.interpreter import compile_module
+		buf = program("x - " * PROGRAM_DEPTH + "x > 0")
+		module = build_tree(Options(), buf)
+		self.assertEqual("1 false", pyruntime.run(translate_tree(Options(), module, 'py')))
+		# evaluating the expression nests one closure call per operator: running
+		# it takes deep calls (see pyruntime.enable_deep_calls())
+		compile_module(module)
+		self.assertTrue(translate_tree(Options(), module, 'ir'))
+		options = Options()
+		options.generators = True
+		self.assertTrue(translate_tree(options, module, 'js'))